@@ -3,11 +3,13 @@
 import json
 import re
 from orchestrator.state import AgentState
-from langchain_google_genai import ChatGoogleGenerativeAI
+from agents.context_packer import pack_documents, estimate_tokens
+from mcp.governor import get_governor  # config.yml holds the context budget
 from langchain_core.prompts import ChatPromptTemplate
+from agents.llm_factory import agent_llm  # built on first use from models: in config.yml
+from telemetry.log import get_logger
 
-# Initialize LLM (pass API key via env or your standard loader elsewhere)
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", temperature=0.7)
+log = get_logger(__name__)
 
 # Prompt: escaped JSON schema + clear instruction to output JSON only.
 analyst_prompt = ChatPromptTemplate.from_template(
@@ -16,6 +18,8 @@ analyst_prompt = ChatPromptTemplate.from_template(
     report based ONLY on the research documents provided.
 
     Input:
+    Each document starts with a header line "[doc_id] title | source | url",
+    followed by its text. Cite documents by their doc_id.
     DOCUMENTS: {documents}
 
     Requirements:
@@ -90,37 +94,59 @@ def _clean_model_output(raw_text: str) -> str:
     return text
 
 
-def run_analyst_node(state: AgentState) -> dict:
-    print(f"\n--- [Node: AnalystAgent] ---")
-    documents = state.get("documents", [])
-    docs_json = json.dumps(documents, ensure_ascii=False)
-
-    chain = analyst_prompt | llm
-
-    print("Generating draft structured report (JSON)...")
-    try:
-        response = chain.invoke({"documents": docs_json}).content
-    except Exception as e:
-        # On LLM errors (including rate limits), produce a safe fallback template
-        print(f"[AnalystAgent] LLM call failed: {e}")
-        fallback = {
-            "title": f"Analysis for {state.get('topic', '')}",
-            "executive_summary": "",
-            "market_trends": [],
-            "opportunities": [],
-            "risks": [],
-            "comparison_table_markdown": "",
-            "image_references": [],
-            "recommendations": [],
-            "metadata": {"doc_count": len(documents)}
-        }
-        return {"draft_report": json.dumps(fallback)}
-
-    cleaned = _clean_model_output(response)
-
+def _documents_context(state: AgentState, documents: list) -> str:
+    """
+    Rank, de-duplicate and pack documents into the prompt's token budget
+    (analyst.context in config.yml). Disabled -> the old full JSON dump.
+    """
+    settings = (get_governor().config.get("analyst") or {}).get("context") or {}
+    if not settings.get("enabled", True):
+        return json.dumps(documents, ensure_ascii=False)
+
+    queries = [step.get("query", "") for step in state.get("plan") or []]
+    queries += state.get("repair_queries") or []
+    packed, included = pack_documents(
+        documents,
+        topic=state.get("topic", ""),
+        queries=queries,
+        token_budget=int(settings.get("token_budget", 6000)),
+        max_doc_chars=int(settings.get("max_doc_chars", 1500)),
+        redundancy_threshold=float(settings.get("redundancy_threshold", 0.85)),
+    )
+    log.info(f"[AnalystAgent] Packed {len(included)}/{len(documents)} documents (~{estimate_tokens(packed)} tokens).")
+    return packed
+
+
+def _fallback_draft(state: AgentState, documents: list) -> dict:
+    return {
+        "title": f"Analysis for {state.get('topic', '')}",
+        "executive_summary": "",
+        "market_trends": [],
+        "opportunities": [],
+        "risks": [],
+        "comparison_table_markdown": "",
+        "image_references": [],
+        "recommendations": [],
+        "metadata": {"doc_count": len(documents)}
+    }
+
+
+def _load_draft(response: str) -> dict:
+    """The model's draft as a dict; raises ValueError if it is not a JSON object."""
+    parsed = json.loads(_clean_model_output(response))
+    if not isinstance(parsed, dict):
+        raise ValueError("draft is not a JSON object")
+    return parsed
+
+
+# LLM built once, on first use; only drafts that parse are cached
+llm = agent_llm("analyst", validate=_load_draft)
+
+
+def _draft_from_response(response: str, state: AgentState, documents: list) -> str:
     # Try parsing JSON
     try:
-        parsed = json.loads(cleaned)
+        parsed = _load_draft(response)
         # Ensure minimal schema exists
         minimal = {
             "title": parsed.get("title", ""),
@@ -133,22 +159,45 @@ def run_analyst_node(state: AgentState) -> dict:
             "recommendations": parsed.get("recommendations", []),
             "metadata": parsed.get("metadata", {"doc_count": len(documents)})
         }
-        draft_report_str = json.dumps(minimal)
+        return json.dumps(minimal)
     except Exception as e:
         # Parsing failed: return a safe fallback that the Critic can consume
-        print(f"[AnalystAgent] JSON parse failed: {e}")
-        print(f"[AnalystAgent] Raw model output: {response}")
-        fallback = {
-            "title": f"Analysis for {state.get('topic', '')}",
-            "executive_summary": "",
-            "market_trends": [],
-            "opportunities": [],
-            "risks": [],
-            "comparison_table_markdown": "",
-            "image_references": [],
-            "recommendations": [],
-            "metadata": {"doc_count": len(documents)}
-        }
-        draft_report_str = json.dumps(fallback)
+        log.warning(f"[AnalystAgent] JSON parse failed: {e}")
+        log.debug(f"[AnalystAgent] Raw model output: {response}")
+        return json.dumps(_fallback_draft(state, documents))
+
+
+def run_analyst_node(state: AgentState) -> dict:
+    log.info("[Node: AnalystAgent]")
+    documents = state.get("documents", [])
+    docs_json = _documents_context(state, documents)
+
+    chain = analyst_prompt | llm
+
+    log.info("[AnalystAgent] Generating draft structured report (JSON)...")
+    try:
+        response = chain.invoke({"documents": docs_json}).content
+    except Exception as e:
+        # On LLM errors (including rate limits), produce a safe fallback template
+        log.error(f"[AnalystAgent] LLM call failed: {e}")
+        return {"draft_report": json.dumps(_fallback_draft(state, documents))}
+
+    return {"draft_report": _draft_from_response(response, state, documents)}
+
+
+async def arun_analyst_node(state: AgentState) -> dict:
+    """Async twin of run_analyst_node (used by app_graph.ainvoke / astream)."""
+    log.info("[Node: AnalystAgent]")
+    documents = state.get("documents", [])
+    docs_json = _documents_context(state, documents)
+
+    chain = analyst_prompt | llm
+
+    log.info("[AnalystAgent] Generating draft structured report (JSON)...")
+    try:
+        response = (await chain.ainvoke({"documents": docs_json})).content
+    except Exception as e:
+        log.error(f"[AnalystAgent] LLM call failed: {e}")
+        return {"draft_report": json.dumps(_fallback_draft(state, documents))}
 
-    return {"draft_report": draft_report_str}
+    return {"draft_report": _draft_from_response(response, state, documents)}
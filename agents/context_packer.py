@@ -0,0 +1,169 @@
+# stratos/agents/context_packer.py
+"""
+Token-budgeted context packing for the AnalystAgent.
+
+Instead of json.dumps(documents) straight into the prompt, documents are:
+  1. scored for relevance to the topic (+ plan queries) with BM25,
+  2. greedily selected in score order, skipping near-redundant ones
+     (cosine similarity of term vectors above a threshold),
+  3. stripped of sentences already included from another document,
+  4. rendered in a compact text format until the token budget is full.
+
+Token counts are estimated at ~4 characters per token.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by", "at", "from", "as",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those", "has",
+    "have", "had", "not", "but", "will", "can", "into", "than", "which", "who", "what", "how",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _stem(term: str) -> str:
+    # Cheap plural folding so "batteries"/"battery" and "prices"/"price" match.
+    if len(term) > 4 and term.endswith("ies"):
+        return term[:-3] + "y"
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        return term[:-1]
+    return term
+
+
+def _terms(text: str) -> List[str]:
+    return [_stem(t) for t in _WORD_RE.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(v * b.get(k, 0) for k, v in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def bm25_scores(doc_terms: List[List[str]], query_weights: Dict[str, float],
+                k1: float = 1.5, b: float = 0.75) -> List[float]:
+    n = len(doc_terms)
+    if n == 0:
+        return []
+    df = Counter(t for terms in doc_terms for t in set(terms))
+    avgdl = sum(len(terms) for terms in doc_terms) / n or 1.0
+    idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in query_weights if t in df}
+
+    scores = []
+    for terms in doc_terms:
+        tf = Counter(terms)
+        norm = k1 * (1 - b + b * len(terms) / avgdl)
+        scores.append(sum(
+            weight * idf[t] * tf[t] * (k1 + 1) / (tf[t] + norm)
+            for t, weight in query_weights.items() if t in idf and tf.get(t)
+        ))
+    return scores
+
+
+def _render(doc: Dict[str, Any], body: str) -> str:
+    header = f"[{doc.get('id', '')}] {doc.get('title') or 'Untitled'} | {doc.get('source', '')} | {doc.get('url', '')}"
+    lines = [header, body]
+    images = [img for img in (doc.get("images") or []) if isinstance(img, str)][:2]
+    if images:
+        lines.append("images: " + ", ".join(images))
+    return "\n".join(lines)
+
+
+def _emitted_keys(sentences: List[str], keys: List[str], length: int) -> List[str]:
+    """Keys of the sentences that fit whole in the first `length` chars of " ".join(sentences)."""
+    emitted = []
+    end = -1
+    for sentence, key in zip(sentences, keys):
+        end += 1 + len(sentence)
+        if end > length:
+            break
+        if key:
+            emitted.append(key)
+    return emitted
+
+
+def rank_documents(documents: List[Dict[str, Any]], topic: str,
+                   queries: Optional[Iterable[str]] = None) -> List[Tuple[float, int]]:
+    """(score, index) pairs, best first. Topic terms weigh 1.0, plan-query terms 0.5."""
+    weights: Dict[str, float] = {}
+    for query in queries or []:
+        for t in _terms(query):
+            weights[t] = max(weights.get(t, 0.0), 0.5)
+    for t in _terms(topic):
+        weights[t] = 1.0
+
+    doc_terms = [_terms(f"{d.get('title', '')} {d.get('summary', '')}") for d in documents]
+    scores = bm25_scores(doc_terms, weights)
+    # Provider relevance (e.g. Tavily's score) only breaks near-ties.
+    ranked = [(s + 0.1 * float(documents[i].get("score") or 0.0), i) for i, s in enumerate(scores)]
+    ranked.sort(key=lambda pair: (-pair[0], pair[1]))
+    return ranked
+
+
+def pack_documents(documents: List[Dict[str, Any]], topic: str, queries: Optional[Iterable[str]] = None,
+                   token_budget: int = 6000, max_doc_chars: int = 1500,
+                   redundancy_threshold: float = 0.85) -> Tuple[str, List[str]]:
+    """
+    Return (packed context text, ids of the documents included).
+    """
+    ranked = rank_documents(documents, topic, queries)
+    vectors = [Counter(_terms(d.get("summary", ""))) for d in documents]
+
+    blocks: List[str] = []
+    included: List[str] = []
+    chosen: List[int] = []
+    seen_sentences = set()
+    remaining = token_budget
+
+    for _, idx in ranked:
+        if remaining <= 0:
+            break
+        if any(_cosine(vectors[idx], vectors[j]) >= redundancy_threshold for j in chosen):
+            continue
+
+        doc = documents[idx]
+        sentences, keys = [], []
+        for sentence in _SENTENCE_RE.split(" ".join((doc.get("summary") or "").split())):
+            key = " ".join(_terms(sentence))
+            if key and (key in seen_sentences or key in keys):
+                continue  # passage already included from another document
+            sentences.append(sentence)
+            keys.append(key)
+        body = " ".join(sentences)[:max_doc_chars]
+        if not body.strip():
+            continue
+
+        block = _render(doc, body)
+        cost = estimate_tokens(block) + 1
+        if cost > remaining:
+            # Truncate the last document to fit if a useful amount of room is left.
+            spare_chars = (remaining - estimate_tokens(_render(doc, ""))) * CHARS_PER_TOKEN
+            if spare_chars < 200:
+                break
+            body = body[:spare_chars]
+            block = _render(doc, body)
+            cost = estimate_tokens(block) + 1
+
+        # Only sentences that made it into the block (whole) hide their copies elsewhere.
+        seen_sentences.update(_emitted_keys(sentences, keys, len(body)))
+        blocks.append(block)
+        included.append(doc.get("id", ""))
+        chosen.append(idx)
+        remaining -= cost
+
+    return "\n\n".join(blocks), included
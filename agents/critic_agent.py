@@ -1,11 +1,16 @@
 # Create this file: insightbridge/agents/critic_agent.py
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from agents.llm_factory import agent_llm  # built on first use from models: in config.yml
 from orchestrator.state import AgentState
+from agents.critic_prescreen import prescreen_draft, critique_from_issues
+from mcp.governor import get_governor  # config.yml holds the pre-screen thresholds
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
 
 # Initialize the LLM (Gemini)
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", temperature=0.0)
+llm = agent_llm("critic")
 
 critic_prompt = ChatPromptTemplate.from_template(
     """
@@ -25,21 +30,64 @@ critic_prompt = ChatPromptTemplate.from_template(
     """
 )
 
+def _prescreen(state: AgentState):
+    """
+    Run the rule-based pre-screen. Returns (decision, critique or None);
+    a None critique means the draft is borderline and needs the LLM critic.
+    """
+    settings = (get_governor().config.get("critic") or {}).get("prescreen") or {}
+    if not settings.get("enabled", True):
+        return {"mode": "llm", "verdict": "escalate"}, None
+
+    decision = prescreen_draft(state['draft_report'], state.get('documents', []), settings)
+    log.info(f"[CriticAgent] Pre-screen score {decision['score']} -> {decision['verdict']}")
+    if decision["verdict"] == "approve":
+        return {"mode": "rules", **decision}, "APPROVED"
+    if decision["verdict"] == "reject":
+        return {"mode": "rules", **decision}, critique_from_issues(decision["issues"])
+    return {"mode": "llm", **decision}, None
+
+
 def run_critic_node(state: AgentState) -> dict:
     """
     This node runs the critique and decides if the report is good enough.
+    Clear cases are settled by the rule-based pre-screen; only borderline
+    drafts reach the LLM.
     """
-    print(f"\n--- [Node: CriticAgent] ---")
+    log.info("[Node: CriticAgent]")
     draft_report = state['draft_report']
-    
-    # Create the chain
-    chain = critic_prompt | llm
-    
-    print("Critiquing draft report...")
-    critique = chain.invoke({"draft_report": draft_report}).content
-    
-    print(f"Critique: {critique}")
-    
+
+    decision, critique = _prescreen(state)
+    if critique is None:
+        # Create the chain
+        chain = critic_prompt | llm
+
+        log.info("[CriticAgent] Critiquing draft report...")
+        critique = chain.invoke({"draft_report": draft_report}).content
+
+    log.info(f"[CriticAgent] Critique: {critique}", mode=decision["mode"])
+
+    return {
+        "critique": critique,
+        "critic_decision": decision
+    }
+
+
+async def arun_critic_node(state: AgentState) -> dict:
+    """Async twin of run_critic_node (used by app_graph.ainvoke / astream)."""
+    log.info("[Node: CriticAgent]")
+    draft_report = state['draft_report']
+
+    decision, critique = _prescreen(state)
+    if critique is None:
+        chain = critic_prompt | llm
+
+        log.info("[CriticAgent] Critiquing draft report...")
+        critique = (await chain.ainvoke({"draft_report": draft_report})).content
+
+    log.info(f"[CriticAgent] Critique: {critique}", mode=decision["mode"])
+
     return {
-        "critique": critique
-    }
\ No newline at end of file
+        "critique": critique,
+        "critic_decision": decision
+    }
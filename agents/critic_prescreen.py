@@ -0,0 +1,120 @@
+# stratos/agents/critic_prescreen.py
+"""
+Rule-based pre-screen in front of the CriticAgent LLM.
+
+Scores a draft on three checks:
+  - completeness: required sections are present with enough items,
+  - citations:    share of trend/opportunity/risk points citing a real doc id,
+  - length:       executive summary and points are not stubs.
+
+Clear passes are approved and clear failures rejected without an LLM call;
+only the borderline band in between is escalated to Gemini.
+"""
+
+import json
+from typing import Any, Dict, List
+
+DEFAULTS = {
+    "approve_above": 0.85,
+    "reject_below": 0.4,
+    "min_summary_chars": 200,
+    "min_item_chars": 30,
+    "min_items_per_section": 2,
+    "required_sections": ["executive_summary", "market_trends", "opportunities", "risks", "recommendations"],
+    "weights": {"completeness": 0.4, "citations": 0.35, "length": 0.25},
+}
+
+_CITED_SECTIONS = ("market_trends", "opportunities", "risks")
+
+
+def _item_text(item: Any) -> str:
+    if isinstance(item, dict):
+        return " ".join(str(v) for k, v in item.items() if k != "citations" and isinstance(v, str))
+    return str(item)
+
+
+def prescreen_draft(draft_report: Any, documents: List[Dict[str, Any]], settings: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Return {"verdict": "approve" | "reject" | "escalate", "score": 0..1,
+            "checks": {...}, "issues": [...]}.
+    """
+    rules = {**DEFAULTS, **(settings or {})}
+    weights = {**DEFAULTS["weights"], **(rules.get("weights") or {})}
+    issues: List[str] = []
+
+    try:
+        draft = json.loads(draft_report) if isinstance(draft_report, str) else dict(draft_report)
+    except Exception:
+        return {"verdict": "reject", "score": 0.0, "checks": {}, "issues": ["The draft is not valid JSON."]}
+
+    doc_ids = {d.get("id") for d in documents or [] if d.get("id")}
+    if not doc_ids:
+        issues.append("No research documents were collected, so the draft has nothing to stand on.")
+
+    # 1. Completeness
+    missing = []
+    for section in rules["required_sections"]:
+        value = draft.get(section)
+        if isinstance(value, list):
+            if len(value) < int(rules["min_items_per_section"]):
+                missing.append(section)
+        elif not (isinstance(value, str) and value.strip()):
+            missing.append(section)
+    completeness = 1 - len(missing) / max(1, len(rules["required_sections"]))
+    if missing:
+        issues.append(f"Sections missing or too thin: {', '.join(s.replace('_', ' ') for s in missing)}.")
+
+    # 2. Citation coverage
+    points = [item for section in _CITED_SECTIONS for item in (draft.get(section) or [])]
+    cited = 0
+    unknown = set()
+    for item in points:
+        citations = item.get("citations") if isinstance(item, dict) else None
+        citations = [c for c in citations or [] if isinstance(c, str)]
+        if any(c in doc_ids for c in citations):
+            cited += 1
+        unknown.update(c for c in citations if c not in doc_ids)
+    citations_score = cited / len(points) if points else 0.0
+    if points and citations_score < 0.5:
+        issues.append("Most points do not cite a research document.")
+    if unknown:
+        issues.append(f"{len(unknown)} citation ids do not match any research document.")
+
+    # 3. Minimum lengths
+    summary_len = len((draft.get("executive_summary") or "").strip())
+    long_enough = [len(_item_text(item).strip()) >= int(rules["min_item_chars"]) for item in points]
+    summary_ok = min(1.0, summary_len / max(1, int(rules["min_summary_chars"])))
+    items_ok = sum(long_enough) / len(long_enough) if long_enough else 0.0
+    length_score = (summary_ok + items_ok) / 2
+    if summary_len < int(rules["min_summary_chars"]):
+        issues.append("The executive summary is too short.")
+
+    score = (weights["completeness"] * completeness
+             + weights["citations"] * citations_score
+             + weights["length"] * length_score)
+    if not doc_ids:
+        score = 0.0
+    score = round(score, 3)
+
+    if score >= float(rules["approve_above"]):
+        verdict = "approve"
+    elif score < float(rules["reject_below"]):
+        verdict = "reject"
+    else:
+        verdict = "escalate"
+
+    return {
+        "verdict": verdict,
+        "score": score,
+        "checks": {
+            "completeness": round(completeness, 3),
+            "citations": round(citations_score, 3),
+            "length": round(length_score, 3),
+        },
+        "issues": issues,
+    }
+
+
+def critique_from_issues(issues: List[str]) -> str:
+    """A short critique in the same register as the LLM critic's."""
+    return " ".join(issues[:2]) or "The draft is too shallow."
@@ -0,0 +1,73 @@
+# stratos/agents/critique_repair.py
+"""
+Turns a CriticAgent critique into a few supplemental research steps.
+
+On a "revise" loop the ResearchAgent runs only these steps and merges the
+hits into the documents it already has, instead of re-running the whole
+plan. Query building is deterministic (no extra LLM call): each critique
+sentence contributes its content words, appended to the topic.
+"""
+
+import re
+from typing import Any, Dict, List
+
+from orchestrator.state import PlanStep
+
+# Words that describe the critique itself rather than what to search for.
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "for", "with", "by", "at", "from",
+    "as", "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those",
+    "there", "their", "they", "which", "what", "who", "how", "why", "not", "no", "any", "some",
+    "should", "must", "needs", "need", "could", "would", "also", "more", "most", "very", "too",
+    "report", "draft", "section", "sections", "analysis", "missing", "lacks", "lack", "lacking",
+    "include", "includes", "including", "identify", "specific", "specifically", "detail", "details",
+    "detailed", "generic", "vague", "shallow", "depth", "insight", "insights", "overall", "provide",
+    "provides", "add", "adding", "does", "do", "e", "g", "eg", "etc", "such", "like", "about",
+    "approved", "however", "only", "well", "better", "example", "examples",
+    # phrasing used by the rule-based pre-screen (agents/critic_prescreen.py)
+    "thin", "short", "points", "point", "cite", "citation", "citations", "ids", "id", "match",
+    "research", "document", "documents", "executive", "summary", "stand", "nothing", "collected",
+}
+_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9&+\-']*")
+
+
+def critique_to_queries(topic: str, critique: str, max_queries: int = 2, max_terms: int = 6) -> List[str]:
+    """
+    "The risk section is too generic. It needs to identify specific market competitors."
+    -> ["<topic> risk", "<topic> market competitors"]
+    """
+    topic_words = {w.casefold() for w in _WORD_RE.findall(topic)}
+    queries: List[str] = []
+    for sentence in re.split(r"[.!?;\n]+", critique or ""):
+        terms: List[str] = []
+        for word in _WORD_RE.findall(sentence):
+            folded = word.casefold()
+            if folded in _STOPWORDS or folded in topic_words or len(folded) < 2:
+                continue
+            if folded not in (t.casefold() for t in terms):
+                terms.append(word)
+        if not terms:
+            continue
+        query = f"{topic} {' '.join(terms[:max_terms])}"
+        if query not in queries:
+            queries.append(query)
+        if len(queries) >= max_queries:
+            break
+
+    return queries or [f"{topic} latest developments"]
+
+
+def repair_plan(topic: str, critique: str, settings: Dict[str, Any]) -> List[PlanStep]:
+    """Supplemental plan steps for a critique, spreading queries across the configured tools."""
+    tools = settings.get("tools") or ["tavily_search"]
+    queries = critique_to_queries(topic, critique, int(settings.get("max_queries", 2)))
+    return [
+        {
+            "step_id": f"repair_{idx + 1}",
+            "description": "Fill gap raised by critique",
+            "tool": tools[idx % len(tools)],
+            "query": query,
+            "include_images": False
+        }
+        for idx, query in enumerate(queries)
+    ]
@@ -0,0 +1,321 @@
+# stratos/agents/llm_cache.py
+"""
+Content-addressed cache for LLM responses, shared by all agents.
+
+- Keys are a hash of the model name, temperature and the fully rendered
+  prompt (message roles + text), so any change to a prompt template or
+  its inputs is a new entry.
+- Each agent can be switched on/off and given its own TTL
+  (llm_cache.agents in config.yml).
+- Modes:
+    off          never read or write the cache
+    read_write   serve hits, call the LLM on a miss and store the answer
+    replay       serve hits only; a miss raises LLMCacheMiss instead of
+                 calling the LLM (deterministic, offline runs: the model
+                 client is never built, so no API key is needed)
+  STRATOS_LLM_CACHE_MODE overrides the configured mode.
+
+Agents keep their `prompt | llm` chains; `cached_llm(llm, agent)` returns
+a drop-in runnable that sits where the model used to be. `llm` may be a
+LazyLLM, which is only built on the first cache miss.
+
+An agent that parses its model's answer passes `validate=`: a response is
+only stored once validate(content) accepts it (returns without raising),
+and a cached response it rejects is dropped and fetched again. A one-off
+malformed answer is then retried on the next run instead of being replayed
+for the whole TTL.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from mcp.governor import get_governor  # config.yml is loaded by the governor
+from mcp.storage import cache_path
+from telemetry.log import get_logger
+from telemetry.tracing import payload_size, span
+
+log = get_logger(__name__)
+
+MODES = ("off", "read_write", "replay")
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+def _resolve(llm: Any) -> Any:
+    from agents.llm_factory import LazyLLM
+
+    return llm.get() if isinstance(llm, LazyLLM) else llm
+
+
+def _model_params(llm: Any) -> Tuple[str, Optional[float]]:
+    """(model, temperature) for cache keys. A LazyLLM answers from config, without building its client."""
+    from agents.llm_factory import LazyLLM
+
+    if isinstance(llm, LazyLLM):
+        params = llm.params()
+        if params is not None:
+            return params
+        llm = llm.get()
+    llm = getattr(llm, "runnable", llm)  # key on the primary model of a with_fallbacks() chain
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+    temperature = getattr(llm, "temperature", None)
+    return str(model), temperature
+
+
+def _render(prompt_value: Any) -> list:
+    """Turn a PromptValue / message list / string into [[role, text], ...]."""
+    if hasattr(prompt_value, "to_messages"):
+        messages = prompt_value.to_messages()
+    elif isinstance(prompt_value, (list, tuple)):
+        messages = prompt_value
+    else:
+        return [["human", str(prompt_value)]]
+    return [[getattr(m, "type", "human"), str(getattr(m, "content", m))] for m in messages]
+
+
+class LLMCache:
+    def __init__(self, path: str, mode: str = "read_write", default_ttl_s: float = 7 * 24 * 3600,
+                 agents: Optional[Dict[str, Dict[str, Any]]] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown llm_cache mode '{mode}', expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.default_ttl_s = default_ttl_s
+        self.agents = agents or {}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                agent TEXT NOT NULL,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        # In-process counters, per agent: {"planner": {"hits": 1, "misses": 0, "stores": 0}}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    # --- Helpers ---
+    def enabled_for(self, agent: str) -> bool:
+        return self.mode != "off" and (self.agents.get(agent) or {}).get("enabled", True)
+
+    def ttl_for(self, agent: str) -> float:
+        return float((self.agents.get(agent) or {}).get("ttl_s", self.default_ttl_s))
+
+    @staticmethod
+    def make_key(model: str, temperature: Optional[float], messages: list) -> str:
+        payload = json.dumps([model, temperature, messages], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, agent: str, field: str) -> None:
+        counters = self._counters.setdefault(agent, {"hits": 0, "misses": 0, "stores": 0})
+        counters[field] += 1
+
+    # --- Public API ---
+    def get(self, agent: str, key: str) -> Tuple[bool, Optional[str]]:
+        """Return (hit, content). Expired rows count as misses (replay mode ignores expiry)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.mode != "replay" and row[1] < time.time()):
+                self._count(agent, "misses")
+                return False, None
+            self._count(agent, "hits")
+        return True, row[0]
+
+    def set(self, agent: str, key: str, model: str, content: str) -> bool:
+        if self.mode != "read_write" or not content:
+            return False
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, agent, model, content, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, agent, model, content, now, now + self.ttl_for(agent)),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            self._conn.commit()
+            self._count(agent, "stores")
+        return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            per_agent = {agent: dict(counters) for agent, counters in self._counters.items()}
+        hits = sum(c["hits"] for c in per_agent.values())
+        misses = sum(c["misses"] for c in per_agent.values())
+        return {
+            "mode": self.mode,
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "agents": per_agent,
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_loaded = False
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """The shared LLMCache built from llm_cache: in config.yml (None if disabled)."""
+    global _cache, _cache_loaded
+    if not _cache_loaded:
+        with _cache_lock:
+            if not _cache_loaded:
+                rules = get_governor().config.get("llm_cache") or {}
+                mode = os.getenv("STRATOS_LLM_CACHE_MODE") or rules.get("mode")
+                if mode is None:
+                    mode = "read_write" if rules.get("enabled", False) else "off"
+                if mode != "off":
+                    _cache = LLMCache(
+                        path=cache_path(rules.get("path", "llm_cache.sqlite3")),
+                        mode=mode,
+                        default_ttl_s=float(rules.get("default_ttl_s", 7 * 24 * 3600)),
+                        agents=rules.get("agents") or {},
+                    )
+                _cache_loaded = True
+    return _cache
+
+
+def _accepts(validate: Optional[Callable[[str], Any]], agent: str, content: str) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(content)
+        return True
+    except Exception as e:
+        log.info(f"[LLMCache] Not caching {agent} response that failed validation: {e}")
+        return False
+
+
+def _lookup(llm: Any, agent: str, prompt_value: Any, validate: Optional[Callable[[str], Any]] = None):
+    """Return (cache, key, model, cached AIMessage or None)."""
+    cache = get_llm_cache()
+    if cache is None or not cache.enabled_for(agent) or get_governor().cassette is not None:
+        return None, None, None, None
+    model, temperature = _model_params(llm)
+    key = cache.make_key(model, temperature, _render(prompt_value))
+    hit, content = cache.get(agent, key)
+    if hit and cache.mode != "replay" and not _accepts(validate, agent, content):
+        cache.delete(key)  # stored before validation existed, or by a laxer validator
+        hit = False
+    if hit:
+        return cache, key, model, AIMessage(content=content)
+    if cache.mode == "replay":
+        raise LLMCacheMiss(f"No recorded {agent} response for prompt {key[:12]} (llm_cache mode: replay)")
+    return cache, key, model, None
+
+
+def _store(cache: Optional[LLMCache], agent: str, key: str, model: str, message: Any,
+           validate: Optional[Callable[[str], Any]] = None) -> None:
+    content = getattr(message, "content", message)
+    if cache is not None and isinstance(content, str) and content and _accepts(validate, agent, content):
+        cache.set(agent, key, model, content)
+
+
+def _start_span(sp, llm: Any, cache: Optional[LLMCache], model: Optional[str], cached: Any) -> None:
+    cassette = get_governor().cassette
+    if cassette is not None:
+        # A replayed call never builds the real model (no API key needed).
+        sp.set(cassette=cassette.mode)
+        if cassette.mode == "replay":
+            model = model or "cassette"
+    sp.set(model=model or _model_params(llm)[0],
+           cache="off" if cache is None else ("hit" if cached is not None else "miss"))
+
+
+def _end_span(sp, message: Any) -> None:
+    usage = getattr(message, "usage_metadata", None) or {}
+    sp.set(output_bytes=payload_size(getattr(message, "content", message)),
+           input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+
+
+def _encode(message: Any) -> Dict[str, Any]:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return {"content": getattr(message, "content", message),
+            "usage": {k: usage[k] for k in ("input_tokens", "output_tokens", "total_tokens") if k in usage} or None}
+
+
+def _decode(data: Dict[str, Any]) -> AIMessage:
+    return AIMessage(content=data["content"], usage_metadata=data.get("usage") or None)
+
+
+def cached_llm(llm: Any, agent: str, validate: Optional[Callable[[str], Any]] = None) -> RunnableLambda:
+    """
+    Wrap a chat model so `prompt | cached_llm(llm, "planner")` memoizes its
+    answers (only those `validate` accepts, if given). Every call, hit or miss, is traced as an "llm" span, and calls
+    that reach the model are recorded to / replayed from the cassette when
+    one is active (see mcp/cassette.py).
+    """
+
+    def call_model(prompt_value: Any) -> Any:
+        cassette = get_governor().cassette
+        if cassette is None:
+            return _resolve(llm).invoke(prompt_value)
+        return cassette.call("llm", agent, _render(prompt_value),
+                             lambda: _resolve(llm).invoke(prompt_value), _encode, _decode)
+
+    async def acall_model(prompt_value: Any) -> Any:
+        cassette = get_governor().cassette
+        if cassette is None:
+            return await _resolve(llm).ainvoke(prompt_value)
+        return await cassette.acall("llm", agent, _render(prompt_value),
+                                    lambda: _resolve(llm).ainvoke(prompt_value), _encode, _decode)
+
+    def invoke(prompt_value: Any) -> Any:
+        with span("llm", agent, input_bytes=payload_size(_render(prompt_value))) as sp:
+            cache, key, model, cached = _lookup(llm, agent, prompt_value, validate)
+            _start_span(sp, llm, cache, model, cached)
+            if cached is not None:
+                message = cached
+            else:
+                message = call_model(prompt_value)
+                _store(cache, agent, key, model, message, validate)
+            _end_span(sp, message)
+            return message
+
+    async def ainvoke(prompt_value: Any) -> Any:
+        with span("llm", agent, input_bytes=payload_size(_render(prompt_value))) as sp:
+            cache, key, model, cached = _lookup(llm, agent, prompt_value, validate)
+            _start_span(sp, llm, cache, model, cached)
+            if cached is not None:
+                message = cached
+            else:
+                message = await acall_model(prompt_value)
+                _store(cache, agent, key, model, message, validate)
+            _end_span(sp, message)
+            return message
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=f"{agent}_llm")
@@ -0,0 +1,138 @@
+# stratos/agents/llm_factory.py
+"""
+Builds each agent's chat model from `models:` in config.yml.
+
+Settings are resolved per agent as
+    models.defaults  <-  models.agents.<agent>  <-  models.profiles.<profile>.<agent>
+where the active profile comes from STRATOS_MODEL_PROFILE or
+models.profile. A profile entry may name a `fallback` model: if the
+primary model times out (or the backend reports a server-side deadline),
+the same prompt is retried once on the fallback.
+
+Agents hold a LazyLLM (see agent_llm), so no client is constructed, and
+no API key is needed, until an agent actually calls its model.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from mcp.governor import get_governor
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_MODEL = "gemini-2.5-pro"
+
+
+def _fallback_errors() -> tuple:
+    try:  # google-genai reports 5xx / DEADLINE_EXCEEDED as ServerError
+        from google.genai.errors import ServerError
+    except ImportError:  # pragma: no cover - older SDKs
+        ServerError = None
+    return tuple(e for e in (TimeoutError, httpx.TimeoutException, ServerError) if e is not None)
+
+
+def active_profile() -> str:
+    rules = get_governor().config.get("models") or {}
+    return os.getenv("STRATOS_MODEL_PROFILE") or rules.get("profile") or "default"
+
+
+def model_settings(agent: str, profile: Optional[str] = None) -> Dict[str, Any]:
+    """Merged model settings for an agent under a profile (default: the active one)."""
+    rules = get_governor().config.get("models") or {}
+    settings = {"model": DEFAULT_MODEL}
+    settings.update(rules.get("defaults") or {})
+    settings.update((rules.get("agents") or {}).get(agent) or {})
+    overrides = (rules.get("profiles") or {}).get(profile or active_profile()) or {}
+    settings.update(overrides.get(agent) or {})
+    return settings
+
+
+def _chat_model(settings: Dict[str, Any], model: str):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    kwargs = {"model": model, "temperature": settings.get("temperature", 0.2)}
+    if settings.get("timeout_s") is not None:
+        kwargs["timeout"] = float(settings["timeout_s"])
+    if settings.get("max_output_tokens") is not None:
+        kwargs["max_output_tokens"] = int(settings["max_output_tokens"])
+    if settings.get("max_retries") is not None:
+        kwargs["max_retries"] = int(settings["max_retries"])
+    return ChatGoogleGenerativeAI(**kwargs)
+
+
+def build_llm(agent: str) -> Any:
+    """The chat model (with timeout fallback, if configured) for an agent."""
+    settings = model_settings(agent)
+    llm = _chat_model(settings, settings["model"])
+    fallback = settings.get("fallback")
+    if fallback and fallback != settings["model"]:
+        # The fallback runs with the agent's profile-free settings (its normal timeout).
+        fallback_llm = _chat_model(model_settings(agent, profile="default"), fallback)
+        log.info(f"[Models] {agent}: {settings['model']}", fallback=fallback, profile=active_profile())
+        return llm.with_fallbacks([fallback_llm], exceptions_to_handle=_fallback_errors())
+    log.info(f"[Models] {agent}: {settings['model']}", profile=active_profile())
+    return llm
+
+
+class LazyLLM:
+    """An agent's model, built by build_llm() on first use."""
+
+    def __init__(self, agent: str):
+        self.agent = agent
+        self._llm = None
+        self._overridden = False  # set_agent_llm() installed a model not built from config
+        self._lock = threading.Lock()
+
+    def params(self) -> Optional[Tuple[str, Optional[float]]]:
+        """
+        (model, temperature) from config, without building the client (so
+        LLM cache lookups need no API key). None if set_agent_llm() installed
+        a model of its own: inspect that model instead.
+        """
+        if self._overridden:
+            return None
+        settings = model_settings(self.agent)
+        return str(settings["model"]), settings.get("temperature", 0.2)
+
+    def get(self) -> Any:
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = build_llm(self.agent)
+        return self._llm
+
+
+_agent_llms: Dict[str, LazyLLM] = {}
+
+
+def agent_llm(agent: str, validate=None):
+    """
+    The (lazily built, response-cached) model runnable for `prompt | llm`
+    chains. `validate(content)` should raise for answers the agent cannot
+    use, so they are never cached (see agents/llm_cache.py).
+    """
+    from agents.llm_cache import cached_llm
+
+    lazy = _agent_llms.setdefault(agent, LazyLLM(agent))
+    return cached_llm(lazy, agent, validate)
+
+
+def set_agent_llm(agent: str, llm: Any) -> None:
+    """
+    Use `llm` as an agent's model instead of building one from config
+    (offline benchmarks, tests). The response cache and tracing still apply.
+    """
+    lazy = _agent_llms.setdefault(agent, LazyLLM(agent))
+    with lazy._lock:
+        lazy._llm = llm
+        lazy._overridden = True
+
+
+def warm_up_llms() -> None:
+    """Build every agent model registered so far (startup warm-up)."""
+    for lazy in list(_agent_llms.values()):
+        lazy.get()
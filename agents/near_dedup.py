@@ -0,0 +1,132 @@
+# stratos/agents/near_dedup.py
+"""
+Near-duplicate detection for research documents (MinHash + LSH).
+
+Syndicated news (GNews), mirrored pages (Tavily) and arXiv abstracts
+reposted on blogs arrive as different documents with almost the same
+text. Each document gets a MinHash signature over word shingles; LSH
+banding puts likely duplicates in the same bucket, so only bucket-mates
+are compared and the work stays sub-linear in the number of documents.
+Documents with the same normalized title are candidates too, since LSH
+can miss a pair, but every candidate must clear the estimated Jaccard
+threshold: generic or recurring titles are not evidence on their own.
+Matches are clustered with union-find. One representative per cluster
+survives: highest score, then richest content, then earliest position.
+Documents listed in keep_ids (already cited ids) always survive.
+"""
+
+import re
+import zlib
+from collections import defaultdict
+from typing import Any, Collection, Dict, List
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: h(x) = ((a * x + b) mod 2^64) >> 32, with odd a.
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.casefold())
+        k = self.shingle_size
+        grams = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _MASK32, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self.a) + self.b) >> np.uint64(32)
+        return permuted.min(axis=0)
+
+
+def _title_key(title: str) -> str:
+    return " ".join(_WORD_RE.findall((title or "").casefold()))
+
+
+def near_duplicate_clusters(documents: List[Dict[str, Any]], threshold: float = 0.6,
+                            num_perm: int = 64, bands: int = 16, shingle_size: int = 3) -> List[List[int]]:
+    """Group document indexes into clusters of near-duplicates (singletons included)."""
+    n = len(documents)
+    if n < 2:
+        return [[i] for i in range(n)]
+
+    hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+    signatures = np.stack([hasher.signature(d.get("summary") or "") for d in documents])
+    rows = max(1, num_perm // bands)
+    uf = _UnionFind(n)
+
+    # Candidate generation: same LSH band bucket, or same normalized title.
+    buckets: Dict[Any, List[int]] = defaultdict(list)
+    for i in range(n):
+        for band in range(bands):
+            buckets[(band, signatures[i, band * rows:(band + 1) * rows].tobytes())].append(i)
+        title = _title_key(documents[i].get("title", ""))
+        if len(title) > 20:  # short titles ("PDF Snippet", "Webpage Content") are not evidence
+            buckets[("title", title)].append(i)
+
+    checked = set()
+    for key, members in buckets.items():
+        if len(members) < 2:
+            continue
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if float(np.mean(signatures[i] == signatures[j])) >= threshold:
+                    uf.union(i, j)
+
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for i in range(n):
+        clusters[uf.find(i)].append(i)
+    return sorted(clusters.values(), key=lambda c: c[0])
+
+
+def near_dedupe(documents: List[Dict[str, Any]], threshold: float = 0.6, num_perm: int = 64,
+                bands: int = 16, shingle_size: int = 3, keep_ids: Collection[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Keep one representative per near-duplicate cluster, in original order.
+    A cluster holding documents whose id is in keep_ids keeps all of those
+    (and only those) instead.
+    """
+    clusters = near_duplicate_clusters(documents, threshold, num_perm, bands, shingle_size)
+    keep = []
+    for members in clusters:
+        pinned = [i for i in members if documents[i].get("id") in keep_ids]
+        if pinned:
+            keep.extend(pinned)
+            continue
+        best = max(members, key=lambda i: (
+            float(documents[i].get("score") or 0.0),
+            len(documents[i].get("summary") or ""),
+            -i,
+        ))
+        keep.append(best)
+    return [documents[i] for i in sorted(keep)]
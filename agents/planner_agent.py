@@ -6,12 +6,12 @@ It returns a list of PlanStep objects (matching orchestrator.state.PlanStep).
 
 from typing import List, Dict
 from orchestrator.state import PlanStep, AgentState
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from agents.llm_factory import agent_llm  # built on first use from models: in config.yml
 import uuid
+from telemetry.log import get_logger
 
-# LLM loaded once
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", temperature=0.2)
+log = get_logger(__name__)
 
 planner_prompt = ChatPromptTemplate.from_template(
     """
@@ -31,19 +31,19 @@ planner_prompt = ChatPromptTemplate.from_template(
     """
 )
 
-def run_planner_node(state: AgentState) -> Dict:
-    topic = state['topic']
-    print(f"\n--- [Node: PlannerAgent] ---")
-    print(f"Topic: {topic}")
+def _load_plan(response: str) -> list:
+    """The model's plan as a list of step dicts; raises ValueError if it is not one."""
+    import json
+    plan_raw = json.loads(response)
+    if not isinstance(plan_raw, list) or not plan_raw or not all(isinstance(p, dict) for p in plan_raw):
+        raise ValueError("plan is not a non-empty JSON array of steps")
+    return plan_raw
 
-    chain = planner_prompt | llm
-    print("Generating plan...")
-    response = chain.invoke({"topic": topic}).content
 
+def _parse_plan(response: str, topic: str) -> List[PlanStep]:
     # Try to parse JSON. If LLM fails, fall back to a simple deterministic plan.
-    import json
     try:
-        plan_raw = json.loads(response)
+        plan_raw = _load_plan(response)
         # Normalize to ensure step_id exists
         plan: List[PlanStep] = []
         for idx, p in enumerate(plan_raw):
@@ -56,15 +56,42 @@ def run_planner_node(state: AgentState) -> Dict:
                 "include_images": bool(p.get("include_images", False))
             })
     except Exception as e:
-        print(f"[PlannerAgent] LLM plan parse failed: {e}\nFalling back to default plan.")
+        log.warning(f"[PlannerAgent] LLM plan parse failed: {e}. Falling back to default plan.")
         plan = [
             {"step_id": "tavily_basic", "description": "Search general web articles", "tool": "tavily_search", "query": topic, "include_images": True},
             {"step_id": "gnews", "description": "Fetch recent news", "tool": "gnews", "query": topic, "include_images": False},
             {"step_id": "arxiv", "description": "Find academic papers", "tool": "arxiv_search", "query": f"{topic} review OR survey", "include_images": False}
         ]
+    return plan
+
+
+# LLM built once, on first use; only plans that parse are cached
+llm = agent_llm("planner", validate=_load_plan)
+
+
+def run_planner_node(state: AgentState) -> Dict:
+    topic = state['topic']
+    log.info("[Node: PlannerAgent] Generating plan...", topic=topic)
+
+    chain = planner_prompt | llm
+    response = chain.invoke({"topic": topic}).content
 
     # Return updates to state
     return {
-        "plan": plan,
+        "plan": _parse_plan(response, topic),
+        "iteration_count": state.get("iteration_count", 0)
+    }
+
+
+async def arun_planner_node(state: AgentState) -> Dict:
+    """Async twin of run_planner_node (used by app_graph.ainvoke / astream)."""
+    topic = state['topic']
+    log.info("[Node: PlannerAgent] Generating plan...", topic=topic)
+
+    chain = planner_prompt | llm
+    response = (await chain.ainvoke({"topic": topic})).content
+
+    return {
+        "plan": _parse_plan(response, topic),
         "iteration_count": state.get("iteration_count", 0)
     }
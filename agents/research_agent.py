@@ -1,136 +1,377 @@
 # stratos/agents/research_agent.py
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from orchestrator.state import AgentState, PlanStep
-from mcp.governor import mcp_governor  # singleton that routes tool calls
+from mcp.governor import get_governor  # singleton that routes tool calls
+from agents.critique_repair import repair_plan
+from agents.near_dedup import near_dedupe
+from mcp.resilience import is_error_result
+from telemetry.log import get_logger
+import asyncio
+import contextvars
+import threading
+import time
 import uuid
-import pprint
 
-def run_researcher_node(state: AgentState) -> Dict[str, Any]:
+log = get_logger(__name__)
+
+
+def _tool_call(step: PlanStep, topic: str) -> Tuple[str, Any]:
+    """Build (tool_name, tool_input) for a single plan step, according to tool capabilities."""
+    tool_name = step.get("tool")
+    query = step.get("query", topic)
+    include_images = bool(step.get("include_images", False))
+
+    log.info(f"[ResearchAgent] Running tool {tool_name} for query '{query}'", include_images=include_images)
+
+    if tool_name in ("tavily_search",):
+        return tool_name, {"query": query, "include_images": include_images}
+
+    if tool_name in ("pdf_rag_query",):
+        # pdf_rag_query expects url + query - sometimes query is URL in plan
+        # Accept both: if query looks like a URL, treat as url param
+        if query.startswith("http://") or query.startswith("https://"):
+            return tool_name, {"url": query, "query": step.get("query", topic), "include_images": include_images}
+        return tool_name, {"url": step.get("url", ""), "query": query, "include_images": include_images}
+
+    # gnews, arxiv_search, read_webpage, etc. accept a single string argument
+    return tool_name, query
+
+
+def _normalize_hits(raw: Any, tool_name: str) -> List[Dict[str, Any]]:
     """
-    Execute plan steps (from PlannerAgent) by calling tools through MCPGovernor.
-    Return a list of citation objects in the unified format:
-      { id, title, url, summary, source, score, images }
+    Normalize a raw tool result into list[dict] unified format.
+    Acceptable raw forms:
+    - [] or list of dicts (preferred)
+    - list of strings
+    - single dict
+    - single string
     """
-    print(f"\n--- [Node: ResearchAgent] ---")
-    topic = state.get('topic', '')
-    plan: List[PlanStep] = state.get('plan', [])
-    print(f"Topic: {topic}")
-    print(f"Plan steps: {len(plan)}")
+    hits: List[Dict[str, Any]] = []
+
+    # If the governor returned an error string instead of raising, handle it
+    if isinstance(raw, str):
+        raw = [raw]
+
+    if isinstance(raw, list) and len(raw) > 0 and isinstance(raw[0], dict):
+        # Already good shape: list of dicts
+        return raw
+
+    # Convert list of strings or other items into dict entries
+    iterable = raw if isinstance(raw, list) else [raw]
+    for item in iterable:
+        # If item is dict-like but not the expected shape, gracefully map fields
+        if isinstance(item, dict):
+            hits.append({
+                "title": item.get("title", "") or item.get("heading", "") or "Untitled",
+                "url": item.get("url", "") or item.get("link", ""),
+                "content": item.get("content", "") or item.get("snippet", ""),
+                "source": item.get("source", tool_name),
+                "score": float(item.get("score", 0.0)) if item.get("score") is not None else 0.0,
+                "images": item.get("images", []) or []
+            })
+        else:
+            # string or other -> put into content
+            hits.append({
+                "title": f"Snippet from {tool_name}",
+                "url": "",
+                "content": str(item),
+                "source": tool_name,
+                "score": 0.0,
+                "images": []
+            })
+    return hits
+
+
+def _hits_to_docs(hits: List[Dict[str, Any]], tool_name: str) -> List[Dict[str, Any]]:
+    """Filter/clean hits and give each one a stable citation id."""
+    docs: List[Dict[str, Any]] = []
+    for hit in hits:
+        content = (hit.get("content") or "").strip()
+        # skip empty content
+        if not content:
+            continue
 
-    all_docs: List[Dict[str, Any]] = []
+        cid = str(uuid.uuid4())
+        docs.append({
+            "id": cid,
+            "title": (hit.get("title") or "")[:300],
+            "url": hit.get("url", ""),
+            "summary": content[:3000],
+            "source": hit.get("source", tool_name),
+            "score": float(hit.get("score", 0.0)) if hit.get("score") is not None else 0.0,
+            "images": hit.get("images", []) or []
+        })
+    return docs
 
+
+def _is_error_item(item: Any) -> bool:
+    if isinstance(item, dict):
+        return item.get("title") == "Error" or str(item.get("content") or "").startswith(("Error", "ERROR"))
+    return isinstance(item, str) and is_error_result(item)
+
+
+def _raw_to_docs(raw: Any, tool_name: str) -> List[Dict[str, Any]]:
+    # Failures come back as error strings / payloads (failed call, open circuit,
+    # deadline miss); they must never become citable documents.
+    if isinstance(raw, list):
+        errors = [item for item in raw if _is_error_item(item)]
+        if errors:
+            log.warning(f"[ResearchAgent] Tool {tool_name} returned an error: {str(errors[0])[:200]}")
+            raw = [item for item in raw if not _is_error_item(item)]
+            if not raw:
+                return []
+    if is_error_result(raw):
+        log.warning(f"[ResearchAgent] Tool {tool_name} failed: {str(raw)[:200]}")
+        return []
+    if not raw:
+        log.warning(f"[ResearchAgent] Tool {tool_name} returned no results.")
+        return []
+    return _hits_to_docs(_normalize_hits(raw, tool_name), tool_name)
+
+
+def _run_step(step: PlanStep, topic: str, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Run one plan step end-to-end and return its citation docs ([] on failure)."""
+    tool_name = step.get("tool")
+    try:
+        tool_name, tool_input = _tool_call(step, topic)
+        raw = get_governor().execute_tool("ResearchAgent", tool_name, tool_input, run_id=run_id)
+    except PermissionError as pe:
+        log.warning(f"[ResearchAgent] PERMISSION ERROR calling {tool_name}: {pe}")
+        return []
+    except Exception as e:
+        log.error(f"[ResearchAgent] ERROR calling {tool_name}: {e}")
+        return []
+
+    return _raw_to_docs(raw, tool_name)
+
+
+async def _arun_step(step: PlanStep, topic: str, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Async twin of _run_step."""
+    tool_name = step.get("tool")
+    try:
+        tool_name, tool_input = _tool_call(step, topic)
+        raw = await get_governor().aexecute_tool("ResearchAgent", tool_name, tool_input, run_id=run_id)
+    except PermissionError as pe:
+        log.warning(f"[ResearchAgent] PERMISSION ERROR calling {tool_name}: {pe}")
+        return []
+    except Exception as e:
+        log.error(f"[ResearchAgent] ERROR calling {tool_name}: {e}")
+        return []
+
+    return _raw_to_docs(raw, tool_name)
+
+
+def _run_steps_sequential(plan: List[PlanStep], topic: str, run_id: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+    return [_run_step(step, topic, run_id) for step in plan]
+
+
+def _run_steps_concurrent(plan: List[PlanStep], topic: str, settings: Dict[str, Any],
+                          run_id: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Run all plan steps at the same time, one thread per step.
+
+    - Each tool has its own semaphore (research.tool_concurrency in config.yml),
+      so e.g. two Tavily steps never hit the provider at once if its limit is 1.
+    - A step waits at most step_timeout_s for a slot, and its tool call is
+      abandoned once it has been running for step_timeout_s.
+    - Results are returned per step, in plan order.
+    """
+    step_timeout = float(settings.get("step_timeout_s", 30))
+    default_limit = int(settings.get("default_tool_concurrency", 2))
+    limits = settings.get("tool_concurrency") or {}
+
+    semaphores: Dict[str, threading.BoundedSemaphore] = {}
     for step in plan:
         tool_name = step.get("tool")
-        query = step.get("query", topic)
-        include_images = bool(step.get("include_images", False))
+        if tool_name not in semaphores:
+            semaphores[tool_name] = threading.BoundedSemaphore(max(1, int(limits.get(tool_name, default_limit))))
 
-        print(f"[ResearchAgent] Running tool {tool_name} for query '{query}' (images={include_images})")
+    started_at: Dict[int, float] = {}
 
-        # Build the tool_input according to tool capabilities
+    def worker(idx: int, step: PlanStep) -> List[Dict[str, Any]]:
+        semaphore = semaphores[step.get("tool")]
+        if not semaphore.acquire(timeout=step_timeout):
+            log.warning(f"[ResearchAgent] Step '{step.get('step_id')}' timed out waiting for a '{step.get('tool')}' slot.")
+            return []
         try:
-            if tool_name in ("tavily_search",):
-                tool_input = {"query": query, "include_images": include_images}
-                raw = mcp_governor.execute_tool("ResearchAgent", tool_name, tool_input)
-
-            elif tool_name in ("pdf_rag_query",):
-                # pdf_rag_query expects url + query - sometimes query is URL in plan
-                # Accept both: if query looks like a URL, treat as url param
-                if query.startswith("http://") or query.startswith("https://"):
-                    tool_input = {"url": query, "query": step.get("query", topic), "include_images": include_images}
-                else:
-                    tool_input = {"url": step.get("url", ""), "query": query, "include_images": include_images}
-                raw = mcp_governor.execute_tool("ResearchAgent", tool_name, tool_input)
-
-            else:
-                # gnews, arxiv_search, read_webpage, etc. accept a single string argument
-                raw = mcp_governor.execute_tool("ResearchAgent", tool_name, query)
-
-        except PermissionError as pe:
-            print(f"[ResearchAgent] PERMISSION ERROR calling {tool_name}: {pe}")
-            continue
-        except Exception as e:
-            print(f"[ResearchAgent] ERROR calling {tool_name}: {e}")
-            continue
+            started_at[idx] = time.monotonic()
+            return _run_step(step, topic, run_id)
+        finally:
+            semaphore.release()
 
-        # Normalize the result into list[dict] unified format
-        # Acceptable raw forms:
-        # - [] or list of dicts (preferred)
-        # - list of strings
-        # - single dict
-        # - single string
-        hits: List[Dict[str, Any]] = []
+    results: List[List[Dict[str, Any]]] = [[] for _ in plan]
+    executor = ThreadPoolExecutor(max_workers=len(plan), thread_name_prefix="research-step")
+    # Each step runs in a copy of this context, so its tool spans nest under the node's span.
+    futures = {executor.submit(contextvars.copy_context().run, worker, idx, step): idx
+               for idx, step in enumerate(plan)}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for fut in done:
+                idx = futures[fut]
+                try:
+                    results[idx] = fut.result()
+                except Exception as e:
+                    log.error(f"[ResearchAgent] ERROR in step '{plan[idx].get('step_id')}': {e}")
 
-        if not raw:
-            print(f"[ResearchAgent] Tool {tool_name} returned no results.")
-            continue
+            now = time.monotonic()
+            for fut in list(pending):
+                idx = futures[fut]
+                started = started_at.get(idx)
+                if started is not None and now - started > step_timeout:
+                    # The thread keeps running in the background; we just stop waiting for it.
+                    log.warning(f"[ResearchAgent] Step '{plan[idx].get('step_id')}' timed out after {step_timeout}s.")
+                    pending.discard(fut)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-        # If the governor returned an error string instead of raising, handle it
-        if isinstance(raw, str):
-            raw = [raw]
+    return results
 
-        if isinstance(raw, list) and len(raw) > 0 and isinstance(raw[0], dict):
-            # Already good shape: list of dicts
-            hits = raw
-        else:
-            # Convert list of strings or other items into dict entries
-            iterable = raw if isinstance(raw, list) else [raw]
-            for item in iterable:
-                # If item is dict-like but not the expected shape, gracefully map fields
-                if isinstance(item, dict):
-                    hits.append({
-                        "title": item.get("title", "") or item.get("heading", "") or "Untitled",
-                        "url": item.get("url", "") or item.get("link", ""),
-                        "content": item.get("content", "") or item.get("snippet", ""),
-                        "source": item.get("source", tool_name),
-                        "score": float(item.get("score", 0.0)) if item.get("score") is not None else 0.0,
-                        "images": item.get("images", []) or []
-                    })
-                else:
-                    # string or other -> put into content
-                    hits.append({
-                        "title": f"Snippet from {tool_name}",
-                        "url": "",
-                        "content": str(item),
-                        "source": tool_name,
-                        "score": 0.0,
-                        "images": []
-                    })
-
-        # Filter/clean hits and append with a stable citation id
-        for hit in hits:
-            content = (hit.get("content") or "").strip()
-            # skip empty content
-            if not content:
-                continue
-
-            cid = str(uuid.uuid4())
-            doc = {
-                "id": cid,
-                "title": (hit.get("title") or "")[:300],
-                "url": hit.get("url", ""),
-                "summary": content[:3000],
-                "source": hit.get("source", tool_name),
-                "score": float(hit.get("score", 0.0)) if hit.get("score") is not None else 0.0,
-                "images": hit.get("images", []) or []
-            }
-            all_docs.append(doc)
 
+async def _arun_steps_concurrent(plan: List[PlanStep], topic: str, settings: Dict[str, Any],
+                                 run_id: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Async twin of _run_steps_concurrent: same per-tool limits and per-step
+    timeout, using asyncio semaphores and task cancellation.
+    """
+    step_timeout = float(settings.get("step_timeout_s", 30))
+    default_limit = int(settings.get("default_tool_concurrency", 2))
+    limits = settings.get("tool_concurrency") or {}
+
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+    for step in plan:
+        tool_name = step.get("tool")
+        if tool_name not in semaphores:
+            semaphores[tool_name] = asyncio.Semaphore(max(1, int(limits.get(tool_name, default_limit))))
+
+    async def worker(step: PlanStep) -> List[Dict[str, Any]]:
+        semaphore = semaphores[step.get("tool")]
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=step_timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"[ResearchAgent] Step '{step.get('step_id')}' timed out waiting for a '{step.get('tool')}' slot.")
+            return []
+        try:
+            return await asyncio.wait_for(_arun_step(step, topic, run_id), timeout=step_timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"[ResearchAgent] Step '{step.get('step_id')}' timed out after {step_timeout}s.")
+            return []
+        finally:
+            semaphore.release()
+
+    results = await asyncio.gather(*(worker(step) for step in plan), return_exceptions=True)
+    step_results: List[List[Dict[str, Any]]] = []
+    for step, result in zip(plan, results):
+        if isinstance(result, BaseException):
+            log.error(f"[ResearchAgent] ERROR in step '{step.get('step_id')}': {result}")
+            result = []
+        step_results.append(result)
+    return step_results
+
+
+def _dedupe(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # Deduplicate by (url, summary prefix) to avoid repeated identical hits
     seen = set()
     deduped = []
-    for d in all_docs:
+    for d in docs:
         key = (d.get("url", ""), d.get("summary", "")[:200])
         if key in seen:
             continue
         seen.add(key)
         deduped.append(d)
+    return deduped
+
+
+def _select_steps(state: AgentState, settings: Dict[str, Any]) -> Tuple[List[PlanStep], List[Dict[str, Any]], str]:
+    """
+    Decide what this pass runs. Returns (steps, documents to keep, mode).
+
+    - "full":   first pass, run the whole plan from scratch.
+    - "repair": the critic sent the draft back; run only a few supplemental
+                queries built from the critique and keep existing documents.
+    """
+    topic = state.get('topic', '')
+    plan: List[PlanStep] = state.get('plan', [])
+    critique = state.get('critique') or ""
+    documents = state.get('documents') or []
+    repair = settings.get("repair") or {}
+
+    if repair.get("enabled", True) and documents and critique and "APPROVED" not in critique.upper():
+        return repair_plan(topic, critique, repair), list(documents), "repair"
+    return plan, [], "full"
 
-    print(f"ResearchAgent found {len(deduped)} documents.")
+
+def _merge_results(state: AgentState, kept: List[Dict[str, Any]], step_results: List[List[Dict[str, Any]]],
+                   steps: List[PlanStep], mode: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    topic = state.get('topic', '')
+    new_docs: List[Dict[str, Any]] = [doc for docs in step_results for doc in docs]
+    # Existing documents go first so their ids (already cited in the draft) survive
+    # the exact dedup, and near_dedupe is told never to drop them.
+    deduped = _dedupe(kept + new_docs)
+
+    near = settings.get("near_dedup") or {}
+    if near.get("enabled", True) and len(deduped) > 1:
+        before = len(deduped)
+        deduped = near_dedupe(
+            deduped,
+            threshold=float(near.get("threshold", 0.6)),
+            num_perm=int(near.get("num_perm", 64)),
+            bands=int(near.get("bands", 16)),
+            shingle_size=int(near.get("shingle_size", 3)),
+            keep_ids={doc.get("id") for doc in kept},
+        )
+        if len(deduped) < before:
+            log.info(f"[ResearchAgent] Collapsed {before - len(deduped)} near-duplicate documents.")
+
+    if mode == "repair":
+        log.info(f"[ResearchAgent] Repair pass added {len(deduped) - len(kept)} documents ({len(deduped)} total).")
+    else:
+        log.info(f"[ResearchAgent] Found {len(deduped)} documents.")
     if len(deduped) < 1:
-        pprint.pprint({"warning": "no documents collected", "topic": topic})
+        log.warning("[ResearchAgent] No documents collected.", topic=topic)
 
-    return {
+    update = {
         "documents": deduped,
         "iteration_count": state.get("iteration_count", 0) + 1
     }
+    if mode == "repair":
+        update["repair_queries"] = [step["query"] for step in steps]
+    return update
+
+
+def run_researcher_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Execute plan steps (from PlannerAgent) by calling tools through MCPGovernor.
+    On a critique loop, run only supplemental queries and merge the new hits.
+    Return a list of citation objects in the unified format:
+      { id, title, url, summary, source, score, images }
+    """
+    topic = state.get('topic', '')
+    settings = get_governor().config.get("research") or {}
+    steps, kept, mode = _select_steps(state, settings)
+    log.info("[Node: ResearchAgent]", topic=topic, mode=mode, steps=len(steps))
+
+    if settings.get("concurrent", True) and len(steps) > 1:
+        step_results = _run_steps_concurrent(steps, topic, settings, state.get('run_id'))
+    else:
+        step_results = _run_steps_sequential(steps, topic, state.get('run_id'))
+
+    return _merge_results(state, kept, step_results, steps, mode, settings)
+
+
+async def arun_researcher_node(state: AgentState) -> Dict[str, Any]:
+    """Async twin of run_researcher_node (used by app_graph.ainvoke / astream)."""
+    topic = state.get('topic', '')
+    settings = get_governor().config.get("research") or {}
+    steps, kept, mode = _select_steps(state, settings)
+    log.info("[Node: ResearchAgent]", topic=topic, mode=mode, steps=len(steps))
+
+    if settings.get("concurrent", True) and len(steps) > 1:
+        step_results = await _arun_steps_concurrent(steps, topic, settings, state.get('run_id'))
+    else:
+        step_results = [await _arun_step(step, topic, state.get('run_id')) for step in steps]
+
+    return _merge_results(state, kept, step_results, steps, mode, settings)
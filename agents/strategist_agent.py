@@ -1,25 +1,38 @@
 # Create this file: insightbridge/agents/strategist_agent.py
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+import json
+
 from langchain_core.prompts import ChatPromptTemplate
+from agents.llm_factory import agent_llm  # built on first use from models: in config.yml
 from backend.schema import ReportResponse # Import our Pydantic model
 from langchain_core.output_parsers.json import JsonOutputParser
 from orchestrator.state import AgentState
+from mcp.governor import get_governor  # config.yml holds the strategist mode
+from telemetry.log import get_logger
 
-# Initialize the LLM (Gemini)
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", temperature=0.1)
+log = get_logger(__name__)
 
 # Pydantic model to JSON parser
 parser = JsonOutputParser(pydantic_object=ReportResponse)
 
+
+def _validate_polish(response: str) -> None:
+    """Raises unless the polished report parses and validates as a ReportResponse."""
+    ReportResponse.model_validate(parser.parse(response))
+
+
+# Initialize the LLM (Gemini); only polished reports that validate are cached
+llm = agent_llm("strategist", validate=_validate_polish)
+
 strategist_prompt = ChatPromptTemplate.from_template(
     """
     You are a C-level strategist. Your job is to take a
-    final, approved draft report and format it perfectly into
+    final, approved draft report and polish it into
     the required JSON output.
     
-    You must extract the key points for each section and present them
-    as lists of strings.
+    Tighten the wording of every section for an executive audience.
+    Keep the same structure, keep every citation id, and do not add
+    facts that are not in the draft.
     
     {format_instructions}
     
@@ -28,33 +41,107 @@ strategist_prompt = ChatPromptTemplate.from_template(
     """
 )
 
+_STRING_FIELDS = ("title", "executive_summary", "comparison_table_markdown")
+_LIST_FIELDS = ("market_trends", "opportunities", "risks", "image_references", "recommendations")
+
+
+def project_report(draft: dict) -> dict:
+    """
+    Deterministically map an analyst draft onto ReportResponse.
+    Coerces obvious type slips (None, a string where a list belongs, ...)
+    and validates the result; raises pydantic.ValidationError otherwise.
+    """
+    report = {}
+    for field in _STRING_FIELDS:
+        value = draft.get(field)
+        if isinstance(value, list):
+            value = "\n".join(str(v) for v in value)
+        report[field] = "" if value is None else str(value)
+    for field in _LIST_FIELDS:
+        value = draft.get(field)
+        if value is None:
+            value = []
+        elif not isinstance(value, list):
+            value = [value]
+        report[field] = value
+    metadata = draft.get("metadata")
+    report["metadata"] = metadata if isinstance(metadata, dict) else {}
+    return ReportResponse.model_validate(report).model_dump()
+
+
+def _polish_enabled() -> bool:
+    settings = get_governor().config.get("strategist") or {}
+    return settings.get("mode", "deterministic") == "llm"
+
+
+def _final_report(draft: dict, polished=None) -> str:
+    """Prefer the LLM-polished report if it validates as-is, else the projected draft."""
+    if polished is not None:
+        try:
+            return json.dumps(ReportResponse.model_validate(polished).model_dump())
+        except Exception as e:
+            log.warning(f"[StrategistAgent] Polished report failed validation ({e}); using projected draft.")
+    return json.dumps(project_report(draft))
+
+
 def run_strategist_node(state: AgentState) -> dict:
     """
-    This node takes the final approved draft and formats
-    it into the required JSON output.
+    This node takes the final approved draft and maps it onto the
+    API response schema. By default this is a pure projection; with
+    strategist.mode: llm the LLM first polishes the draft.
     """
-    print(f"\n--- [Node: StrategistAgent] ---")
+    log.info("[Node: StrategistAgent]")
     draft_report = state['draft_report']
-    
-    # Get the format instructions from the parser
-    format_instructions = parser.get_format_instructions()
-    
-    # Create the chain
-    chain = strategist_prompt | llm | parser
-    
-    print("Formatting final report...")
-    final_report = chain.invoke({
-        "approved_draft": draft_report,
-        "format_instructions": format_instructions
-    })
-    
-    # The 'final_report' is now a Python dictionary
-    # We'll store it as a string in the state for consistency
-    import json
-    final_report_json = json.dumps(final_report)
-    
-    print("Final report JSON generated.")
-    
+    draft = json.loads(draft_report) if isinstance(draft_report, str) else draft_report
+
+    polished = None
+    if _polish_enabled():
+        # Get the format instructions from the parser
+        format_instructions = parser.get_format_instructions()
+
+        # Create the chain
+        chain = strategist_prompt | llm | parser
+
+        log.info("[StrategistAgent] Polishing final report...")
+        try:
+            polished = chain.invoke({
+                "approved_draft": draft_report,
+                "format_instructions": format_instructions
+            })
+        except Exception as e:
+            log.error(f"[StrategistAgent] LLM polish failed: {e}")
+
+    final_report_json = _final_report(draft, polished)
+    log.info("[StrategistAgent] Final report JSON generated.")
+
+    return {
+        "final_report": final_report_json
+    }
+
+
+async def arun_strategist_node(state: AgentState) -> dict:
+    """Async twin of run_strategist_node (used by app_graph.ainvoke / astream)."""
+    log.info("[Node: StrategistAgent]")
+    draft_report = state['draft_report']
+    draft = json.loads(draft_report) if isinstance(draft_report, str) else draft_report
+
+    polished = None
+    if _polish_enabled():
+        format_instructions = parser.get_format_instructions()
+        chain = strategist_prompt | llm | parser
+
+        log.info("[StrategistAgent] Polishing final report...")
+        try:
+            polished = await chain.ainvoke({
+                "approved_draft": draft_report,
+                "format_instructions": format_instructions
+            })
+        except Exception as e:
+            log.error(f"[StrategistAgent] LLM polish failed: {e}")
+
+    final_report_json = _final_report(draft, polished)
+    log.info("[StrategistAgent] Final report JSON generated.")
+
     return {
         "final_report": final_report_json
-    }
\ No newline at end of file
+    }
@@ -2,21 +2,53 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
 import json
-import asyncio
 
-# Import the compiled graph and planner helper
-from orchestrator.graph_builder import app_graph
-from agents.planner_agent import run_planner_node
+# The graph is compiled on first use (or by the warm-up below)
+from orchestrator.graph_builder import get_graph, warm_up
+from orchestrator.checkpoints import (
+    aclose_checkpointer, checkpoint_before, get_checkpointed_graph, pending_nodes, run_config,
+)
 from orchestrator.state import AgentState
+from mcp.http_client import aclose_async_client
+from mcp.governor import get_governor
+from backend.coalescer import GraphRun, RunCoalescer, run_key
+from backend.jobs import STATUSES as JOB_STATUSES, JobManager, QueueFull, default_store
+from backend.schema import TopicRequest, ReportResponse, JobRequest, JobResponse, ReplayRequest
+from telemetry import metrics
+from telemetry.log import get_logger
+from telemetry.tracing import bind_run, run_trace
+
+log = get_logger(__name__)
+
+
+# STRATOS_WARMUP=1 builds the graph, governor, tool clients and models at
+# startup instead of on the first request (off by default for fast reloads).
+WARMUP = os.getenv("STRATOS_WARMUP", "0").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP:
+        await asyncio.to_thread(warm_up)
+    jobs.start()
+    yield
+    await jobs.stop()
+    await aclose_checkpointer()
+    await aclose_async_client()
+
 
 app = FastAPI(
     title="Stratos Insight API",
     description="Agentic AI for research and analysis (Stratos).",
+    lifespan=lifespan,
 )
 
 # --- CORS (critical for Next.js frontend) ---
@@ -28,91 +60,277 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Pydantic schemas (simplified; adapt to your schema.py)
-class TopicRequest(BaseModel):
-    topic: str
-
-class ReportResponse(BaseModel):
-    title: str
-    executive_summary: str
-    market_trends: list
-    opportunities: list
-    risks: list
-    comparison_table_markdown: str
-    image_references: list
-    recommendations: list
-    metadata: dict
-
-# --- Endpoint 1: synchronous (unchanged-ish) ---
+def _sse(event_type: str, payload) -> str:
+    return f"data: {json.dumps({'type': event_type, 'payload': payload})}\n\n"
+
+
+# --- Shared graph runner: one run per normalized topic, events fanned out ---
+def _node_event(node: str, update: dict):
+    """Map a graph node's state update to an SSE (type, payload) pair, or None."""
+    if not update:
+        return None
+    if node == "planner":
+        return "plan", update.get("plan", [])
+    if node == "researcher":
+        return "research", {
+            "doc_count": len(update.get("documents", [])),
+            "iteration": update.get("iteration_count", 0),
+        }
+    if node == "analyst":
+        draft = update.get("draft_report")
+        return "draft", json.loads(draft) if isinstance(draft, str) else draft
+    if node == "critic":
+        return "critique", update.get("critique", "")
+    if node == "strategist":
+        report = update.get("final_report")
+        return "report", json.loads(report) if isinstance(report, str) else report
+    return None
+
+
+async def _graph_inputs(graph, run: GraphRun, initial_state: AgentState):
+    """
+    Inputs and config for a run. With checkpoints, a run id that already has
+    unfinished work resumes after its last completed node, and a replay
+    restarts from the checkpoint it names; otherwise the run starts fresh.
+    """
+    if graph is None:
+        return initial_state, None
+    config = run_config(run.run_id, run.resume_from)
+    if run.resume_from:
+        run.publish("status", "replaying")
+        return None, config
+    pending = await pending_nodes(graph, run.run_id)
+    if pending:
+        log.info(f"[API] Resuming run {run.run_id} at {', '.join(pending)}.")
+        run.publish("status", "resuming")
+        return None, config
+    return initial_state, config
+
+
+async def _run_graph(run: GraphRun) -> None:
+    # Everything this run logs or traces (nodes, tools, LLM calls) carries its run id.
+    with bind_run(run.run_id):
+        await _stream_graph(run)
+
+
+async def _stream_graph(run: GraphRun) -> None:
+    initial_state: AgentState = {
+        "topic": run.topic,
+        "iteration_count": 0,
+        "run_id": run.run_id
+    }
+    if run.plan:
+        initial_state["plan"] = run.plan
+
+    checkpointed = await get_checkpointed_graph()
+    graph = checkpointed or get_graph()
+    inputs, config = await _graph_inputs(checkpointed, run, initial_state)
+
+    run.publish("status", "running_graph")
+    draft = None
+    # astream runs the async node functions, so the event loop stays free.
+    async for chunk in graph.astream(inputs, config, stream_mode="updates"):
+        for node, update in chunk.items():
+            event = _node_event(node, update)
+            if event is None:
+                continue
+            if event[0] == "draft":
+                draft = event[1]
+            if event[0] == "report":
+                run.report = event[1]
+            run.publish(*event)
+
+    if run.report is None and checkpointed is not None:
+        # A resumed run may not re-emit nodes that finished before the failure:
+        # take the strategist's report from the latest checkpoint, never the draft.
+        snapshot = await checkpointed.aget_state(run_config(run.run_id))
+        if snapshot.next:
+            raise Exception(f"Run stopped before {', '.join(snapshot.next)} (no report).")
+        report = snapshot.values.get("final_report")
+        if report:
+            run.report = json.loads(report) if isinstance(report, str) else report
+            run.publish("report", run.report)
+
+    run.report = run.report or draft
+    if not run.report:
+        raise Exception("Report generation failed (no output).")
+    run.publish("status", "complete")
+
+
+coalescer = RunCoalescer(_run_graph)
+# Runs execute as background jobs on a bounded worker pool (backend/jobs.py).
+jobs = JobManager(coalescer, default_store())
+
+
+def _too_busy(e: QueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after_s)})
+
+
+def _submit_job(topic: str, plan=None) -> dict:
+    """Queue (or attach to) a job; a full queue becomes 429 + Retry-After."""
+    try:
+        return jobs.submit(topic, plan)
+    except QueueFull as e:
+        raise _too_busy(e)
+
+
+def _require_job(job_id: str) -> dict:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job
+
+
+# --- Endpoint 1: full report in one response ---
 @app.post("/analyze-topic", response_model=ReportResponse)
 async def analyze_topic(request: TopicRequest):
-    print(f"\n[API] Received topic: {request.topic}")
-    initial_state = {
-        "topic": request.topic,
-        "iteration_count": 0
-    }
+    """
+    Blocking variant: waits for the report. With job_id it attaches to that
+    background job; otherwise it serves a cached report or submits a job
+    (which keeps running even if this request is dropped).
+    """
+    log.info("[API] Received topic", topic=request.topic, job_id=request.job_id)
+    if request.job_id:
+        job_id = _require_job(request.job_id)["job_id"]
+        report_data = None
+    else:
+        report_data = coalescer.cached_report(run_key(request.topic))
+        job_id = None if report_data is not None else _submit_job(request.topic)["job_id"]
     try:
-        final_state = app_graph.invoke(initial_state)
-        report_json = final_state.get("final_report") or final_state.get("draft_report")
-        if not report_json:
-            raise HTTPException(status_code=500, detail="Report generation failed.")
-        report_data = json.loads(report_json) if isinstance(report_json, str) else report_json
+        if report_data is None:
+            # Identical concurrent topics share one job (and one graph run).
+            report_data = await jobs.wait(job_id)
         return ReportResponse(**report_data)
     except Exception as e:
-        print(f"[API] Error during graph invocation: {e}")
+        log.error(f"[API] Error during graph invocation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# --- Endpoint 2: Streaming SSE for UI to show Plan + final report ---
+# --- Background jobs: submit, poll, stream ---
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: JobRequest):
+    return JobResponse(**_submit_job(request.topic, request.plan))
+
+
+@app.get("/jobs")
+async def job_stats():
+    return jobs.stats()
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    return JobResponse(**_require_job(job_id))
+
+
+@app.post("/jobs/{job_id}/retry", response_model=JobResponse, status_code=202)
+async def retry_job(job_id: str):
+    """Re-queue a failed job; with checkpoints it resumes after its last completed node."""
+    _require_job(job_id)
+    try:
+        return JobResponse(**jobs.retry(job_id))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFull as e:
+        raise _too_busy(e)
+
+
+GRAPH_NODES = ("planner", "researcher", "analyst", "critic", "strategist")
+
+
+@app.post("/jobs/{job_id}/replay", response_model=JobResponse, status_code=202)
+async def replay_job(job_id: str, request: ReplayRequest):
+    """Re-run a job from `from_node` onward; earlier nodes come from their checkpoints."""
+    _require_job(job_id)
+    if request.from_node not in GRAPH_NODES:
+        raise HTTPException(status_code=400, detail=f"from_node must be one of {', '.join(GRAPH_NODES)}")
+    graph = await get_checkpointed_graph()
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Checkpoints are disabled (STRATOS_CHECKPOINTS=0 or no SQLite checkpointer installed).")
+    checkpoint_id = await checkpoint_before(graph, job_id, request.from_node)
+    if checkpoint_id is None:
+        raise HTTPException(status_code=404, detail=f"Job never reached '{request.from_node}'.")
+    try:
+        return JobResponse(**jobs.replay(job_id, checkpoint_id))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFull as e:
+        raise _too_busy(e)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    _require_job(job_id)
+
+    async def event_generator():
+        async for event in jobs.events(job_id):
+            yield _sse(event["type"], event["payload"])
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+# --- Budgets: current spend, call counts and rate-limit buckets ---
+@app.get("/budgets")
+async def budgets(run_id: str = None):
+    snapshot = get_governor().budget_snapshot(run_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Budgets are disabled (budgets.enabled in config.yml).")
+    return snapshot
+
+# --- Tool health: circuit-breaker state and timeout/hedge counters ---
+@app.get("/tool-health")
+async def tool_health():
+    return get_governor().tool_health()
+
+# --- Observability: Prometheus metrics and per-run traces ---
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Node, tool and LLM latency histograms, token/cache/error counters, job and breaker gauges."""
+    counts = jobs.store.counts()
+    for status in JOB_STATUSES:
+        metrics.JOBS.set(counts.get(status, 0), status)
+    for tool, health in get_governor().tool_health().items():
+        metrics.CIRCUIT_OPEN.set(0 if health["state"] == "closed" else 1, tool)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/jobs/{job_id}/trace")
+async def job_trace(job_id: str):
+    """Spans recorded for a recent job's run (in-process only) and per-node/tool/LLM totals."""
+    trace = run_trace(job_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="No trace recorded for this job in this process.")
+    return trace
+
+# --- Endpoint 2: Streaming SSE, one event per graph node as it finishes ---
 @app.post("/analyze-topic-stream")
 async def analyze_topic_stream(request: Request):
     """
-    Server-Sent Events endpoint. It will:
-      1) Run the planner node and stream the plan
-      2) Run the full graph synchronously and stream the final report
+    Server-Sent Events endpoint. Streams the graph node by node:
+      plan -> research -> draft -> critique (-> research -> draft -> critique) -> report
+    If the body already contains a "plan", the planner node is skipped.
+    With a "job_id" it attaches to that background job instead; otherwise
+    it submits one (first event: {"type": "job", ...} with its id, so a
+    dropped client can re-attach). Subscribers for the same topic share one
+    run and all receive its events; a fresh cached report is streamed back
+    immediately.
     """
     body = await request.json()
+    job_id = body.get("job_id")
     topic = body.get("topic")
-    if not topic:
+    if job_id:
+        _require_job(job_id)
+    elif not topic:
         raise HTTPException(status_code=400, detail="Missing topic")
+    plan = body.get("plan") or None
 
-    initial_state: AgentState = {
-        "topic": topic,
-        "iteration_count": 0
-    }
+    cached = None if job_id else coalescer.cached_report(run_key(topic, plan))
+    if cached is None and not job_id:
+        job_id = _submit_job(topic, plan)["job_id"]
 
     async def event_generator():
-        # 1) Run planner node directly to get plan (quick)
-        try:
-            planner_update = run_planner_node(initial_state)
-            plan = planner_update.get("plan", [])
-            event = {"type": "plan", "payload": plan}
-            yield f"data: {json.dumps(event)}\n\n"
-        except Exception as e:
-            err = {"type": "error", "payload": f"Planner failed: {e}"}
-            yield f"data: {json.dumps(err)}\n\n"
+        if cached is not None:
+            yield _sse("report", cached)
+            yield _sse("status", "complete")
             return
-
-        # 2) Now run the full graph (blocking). We yield a "working" event first.
-        yield f"data: {json.dumps({'type': 'status', 'payload': 'running_graph'})}\n\n"
-
-        loop = asyncio.get_event_loop()
-        try:
-            # Running a synchronous graph in async endpoint: run in executor
-            final_state = await loop.run_in_executor(None, lambda: app_graph.invoke({
-                "topic": topic,
-                "iteration_count": 0,
-                "plan": plan
-            }))
-            # get draft or final report
-            report_json = final_state.get("final_report") or final_state.get("draft_report")
-            if not report_json:
-                raise Exception("Report generation failed (no output).")
-            # Ensure it's JSON serializable
-            report_obj = json.loads(report_json) if isinstance(report_json, str) else report_json
-            yield f"data: {json.dumps({'type': 'report', 'payload': report_obj})}\n\n"
-            # Finished
-            yield f"data: {json.dumps({'type': 'status', 'payload': 'complete'})}\n\n"
-        except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'payload': str(e)})}\n\n"
+        async for event in jobs.events(job_id):
+            yield _sse(event["type"], event["payload"])
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
@@ -0,0 +1,166 @@
+# stratos/backend/coalescer.py
+"""
+Single-flight coalescing for graph runs, plus a completed-report cache.
+
+Concurrent requests for the same normalized topic share one GraphRun:
+the first request starts it, later ones attach to it. Every SSE
+subscriber gets the run's full event history followed by live events,
+so late joiners see the plan, the research progress and so on.
+Finished reports are kept for STRATOS_REPORT_CACHE_TTL_S seconds.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+REPORT_CACHE_TTL_S = float(os.getenv("STRATOS_REPORT_CACHE_TTL_S", "900"))
+REPORT_CACHE_MAX = int(os.getenv("STRATOS_REPORT_CACHE_MAX", "256"))
+
+_ARTICLES = {"a", "an", "the"}
+_DONE = object()
+
+
+def normalize_topic(topic: str) -> str:
+    """'The  AI in Supply-Chain?' -> 'ai in supply chain'"""
+    words = re.sub(r"[^\w\s]", " ", topic.casefold()).split()
+    return " ".join(w for w in words if w not in _ARTICLES)
+
+
+def run_key(topic: str, plan: Optional[list] = None) -> str:
+    key = normalize_topic(topic)
+    if plan:
+        # A caller-supplied plan is different work; don't merge it with planner runs.
+        key += "#plan=" + hashlib.sha256(json.dumps(plan, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return key
+
+
+class GraphRun:
+    """One in-flight graph execution and its event stream."""
+
+    def __init__(self, key: str, topic: str, plan: Optional[list] = None, run_id: Optional[str] = None,
+                 resume_from: Optional[str] = None):
+        self.key = key
+        self.run_id = run_id or uuid.uuid4().hex  # graph run id (budgets, logs, checkpoints)
+        self.resume_from = resume_from  # checkpoint id to replay from (see orchestrator/checkpoints.py)
+        self.topic = topic
+        self.plan = plan
+        self.history: List[Dict[str, Any]] = []
+        self.report: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.done = False
+        self.task: Optional[asyncio.Task] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def publish(self, event_type: str, payload: Any) -> None:
+        event = {"type": event_type, "payload": payload}
+        self.history.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def finish(self) -> None:
+        self.done = True
+        for queue in self._subscribers:
+            queue.put_nowait(_DONE)
+        self._subscribers.clear()
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        """Replay the history, then follow live events until the run finishes."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.history:
+            queue.put_nowait(event)
+        if self.done:
+            queue.put_nowait(_DONE)
+        else:
+            self._subscribers.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is _DONE:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+    async def wait(self) -> Dict[str, Any]:
+        """Wait for the run and return its report (raises RuntimeError on failure)."""
+        if self.task is not None:
+            await asyncio.shield(self.task)
+        if self.report is None:
+            raise RuntimeError(self.error or "Report generation failed.")
+        return self.report
+
+
+class RunCoalescer:
+    def __init__(self, runner: Callable[[GraphRun], Awaitable[None]],
+                 report_ttl_s: float = REPORT_CACHE_TTL_S, max_reports: int = REPORT_CACHE_MAX):
+        """
+        runner: coroutine that executes a GraphRun, publishing events and
+        setting run.report (or run.error). The coalescer handles finish().
+        """
+        self.runner = runner
+        self.report_ttl_s = report_ttl_s
+        self.max_reports = max_reports
+        self.in_flight: Dict[str, GraphRun] = {}
+        self._reports: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"started": 0, "coalesced": 0, "cache_hits": 0}
+
+    def cached_report(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._reports.get(key)
+        if entry is None:
+            return None
+        stored_at, report = entry
+        if time.time() - stored_at > self.report_ttl_s:
+            del self._reports[key]
+            return None
+        self._reports.move_to_end(key)
+        self.stats["cache_hits"] += 1
+        return report
+
+    def _store_report(self, key: str, report: Dict[str, Any]) -> None:
+        if self.report_ttl_s <= 0:
+            return
+        self._reports[key] = (time.time(), report)
+        self._reports.move_to_end(key)
+        while len(self._reports) > self.max_reports:
+            self._reports.popitem(last=False)
+
+    def get_or_start(self, topic: str, plan: Optional[list] = None, run_id: Optional[str] = None,
+                     resume_from: Optional[str] = None) -> GraphRun:
+        """Attach to the in-flight run for this topic, or start a new one (with run_id, if given)."""
+        key = run_key(topic, plan)
+        if resume_from:
+            # A replay continues one specific run; never merge it with fresh runs.
+            key += "#from=" + resume_from
+        run = self.in_flight.get(key)
+        if run is not None:
+            self.stats["coalesced"] += 1
+            log.info(f"[API] Attaching to in-flight run for '{key}'.", run_id=run.run_id)
+            return run
+
+        run = GraphRun(key, topic, plan, run_id, resume_from)
+        self.in_flight[key] = run
+        self.stats["started"] += 1
+        run.task = asyncio.create_task(self._execute(run))
+        return run
+
+    async def _execute(self, run: GraphRun) -> None:
+        try:
+            await self.runner(run)
+        except Exception as e:
+            run.error = str(e)
+            run.publish("error", run.error)
+        finally:
+            self.in_flight.pop(run.key, None)
+            if run.report is not None:
+                self._store_report(run.key, run.report)
+            run.finish()
@@ -0,0 +1,318 @@
+# stratos/backend/jobs.py
+"""
+Background jobs for graph runs.
+
+- submit() returns a job id immediately; a fixed pool of asyncio workers
+  (STRATOS_JOB_WORKERS) executes queued jobs through the RunCoalescer, so
+  a client disconnecting no longer throws the run away.
+- At most STRATOS_JOB_QUEUE_MAX jobs wait for a worker; beyond that
+  submit() raises QueueFull with a retry hint (the API answers 429).
+- Job status, report and error are persisted in SQLite, so results
+  outlive the request (and the process).
+- A submission for a topic that already has a queued/running job
+  attaches to that job instead of creating a new one.
+- The job id is the graph run id, so with checkpoints on a retried job
+  (or one interrupted by a restart) resumes after its last completed node,
+  and replay() re-runs only the nodes after a chosen checkpoint.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+
+from mcp.storage import cache_path
+from telemetry.log import get_logger
+from .coalescer import GraphRun, RunCoalescer, run_key
+
+log = get_logger(__name__)
+
+JOB_WORKERS = int(os.getenv("STRATOS_JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("STRATOS_JOB_QUEUE_MAX", "16"))
+JOB_DB = os.getenv("STRATOS_JOB_DB", "jobs.sqlite3")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+ACTIVE = (QUEUED, RUNNING)
+STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED)
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after_s: int):
+        super().__init__(f"Job queue is full; retry in about {retry_after_s}s.")
+        self.retry_after_s = retry_after_s
+
+
+class JobStore:
+    """SQLite-backed job records."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                run_key TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                plan TEXT,
+                status TEXT NOT NULL,
+                report TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                resume_from TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_active ON jobs(status, run_key)")
+        self._conn.commit()
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["plan"] = json.loads(job["plan"]) if job["plan"] else None
+        job["report"] = json.loads(job["report"]) if job["report"] else None
+        return job
+
+    def create(self, job_id: str, key: str, topic: str, plan: Optional[list]) -> Dict[str, Any]:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, run_key, topic, plan, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, key, topic, json.dumps(plan) if plan else None, QUEUED, time.time()),
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def find_active(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE run_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (key, *ACTIVE),
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def list_by_status(self, *statuses: str) -> list:
+        marks = ", ".join("?" for _ in statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({marks}) ORDER BY created_at", statuses
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def mark_running(self, job_id: str) -> None:
+        # resume_from applies to one attempt; a later retry resumes from the latest checkpoint.
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, started_at = ?, resume_from = NULL WHERE job_id = ?",
+                               (RUNNING, time.time(), job_id))
+            self._conn.commit()
+
+    def requeue(self, job_id: str, resume_from: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, report = NULL, error = NULL, started_at = NULL, "
+                "finished_at = NULL, resume_from = ? WHERE job_id = ?",
+                (QUEUED, resume_from, job_id),
+            )
+            self._conn.commit()
+
+    def mark_done(self, job_id: str, report: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        status = SUCCEEDED if report is not None else FAILED
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, report = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                (status, json.dumps(report) if report is not None else None, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+
+class JobManager:
+    def __init__(self, coalescer: RunCoalescer, store: JobStore,
+                 workers: int = JOB_WORKERS, queue_max: int = JOB_QUEUE_MAX):
+        self.coalescer = coalescer
+        self.store = store
+        self.workers = max(1, workers)
+        self.queue_max = max(0, queue_max)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        # In-process handles for live jobs: job_id -> GraphRun, and a "started" event per job.
+        self.runs: Dict[str, GraphRun] = {}
+        self._started: Dict[str, asyncio.Event] = {}
+        self._avg_run_s = 60.0  # moving average, for Retry-After hints
+
+    # --- Lifecycle (called from the API lifespan hook, or on first submit) ---
+    def start(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        # Jobs a previous process left queued or running are picked up again;
+        # interrupted runs resume from their last checkpoint.
+        for job in self.store.list_by_status(RUNNING):
+            self.store.requeue(job["job_id"])
+        for job in self.store.list_by_status(QUEUED):
+            self._enqueue(job["job_id"])
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    # --- Submission ---
+    def _enqueue(self, job_id: str) -> None:
+        self._started.setdefault(job_id, asyncio.Event())
+        self._queue.put_nowait(job_id)
+
+    def retry_after_s(self) -> int:
+        waiting = self._queue.qsize() if self._queue is not None else 0
+        return max(1, int(self._avg_run_s * (1 + waiting / self.workers) / 2))
+
+    def submit(self, topic: str, plan: Optional[list] = None) -> Dict[str, Any]:
+        """Create (or attach to) a job for this topic. Raises QueueFull when saturated."""
+        self.start()
+        key = run_key(topic, plan)
+        existing = self.store.find_active(key)
+        if existing is not None:
+            log.info(f"[Jobs] Attaching to job {existing['job_id']} for '{key}'.")
+            return existing
+
+        if self._queue.qsize() >= self.queue_max:
+            raise QueueFull(self.retry_after_s())
+
+        job = self.store.create(uuid.uuid4().hex, key, topic, plan)
+        self._enqueue(job["job_id"])
+        log.info(f"[Jobs] Queued job {job['job_id']}", waiting=self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def retry(self, job_id: str) -> Dict[str, Any]:
+        """Re-queue a failed job; its run resumes after the last completed node."""
+        job = self.store.get(job_id)
+        if job["status"] != FAILED:
+            raise ValueError(f"Only failed jobs can be retried (job is {job['status']}).")
+        return self._requeue(job_id)
+
+    def replay(self, job_id: str, checkpoint_id: str) -> Dict[str, Any]:
+        """Re-queue a finished job to re-run the nodes after `checkpoint_id`."""
+        job = self.store.get(job_id)
+        if job["status"] in ACTIVE:
+            raise ValueError(f"Job is still {job['status']}.")
+        return self._requeue(job_id, checkpoint_id)
+
+    def _requeue(self, job_id: str, resume_from: Optional[str] = None) -> Dict[str, Any]:
+        self.start()
+        if self._queue.qsize() >= self.queue_max:
+            raise QueueFull(self.retry_after_s())
+        self.store.requeue(job_id, resume_from)
+        self._enqueue(job_id)
+        return self.store.get(job_id)
+
+    # --- Execution ---
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:  # never let one job kill the worker
+                log.exception(f"[Jobs] Worker {worker_id} failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+        self.store.mark_running(job_id)
+        started = time.monotonic()
+        run = self.coalescer.get_or_start(job["topic"], job["plan"], run_id=job_id,
+                                          resume_from=job["resume_from"])
+        self.runs[job_id] = run
+        self._started.setdefault(job_id, asyncio.Event()).set()
+        try:
+            report = await run.wait()
+            self.store.mark_done(job_id, report, None)
+        except Exception as e:
+            self.store.mark_done(job_id, None, str(e))
+        finally:
+            self._avg_run_s = 0.8 * self._avg_run_s + 0.2 * (time.monotonic() - started)
+            self.runs.pop(job_id, None)
+            self._started.pop(job_id, None)
+
+    # --- Attaching ---
+    async def wait(self, job_id: str) -> Dict[str, Any]:
+        """Wait for a job and return its report (raises RuntimeError if it failed)."""
+        job = self.store.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        started = self._started.get(job_id)
+        if job["status"] == QUEUED and started is not None:
+            await started.wait()
+        run = self.runs.get(job_id)
+        if run is not None:
+            return await run.wait()
+
+        job = self.store.get(job_id)
+        if job["report"] is None:
+            raise RuntimeError(job["error"] or "Report generation failed.")
+        return job["report"]
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        The job's event stream: a "job" event with its id and status, then
+        (once a worker picks it up) the run's full event history and live
+        events. Finished jobs replay their stored report or error.
+        """
+        job = self.store.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        yield {"type": "job", "payload": {"job_id": job_id, "status": job["status"]}}
+
+        started = self._started.get(job_id)
+        if job["status"] == QUEUED and started is not None:
+            await started.wait()
+        run = self.runs.get(job_id)
+        if run is not None:
+            async for event in run.events():
+                yield event
+            return
+
+        job = self.store.get(job_id)
+        if job["report"] is not None:
+            yield {"type": "report", "payload": job["report"]}
+            yield {"type": "status", "payload": "complete"}
+        else:
+            yield {"type": "error", "payload": job["error"] or "Report generation failed."}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "waiting": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self.runs),
+            "jobs": self.store.counts(),
+        }
+
+
+def default_store() -> JobStore:
+    return JobStore(cache_path(JOB_DB))
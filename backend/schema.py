@@ -6,13 +6,42 @@ from typing import List, Optional
 class TopicRequest(BaseModel):
     """The input request for the main analysis report."""
     topic: str
+    job_id: Optional[str] = None  # attach to an existing background job instead
+
+class JobRequest(BaseModel):
+    """Submit a background analysis job."""
+    topic: str
+    plan: Optional[list] = None
+
+class ReplayRequest(BaseModel):
+    """Re-run a job from a node onward (e.g. "strategist"), reusing earlier nodes' checkpoints."""
+    from_node: str
+
+class JobResponse(BaseModel):
+    """A background job's state; report is set once it has succeeded."""
+    job_id: str
+    topic: str
+    status: str  # queued | running | succeeded | failed
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    report: Optional[dict] = None
+    error: Optional[str] = None
 
 class ReportResponse(BaseModel):
-    """The final structured output for the main report."""
+    """
+    The final structured output for the main report.
+    Mirrors the AnalystAgent draft, so a draft can be projected onto it directly.
+    """
+    title: str
     executive_summary: str
-    market_trends: List[str]
-    potential_opportunities: List[str]
-    risk_feasibility_section: str
+    market_trends: list
+    opportunities: list
+    risks: list
+    comparison_table_markdown: str
+    image_references: list
+    recommendations: list
+    metadata: dict
 
 class DeepDiveRequest(BaseModel):
     """The input for the user's follow-up PDF query."""
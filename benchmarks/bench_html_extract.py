@@ -0,0 +1,124 @@
+# stratos/benchmarks/bench_html_extract.py
+"""
+Benchmark: bounded streaming extractor vs. the old BeautifulSoup path.
+
+Usage:
+    python -m benchmarks.bench_html_extract --corpus path/to/saved_html/ [--repeat 5] [--out results.json]
+
+Every *.html / *.htm file under --corpus is replayed in 16 KB chunks (the
+same chunk size read_webpage streams with). Without --corpus, or if it has
+no HTML files, a synthetic corpus of news-style pages is generated.
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from mcp.adapters.html_extract import extract_text
+
+MAX_CHARS = 4000
+CHUNK_BYTES = 16 * 1024
+
+
+def baseline_extract(html: bytes) -> str:
+    """The read_webpage implementation this replaces: full DOM, join everything, truncate."""
+    soup = BeautifulSoup(html.decode("utf-8", errors="replace"), "html.parser")
+    text = " ".join(t.strip() for t in soup.stripped_strings)
+    return text[:MAX_CHARS]
+
+
+def bounded_extract(html: bytes) -> str:
+    chunks = (html[i:i + CHUNK_BYTES] for i in range(0, len(html), CHUNK_BYTES))
+    return extract_text(chunks, max_chars=MAX_CHARS)
+
+
+def bounded_main_extract(html: bytes) -> str:
+    chunks = (html[i:i + CHUNK_BYTES] for i in range(0, len(html), CHUNK_BYTES))
+    return extract_text(chunks, max_chars=MAX_CHARS, main_content=True)
+
+
+def synthetic_corpus(count: int = 20, seed: int = 7) -> List[Tuple[str, bytes]]:
+    rng = random.Random(seed)
+    words = ("market supply chain growth risk model data cloud revenue policy energy "
+             "battery semiconductor logistics demand forecast investment regulation").split()
+
+    def sentence() -> str:
+        return " ".join(rng.choice(words) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+    pages = []
+    for idx in range(count):
+        nav = "".join(f"<li><a href='/s{i}'>Section {i}</a></li>" for i in range(rng.randint(20, 200)))
+        scripts = "".join(f"<script>var cfg{i} = {json.dumps([sentence()] * 20)};</script>" for i in range(rng.randint(2, 10)))
+        body = "".join(f"<p>{' '.join(sentence() for _ in range(5))}</p>" for _ in range(rng.randint(20, 400)))
+        html = (f"<html><head><title>Page {idx}</title>{scripts}</head><body><nav><ul>{nav}</ul></nav>"
+                f"<article><h1>Headline {idx}</h1>{body}</article>"
+                f"<footer>{' '.join(sentence() for _ in range(30))}</footer></body></html>")
+        pages.append((f"synthetic_{idx}.html", html.encode("utf-8")))
+    return pages
+
+
+def load_corpus(corpus_dir: str) -> List[Tuple[str, bytes]]:
+    paths = sorted(glob.glob(os.path.join(corpus_dir, "**", "*.htm*"), recursive=True))
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append((os.path.relpath(path, corpus_dir), f.read()))
+    return pages
+
+
+def time_impl(fn: Callable[[bytes], str], pages: List[Tuple[str, bytes]], repeat: int) -> Dict[str, float]:
+    per_page_ms = []
+    for _, html in pages:
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(html)
+            runs.append((time.perf_counter() - start) * 1000)
+        per_page_ms.append(min(runs))
+    return {
+        "total_ms": round(sum(per_page_ms), 3),
+        "mean_ms": round(statistics.mean(per_page_ms), 3),
+        "median_ms": round(statistics.median(per_page_ms), 3),
+        "max_ms": round(max(per_page_ms), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of saved HTML files")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else []
+    corpus_name = args.corpus
+    if not pages:
+        pages = synthetic_corpus()
+        corpus_name = "synthetic"
+
+    results = {
+        "corpus": corpus_name,
+        "pages": len(pages),
+        "bytes": sum(len(html) for _, html in pages),
+        "max_chars": MAX_CHARS,
+        "baseline_bs4": time_impl(baseline_extract, pages, args.repeat),
+        "bounded": time_impl(bounded_extract, pages, args.repeat),
+        "bounded_main_content": time_impl(bounded_main_extract, pages, args.repeat),
+    }
+    results["speedup"] = round(results["baseline_bs4"]["total_ms"] / max(results["bounded"]["total_ms"], 1e-9), 2)
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# stratos/benchmarks/bench_pipeline.py
+"""
+Benchmark: the full Stratos pipeline, offline, through the FastAPI app.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--runs 5] [--concurrency 1,4,16] [--memory-runs 3]
+        [--llm-latency-ms 50] [--tool-latency-ms 20] [--out results.json] [--baseline old.json]
+    python -m benchmarks.bench_pipeline --cassette slow-topic.jsonl.gz --topic "..." [--latency-scale 1.0]
+
+Every agent model is a FakeChatModel and every governed tool a fake
+adapter (see benchmarks/fakes.py), each with a fixed latency, so results
+measure Stratos' own overhead (API, job queue, checkpoints, governor,
+tracing, agents' pre/post-processing) and are comparable across commits.
+Runs go through the real app (POST /jobs + POST /analyze-topic) over
+httpx's in-process ASGI transport, against a throwaway cache directory.
+
+Reported:
+  latency      end-to-end time of sequential runs, per-node time (from the
+               run's trace) and the time spent outside any node
+  concurrency  wall time, throughput and latency percentiles with N runs
+               in flight at once
+  memory       tracemalloc peak per run (measured in separate runs, since
+               tracing allocations slows everything down)
+With --baseline, the headline numbers are compared to an earlier result file.
+
+With --cassette, the fakes are replaced by a cassette recorded from a real
+run (STRATOS_CASSETTE_MODE=record, see mcp/cassette.py): every run replays
+that topic's real tool and Gemini responses, with the recorded latencies
+scaled by --latency-scale. The concurrency phase is skipped, since
+concurrent runs of one topic would coalesce into a single run.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean_s": round(statistics.mean(values), 4),
+        "median_s": round(statistics.median(values), 4),
+        "p95_s": round(_percentile(values, 95), 4),
+        "min_s": round(min(values), 4),
+        "max_s": round(max(values), 4),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _configure_env(args: argparse.Namespace) -> str:
+    """Settings the app reads at import time, so they are set before importing it."""
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix="stratos-bench-")
+    os.environ["STRATOS_CACHE_DIR"] = cache_dir
+    os.environ["STRATOS_LLM_CACHE_MODE"] = "read_write" if args.llm_cache else "off"
+    os.environ["STRATOS_LOG_LEVEL"] = args.log_level
+    os.environ["STRATOS_WARMUP"] = "0"
+    os.environ["STRATOS_REPORT_CACHE_TTL_S"] = "0"
+    os.environ["STRATOS_JOB_WORKERS"] = str(max(args.concurrency))
+    os.environ["STRATOS_JOB_QUEUE_MAX"] = str(2 * max(args.concurrency) + args.runs)
+    os.environ["STRATOS_CHECKPOINTS"] = "0" if args.no_checkpoints else "1"
+    if args.cassette:
+        os.environ["STRATOS_CASSETTE_MODE"] = "replay"
+        os.environ["STRATOS_CASSETTE"] = os.path.abspath(args.cassette)
+        os.environ["STRATOS_CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    return cache_dir
+
+
+async def _one_run(client, topic: str) -> Dict[str, Any]:
+    from mcp.governor import get_governor
+
+    cassette = get_governor().cassette
+    if cassette is not None:
+        cassette.rewind()
+    start = time.perf_counter()
+    job = (await client.post("/jobs", json={"topic": topic})).json()
+    response = await client.post("/analyze-topic", json={"topic": topic, "job_id": job["job_id"]})
+    latency = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"run for '{topic}' failed: {response.status_code} {response.text[:200]}")
+    return {"job_id": job["job_id"], "latency_s": latency}
+
+
+_REPLAY_TOPIC: Optional[str] = None
+
+
+def _topic(label: str) -> str:
+    if _REPLAY_TOPIC is not None:
+        return _REPLAY_TOPIC  # a cassette only answers the topic it recorded
+    # Unique per run, so the coalescer and report cache never short-circuit a run.
+    return f"benchmark {label} {uuid.uuid4().hex[:8]}"
+
+
+async def _latency_phase(client, runs: int) -> Dict[str, Any]:
+    latencies, per_node, outside = [], {}, []
+    for i in range(runs):
+        run = await _one_run(client, _topic(f"seq{i}"))
+        latencies.append(run["latency_s"])
+        trace = (await client.get(f"/jobs/{run['job_id']}/trace")).json()
+        node_total = 0.0
+        for key, totals in trace["summary"].items():
+            kind, name = key.split(":", 1)
+            per_node.setdefault(key, []).append(totals["total_s"])
+            if kind == "node":
+                node_total += totals["total_s"]
+        outside.append(max(0.0, run["latency_s"] - node_total))
+    return {
+        "runs": runs,
+        "latency": _stats(latencies),
+        # "node:analyst", "llm:planner", "tool:gnews", ...: mean seconds per run
+        "spans_s": {key: round(statistics.mean(v), 4) for key, v in sorted(per_node.items())},
+        "outside_nodes_s": round(statistics.mean(outside), 4),
+    }
+
+
+async def _concurrency_phase(client, levels: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    for n in levels:
+        start = time.perf_counter()
+        runs = await asyncio.gather(*(_one_run(client, _topic(f"c{n}-{i}")) for i in range(n)))
+        wall = time.perf_counter() - start
+        latencies = [r["latency_s"] for r in runs]
+        results.append({
+            "concurrency": n,
+            "wall_s": round(wall, 4),
+            "throughput_runs_per_s": round(n / wall, 3),
+            "latency": _stats(latencies),
+        })
+    return results
+
+
+async def _memory_phase(client, runs: int) -> Dict[str, Any]:
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for i in range(runs):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await _one_run(client, _topic(f"mem{i}"))
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "runs": runs,
+        "peak_bytes_mean": int(statistics.mean(peaks)),
+        "peak_bytes_max": max(peaks),
+        "retained_bytes_mean": int(statistics.mean(retained)),
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    from benchmarks.fakes import install_fakes
+    import backend.api as api
+    from mcp.governor import get_governor
+
+    global _REPLAY_TOPIC
+    if args.cassette:
+        _REPLAY_TOPIC = args.topic
+    else:
+        install_fakes(args.llm_latency_ms / 1000, args.tool_latency_ms / 1000, args.results_per_call)
+    governor = get_governor()
+    if not args.tool_cache:
+        governor.cache = None
+    if not args.budgets:
+        governor.budget = None
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with api.lifespan(api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await _one_run(client, _topic("warmup"))  # graph compilation, first-use imports
+            results = {"latency": await _latency_phase(client, args.runs),
+                       "concurrency": [] if args.cassette else await _concurrency_phase(client, args.concurrency)}
+            if governor.cassette is not None:
+                results["cassette"] = governor.cassette.snapshot()
+            if args.memory_runs:
+                results["memory"] = await _memory_phase(client, args.memory_runs)
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Ratios current/baseline for the headline numbers (> 1 means slower / bigger, except throughput)."""
+
+    def ratio(new, old):
+        return round(new / old, 3) if new is not None and old else None
+
+    out = {"baseline_commit": baseline.get("commit"),
+           "latency_mean": ratio(results["latency"]["latency"]["mean_s"],
+                                 baseline.get("latency", {}).get("latency", {}).get("mean_s"))}
+    old_levels = {c["concurrency"]: c for c in baseline.get("concurrency", [])}
+    for level in results["concurrency"]:
+        old = old_levels.get(level["concurrency"])
+        if old is not None:
+            out[f"throughput_c{level['concurrency']}"] = ratio(level["throughput_runs_per_s"],
+                                                               old["throughput_runs_per_s"])
+    if "memory" in results and "memory" in baseline:
+        out["peak_bytes_mean"] = ratio(results["memory"]["peak_bytes_mean"], baseline["memory"]["peak_bytes_mean"])
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="sequential runs for the latency phase")
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 4, 16],
+                        help="comma-separated numbers of runs in flight at once")
+    parser.add_argument("--memory-runs", type=int, default=3, help="runs under tracemalloc (0 to skip)")
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--tool-latency-ms", type=float, default=20)
+    parser.add_argument("--results-per-call", type=int, default=5, help="hits returned by each fake tool call")
+    parser.add_argument("--tool-cache", action="store_true", help="keep the governor's tool cache on")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache on")
+    parser.add_argument("--budgets", action="store_true", help="keep cost budgets and rate limits on")
+    parser.add_argument("--no-checkpoints", action="store_true", help="run the graph without checkpoints")
+    parser.add_argument("--cache-dir", help="state directory (default: a fresh temporary directory)")
+    parser.add_argument("--cassette", help="replay this recorded cassette (.jsonl.gz) instead of the fakes")
+    parser.add_argument("--topic", help="the topic the cassette was recorded for (required with --cassette)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="replayed latency = recorded latency x this (0 = no delay)")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+    if args.cassette and not args.topic:
+        parser.error("--cassette needs the --topic it was recorded for")
+
+    cache_dir = _configure_env(args)
+    started = time.time()
+    results = {
+        "commit": _git_commit(),
+        "timestamp": round(started, 3),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "cache_dir")},
+        "cache_dir": cache_dir,
+        **asyncio.run(run_benchmark(args)),
+        "elapsed_s": round(time.time() - started, 3),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["vs_baseline"] = compare(results, json.load(f))
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
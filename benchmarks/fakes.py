@@ -0,0 +1,166 @@
+# stratos/benchmarks/fakes.py
+"""
+Deterministic stand-ins for Gemini and the tool adapters, for offline
+benchmarks.
+
+- FakeChatModel answers each agent with canned JSON after a fixed delay.
+  The analyst's draft cites the doc ids found in its prompt, so the
+  critic pre-screen approves it and the graph takes its normal path.
+- Fake tool adapters return `results_per_call` hits derived from the
+  query after a fixed delay, in sync and async flavours.
+
+install_fakes() registers both: the models through
+llm_factory.set_agent_llm (so the LLM cache and tracing layers still run)
+and the tools in MCPGovernor.toolbox / async_toolbox (so permissions,
+guards and tracing still run).
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+AGENTS = ("planner", "analyst", "critic", "strategist")
+TOOLS = ("tavily_search", "gnews", "arxiv_search", "read_webpage", "pdf_rag_query")
+
+_DOC_ID = re.compile(r"\[([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\]")
+_TOPIC = re.compile(r"TOPIC:\s*(.+)")
+
+_FILLER = ("Demand for the segment keeps growing as suppliers expand capacity and buyers "
+           "consolidate vendors, while regulation and input costs shape margins.")
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# --- Canned answers, one per agent ---
+def plan_response(prompt: str) -> str:
+    match = _TOPIC.search(prompt)
+    topic = match.group(1).strip() if match else "benchmark topic"
+    return json.dumps([
+        {"step_id": "web", "description": "General web coverage", "tool": "tavily_search",
+         "query": topic, "include_images": True},
+        {"step_id": "news", "description": "Recent news", "tool": "gnews",
+         "query": topic, "include_images": False},
+        {"step_id": "papers", "description": "Academic work", "tool": "arxiv_search",
+         "query": f"{topic} survey", "include_images": False},
+    ])
+
+
+def draft_response(prompt: str) -> str:
+    doc_ids = list(dict.fromkeys(_DOC_ID.findall(prompt))) or ["none"]
+
+    def cite(i: int) -> List[str]:
+        return [doc_ids[i % len(doc_ids)]]
+
+    return json.dumps({
+        "title": "Benchmark report",
+        "executive_summary": " ".join([_FILLER] * 2),
+        "market_trends": [{"point": f"Trend {i}: {_FILLER}", "citations": cite(i)} for i in range(3)],
+        "opportunities": [{"opportunity": f"Opportunity {i}: {_FILLER}", "impact": "high",
+                           "citations": cite(i + 1)} for i in range(2)],
+        "risks": [{"risk": f"Risk {i}: {_FILLER}", "likelihood": "medium", "citations": cite(i + 2)}
+                  for i in range(2)],
+        "comparison_table_markdown": "| a | b |\n|---|---|\n| 1 | 2 |",
+        "image_references": [],
+        "recommendations": [f"Recommendation {i}: {_FILLER}" for i in range(2)],
+        "metadata": {"doc_count": len(doc_ids)},
+    })
+
+
+def critique_response(prompt: str) -> str:
+    return "APPROVED"
+
+
+RESPONDERS: Dict[str, Callable[[str], str]] = {
+    "planner": plan_response,
+    "analyst": draft_response,
+    "critic": critique_response,
+    "strategist": draft_response,  # only used with strategist.mode: llm
+}
+
+
+class FakeChatModel(BaseChatModel):
+    """A chat model that sleeps `latency_s` and answers with `responder(prompt)`."""
+
+    agent: str
+    latency_s: float = 0.0
+    model: str = "fake-llm"
+    temperature: float = 0.0
+    responder: Optional[Callable[[str], str]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "stratos-fake"
+
+    def _answer(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        content = (self.responder or RESPONDERS[self.agent])(prompt)
+        message = AIMessage(content=content, usage_metadata={
+            "input_tokens": _estimate_tokens(prompt),
+            "output_tokens": _estimate_tokens(content),
+            "total_tokens": _estimate_tokens(prompt) + _estimate_tokens(content),
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self._answer(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        return self._answer(messages)
+
+
+# --- Fake tool adapters ---
+def _hits(tool_name: str, query: Any, count: int) -> List[Dict[str, Any]]:
+    text = json.dumps(query, sort_keys=True) if isinstance(query, dict) else str(query)
+    seed = hashlib.sha256(f"{tool_name}:{text}".encode("utf-8")).hexdigest()[:12]
+    return [{
+        "title": f"{tool_name} result {i} for {text[:60]}",
+        "url": f"https://example.com/{tool_name}/{seed}/{i}",
+        "content": f"{text} ({seed}-{i}). " + " ".join([_FILLER] * 3),
+        "source": tool_name,
+        "score": round(1.0 - i / (count + 1), 3),
+        "images": [],
+    } for i in range(count)]
+
+
+def fake_tool(tool_name: str, latency_s: float = 0.0, results_per_call: int = 5):
+    """(sync, async) adapters with the real adapters' call signatures."""
+
+    def call(query: Any = None, include_images: bool = False, **kwargs) -> list:
+        if latency_s:
+            time.sleep(latency_s)
+        return _hits(tool_name, kwargs or query, results_per_call)
+
+    async def acall(query: Any = None, include_images: bool = False, **kwargs) -> list:
+        if latency_s:
+            await asyncio.sleep(latency_s)
+        return _hits(tool_name, kwargs or query, results_per_call)
+
+    return call, acall
+
+
+def install_fakes(llm_latency_s: float = 0.05, tool_latency_s: float = 0.02, results_per_call: int = 5) -> None:
+    """Route every agent model and governed tool to the fakes above."""
+    from agents.llm_factory import set_agent_llm
+    from mcp.governor import get_governor
+
+    for agent in AGENTS:
+        set_agent_llm(agent, FakeChatModel(agent=agent, latency_s=llm_latency_s))
+
+    governor = get_governor()
+    for tool_name in TOOLS:
+        call, acall = fake_tool(tool_name, tool_latency_s, results_per_call)
+        governor.toolbox[tool_name] = call
+        governor.async_toolbox[tool_name] = acall
@@ -1,27 +1,33 @@
 import arxiv
 
-def arxiv_search(query: str, include_images: bool = False) -> list:
-    print(f"\n[Tool: ArXiv] Searching for: '{query}'")
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
 
-    try:
-        search = arxiv.Search(
-            query=query,
-            max_results=5,
-            sort_by=arxiv.SortCriterion.Relevance
-        )
-        results = []
+# One client for the whole process so its HTTP session (and connections) is reused.
+arxiv_client = arxiv.Client()
+
+def arxiv_search(query: str, include_images: bool = False) -> list:
+    """
+    Up to 5 papers for the query ([] if there are none). Network and API
+    errors propagate, so the governor's circuit breaker counts them.
+    """
+    log.debug(f"[Tool: ArXiv] Searching for: '{query}'")
 
-        for r in search.results():
-            results.append({
-                "title": r.title,
-                "url": r.pdf_url,
-                "content": r.summary,
-                "source": "arxiv",
-                "images": []
-            })
+    search = arxiv.Search(
+        query=query,
+        max_results=5,
+        sort_by=arxiv.SortCriterion.Relevance
+    )
+    results = []
 
-        return results
+    for r in arxiv_client.results(search):
+        results.append({
+            "title": r.title,
+            "url": r.pdf_url,
+            "content": r.summary,
+            "source": "arxiv",
+            "images": []
+        })
 
-    except Exception as e:
-        print(f"[Tool: ArXiv] ERROR: {e}")
-        return []
+    return results
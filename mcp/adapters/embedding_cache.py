@@ -0,0 +1,137 @@
+# stratos/mcp/adapters/embedding_cache.py
+"""
+Chunk-level embedding cache.
+
+CachedEmbeddings wraps any LangChain Embeddings model. Vectors are keyed by
+sha256(model name + task + chunk text), where task is "document" or "query"
+(Gemini embeds them with different task types, so the vectors differ),
+and stored compactly:
+
+  vectors.f32      append-only file of packed little-endian float32 vectors,
+                   read back through a memory map
+  index.sqlite3    key -> (offset, dim) into vectors.f32
+
+Cache misses from one embed_documents() call are de-duplicated and sent to
+the underlying model in as few batched requests as possible.
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+FLOAT_SIZE = 4
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, base: Embeddings, model_name: str, directory: str, batch_size: int = 100):
+        self.base = base
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._file = open(self._vectors_path, "ab+")
+        self._mm: Optional[mmap.mmap] = None
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, offset INTEGER NOT NULL, dim INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    # --- Storage helpers (caller holds the lock) ---
+    def _key(self, text: str, task: str = "document") -> str:
+        return hashlib.sha256(f"{self.model_name}\0{task}\0{text}".encode("utf-8")).hexdigest()
+
+    def _mapped(self, end: int) -> mmap.mmap:
+        """Return a memory map covering at least `end` bytes, remapping if the file grew."""
+        if self._mm is None or len(self._mm) < end:
+            if self._mm is not None:
+                self._mm.close()
+            self._file.flush()
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 500):  # stay under SQLite's variable limit
+            part = unique[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, offset, dim FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            for key, offset, dim in rows:
+                mm = self._mapped((offset + dim) * FLOAT_SIZE)
+                found[key] = list(struct.unpack_from(f"<{dim}f", mm, offset * FLOAT_SIZE))
+        return found
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell() // FLOAT_SIZE
+        rows = []
+        for key, vector in items.items():
+            self._file.write(struct.pack(f"<{len(vector)}f", *vector))
+            rows.append((key, offset, len(vector)))
+            offset += len(vector)
+        self._file.flush()
+        self._conn.executemany("INSERT OR IGNORE INTO embeddings (key, offset, dim) VALUES (?, ?, ?)", rows)
+        self._conn.commit()
+
+    # --- Embeddings interface ---
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        with self._lock:
+            cached = self._lookup(keys)
+
+        # De-duplicate misses (boilerplate chunks often repeat inside one PDF)
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - sum(1 for k in keys if k in missing)
+        self.misses += len(missing)
+
+        if missing:
+            log.info(f"[EmbeddingCache] {len(texts) - len(missing)}/{len(texts)} chunks cached, "
+                     f"embedding {len(missing)} in batches of {self.batch_size}.")
+            miss_keys = list(missing)
+            fresh: Dict[str, List[float]] = {}
+            for start in range(0, len(miss_keys), self.batch_size):
+                batch = miss_keys[start:start + self.batch_size]
+                vectors = self.base.embed_documents([missing[k] for k in batch])
+                fresh.update(zip(batch, vectors))
+            with self._lock:
+                self._store(fresh)
+            cached.update(fresh)
+
+        return [list(cached[k]) for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text, task="query")
+        with self._lock:
+            cached = self._lookup([key])
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+
+        self.misses += 1
+        vector = self.base.embed_query(text)
+        with self._lock:
+            self._store({key: vector})
+        return vector
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,178 @@
+# stratos/mcp/adapters/html_extract.py
+"""
+Bounded, streaming HTML -> text extraction for read_webpage.
+
+Instead of building a full DOM and throwing most of it away, the extractor
+feeds the response to an HTMLParser chunk by chunk, drops boilerplate
+subtrees (script/style/nav/header/footer/form controls/...) and stops
+reading as soon as the character budget is filled. A <header> inside an
+<article> or <main> element is kept (it usually holds the headline), and
+<form> is not skipped: ASP.NET WebForms pages wrap the whole body in one.
+
+With main_content=True it keeps only text inside <article>, <main> or
+role="main" elements, falling back to the whole page if none turn up.
+"""
+
+import codecs
+from html.parser import HTMLParser
+from typing import AsyncIterable, Iterable, List, Optional, Union
+
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "head", "nav", "header", "footer", "aside", "button", "select", "textarea",
+}
+MAIN_TAGS = {"article", "main"}
+
+# With main_content=True and no main element yet, give up after this many
+# characters of general text (as a multiple of the budget).
+MAIN_SCAN_FACTOR = 4
+# A main element with less text than this is treated as "not found".
+MIN_MAIN_CHARS = 200
+
+
+class _BudgetReached(Exception):
+    pass
+
+
+class BoundedTextExtractor(HTMLParser):
+    def __init__(self, max_chars: int = 4000, main_content: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.main_content = main_content
+        self._skip_stack: List[str] = []
+        # Outermost main element currently open, and how many same-named tags are nested in it
+        self._main_tag: Optional[str] = None
+        self._main_nest = 0
+        self._text: List[str] = []
+        self._text_len = 0
+        self._main: List[str] = []
+        self._main_len = 0
+        # Text of the current text node; it can arrive split across feed() chunks.
+        self._pending: List[str] = []
+
+    # --- HTMLParser hooks ---
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag == "body" and "head" in self._skip_stack:
+            # </head> is optional in HTML; don't let a missing one swallow the page.
+            self._skip_stack = self._skip_stack[:self._skip_stack.index("head")]
+        if tag in SKIP_TAGS and not (tag == "header" and self._main_tag is not None and not self._skip_stack):
+            self._skip_stack.append(tag)
+        elif self._main_tag is None and (tag in MAIN_TAGS or ("role", "main") in attrs):
+            self._main_tag, self._main_nest = tag, 1
+        elif tag == self._main_tag:
+            self._main_nest += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in self._skip_stack:
+            # Also closes skipped elements left unclosed inside it (e.g. <nav><select>...</nav>).
+            depth = len(self._skip_stack) - 1 - self._skip_stack[::-1].index(tag)
+            del self._skip_stack[depth:]
+        elif tag == self._main_tag:
+            self._main_nest -= 1
+            if self._main_nest == 0:
+                self._main_tag = None
+
+    def handle_data(self, data):
+        if not self._skip_stack:
+            self._pending.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        text = " ".join("".join(self._pending).split())
+        self._pending = []
+        if not text:
+            return
+
+        self._text.append(text)
+        self._text_len += len(text) + 1
+        if self._main_tag is not None:
+            self._main.append(text)
+            self._main_len += len(text) + 1
+
+        if self.main_content:
+            if self._main_len >= self.max_chars or self._text_len >= self.max_chars * MAIN_SCAN_FACTOR:
+                raise _BudgetReached()
+        elif self._text_len >= self.max_chars:
+            raise _BudgetReached()
+
+    # --- Result ---
+    def text(self) -> str:
+        if self.main_content and self._main_len >= min(MIN_MAIN_CHARS, self.max_chars):
+            parts = self._main
+        else:
+            parts = self._text
+        return " ".join(parts)[:self.max_chars]
+
+
+class StreamingExtraction:
+    """Incremental driver: feed() raw chunks until it returns True, then call text()."""
+
+    def __init__(self, max_chars: int = 4000, main_content: bool = False,
+                 encoding: str = "utf-8", max_bytes: int = 2 * 1024 * 1024):
+        self.parser = BoundedTextExtractor(max_chars=max_chars, main_content=main_content)
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self.max_bytes = max_bytes
+        self.consumed = 0
+        self.done = False
+
+    def feed(self, chunk: Union[bytes, str]) -> bool:
+        if self.done:
+            return True
+        self.consumed += len(chunk)
+        if isinstance(chunk, bytes):
+            chunk = self.decoder.decode(chunk)
+        try:
+            self.parser.feed(chunk)
+        except _BudgetReached:
+            self.done = True
+        if self.consumed >= self.max_bytes:
+            self._finish()  # byte cap: keep the text buffered so far
+        return self.done
+
+    def _finish(self) -> None:
+        """Flush the decoder and the parser's pending text, once."""
+        if self.done:
+            return
+        try:
+            self.parser.feed(self.decoder.decode(b"", final=True))
+            self.parser.close()
+        except _BudgetReached:
+            pass
+        self.done = True
+
+    def text(self) -> str:
+        self._finish()
+        return self.parser.text()
+
+
+def extract_text(chunks: Iterable[Union[bytes, str]], max_chars: int = 4000,
+                 main_content: bool = False, encoding: str = "utf-8",
+                 max_bytes: int = 2 * 1024 * 1024) -> str:
+    """
+    Extract up to `max_chars` of readable text from HTML delivered in chunks
+    (e.g. response.iter_content()). Stops consuming `chunks` once the budget
+    is filled or `max_bytes` have been read.
+    """
+    extraction = StreamingExtraction(max_chars, main_content, encoding, max_bytes)
+    for chunk in chunks:
+        if extraction.feed(chunk):
+            break
+    return extraction.text()
+
+
+async def aextract_text(chunks: AsyncIterable[Union[bytes, str]], max_chars: int = 4000,
+                        main_content: bool = False, encoding: str = "utf-8",
+                        max_bytes: int = 2 * 1024 * 1024) -> str:
+    """Async twin of extract_text for httpx's response.aiter_bytes()."""
+    extraction = StreamingExtraction(max_chars, main_content, encoding, max_bytes)
+    async for chunk in chunks:
+        if extraction.feed(chunk):
+            break
+    return extraction.text()
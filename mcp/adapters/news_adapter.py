@@ -1,21 +1,39 @@
-from gnews import GNews
+import threading
+
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+# Created on first use, not at import time.
+gnews_client = None
+_client_lock = threading.Lock()
+
+
+def get_gnews_client():
+    global gnews_client
+    if gnews_client is None:
+        with _client_lock:
+            if gnews_client is None:
+                from gnews import GNews
+
+                gnews_client = GNews(language='en', country='US', max_results=5)
+    return gnews_client
 
-gnews_client = GNews(language='en', country='US', max_results=5)
 
 def gnews(query: str, include_images: bool = False) -> list:
-    print(f"\n[Tool: GNews] Searching for: '{query}'")
-    try:
-        articles = gnews_client.get_news(query)
-        results = []
-        for article in articles:
-            results.append({
-                "title": article['title'],
-                "url": article['url'],
-                "content": article['description'],
-                "source": article['publisher']['title'],
-                "images": []
-            })
-        return results
-    except Exception as e:
-        print(f"[Tool: GNews] ERROR: {e}")
-        return []
+    """
+    Recent articles for the query ([] if there are none). Network errors
+    propagate, so the governor's circuit breaker counts them.
+    """
+    log.debug(f"[Tool: GNews] Searching for: '{query}'")
+    articles = get_gnews_client().get_news(query)
+    results = []
+    for article in articles:
+        results.append({
+            "title": article['title'],
+            "url": article['url'],
+            "content": article['description'],
+            "source": article['publisher']['title'],
+            "images": []
+        })
+    return results
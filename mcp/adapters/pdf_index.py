@@ -0,0 +1,77 @@
+# stratos/mcp/adapters/pdf_index.py
+"""
+Bookkeeping for the persistent PDF index used by pdf_rag_adapter.
+
+Each indexed PDF gets one Chroma collection named after its content hash,
+so two URLs serving the same bytes share the same embeddings. A small
+SQLite manifest maps every URL (plus an optional page selection, e.g.
+"<url>#pages=3-10") to the hash it last served plus the HTTP
+validators (ETag / Last-Modified) needed to cheaply check for changes.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def collection_name_for(content_hash: str) -> str:
+    # Chroma: 3-63 chars of [a-zA-Z0-9._-]
+    return f"pdf_{content_hash[:32]}"
+
+
+class PdfIndexManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pdf_index (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                chunk_count INTEGER NOT NULL,
+                indexed_at REAL NOT NULL,
+                checked_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pdf_index WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM pdf_index WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def put(self, url: str, content_hash: str, chunk_count: int,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdf_index "
+                "(url, content_hash, collection, etag, last_modified, chunk_count, indexed_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, content_hash, collection_name_for(content_hash), etag, last_modified,
+                 chunk_count, now, now),
+            )
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Record that the entry was just revalidated against the origin."""
+        with self._lock:
+            self._conn.execute("UPDATE pdf_index SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def is_referenced(self, content_hash: str) -> bool:
+        return self.find_by_hash(content_hash) is not None
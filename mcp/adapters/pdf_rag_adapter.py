@@ -1,22 +1,286 @@
-import requests
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
 import pymupdf  # PDF text extraction
-from langchain_community.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from dotenv import load_dotenv
 
+from ..http_client import http_get
+from ..storage import cache_path
+from .pdf_index import PdfIndexManifest, collection_name_for
+from .embedding_cache import CachedEmbeddings
+from telemetry.log import get_logger
+
 load_dotenv()
 
-# Initialize expensive components once
-print("[Tool: PDF_RAG] Initializing components (Embeddings, Splitter)...")
-embeddings_model = GoogleGenerativeAIEmbeddings(model="gemini-embedding-001")
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-print("[Tool: PDF_RAG] Components ready.")
+log = get_logger(__name__)
+
+# How long an indexed PDF is trusted before we ask the origin whether it changed.
+REVALIDATE_AFTER_S = float(os.getenv("STRATOS_PDF_REVALIDATE_S", "3600"))
+# Hard ceiling on downloaded bytes; larger PDFs are rejected mid-stream.
+MAX_PDF_BYTES = int(os.getenv("STRATOS_PDF_MAX_BYTES", str(50 * 1024 * 1024)))
+STREAM_CHUNK_BYTES = 64 * 1024
+INDEX_BATCH_CHUNKS = 64  # chunks embedded + written per add_texts call
+EMBEDDING_MODEL = "gemini-embedding-001"
+
+
+class PdfRejected(ValueError):
+    """The query cannot be served as asked (bad page selection, PDF too large): not a tool failure."""
+
+
+class _Components(NamedTuple):
+    embeddings: Any       # CachedEmbeddings over GoogleGenerativeAIEmbeddings
+    splitter: Any         # RecursiveCharacterTextSplitter
+    chroma_client: Any    # chromadb.PersistentClient
+    manifest: PdfIndexManifest
+
+
+# Expensive components (embeddings client, Chroma) are initialized once,
+# on the first PDF query rather than at import time.
+_components: Optional[_Components] = None
+_components_lock = threading.Lock()
+# One lock per index (content hash): a document is built once even when several
+# URLs serve it, while different documents are downloaded and embedded in parallel.
+_index_locks: Dict[str, threading.Lock] = {}
+_index_locks_lock = threading.Lock()
+
+
+def get_components() -> _Components:
+    global _components
+    if _components is None:
+        with _components_lock:
+            if _components is None:
+                import chromadb
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+                log.info("[Tool: PDF_RAG] Initializing components (Embeddings, Splitter, Index)...")
+                _components = _Components(
+                    embeddings=CachedEmbeddings(
+                        GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL),
+                        model_name=EMBEDDING_MODEL,
+                        directory=cache_path("embeddings", EMBEDDING_MODEL),
+                    ),
+                    splitter=RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100),
+                    chroma_client=chromadb.PersistentClient(path=cache_path("pdf_index", "chroma")),
+                    manifest=PdfIndexManifest(cache_path("pdf_index", "manifest.sqlite3")),
+                )
+                log.info("[Tool: PDF_RAG] Components ready.")
+    return _components
+
+
+def _index_lock(index_hash: str) -> threading.Lock:
+    with _index_locks_lock:
+        return _index_locks.setdefault(index_hash, threading.Lock())
+
+
+def _snippet(url: str, content: str) -> dict:
+    return {
+        "title": "PDF Snippet",
+        "url": url,
+        "content": content,
+        "source": "pdf_rag",
+        "images": []
+    }
+
+
+def _open_store(index_hash: str):
+    from langchain_community.vectorstores import Chroma
+
+    components = get_components()
+    return Chroma(
+        client=components.chroma_client,
+        collection_name=collection_name_for(index_hash),
+        embedding_function=components.embeddings,
+    )
+
+
+def _drop_collection(index_hash: str) -> None:
+    try:
+        get_components().chroma_client.delete_collection(collection_name_for(index_hash))
+    except Exception:
+        pass  # already gone
+
+
+def _page_number(value: Any, what: str) -> int:
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise PdfRejected(f"Invalid {what} '{value}': expected a page number.")
+    if number < 1:
+        raise PdfRejected(f"Invalid {what} '{value}': pages start at 1.")
+    return number
+
+
+def _page_selection(pages: Optional[str], max_pages: Optional[int]) -> str:
+    """
+    Canonical description of which pages get indexed ("" = all pages).
+    Raises PdfRejected for selections that cannot match any page.
+    """
+    if pages:
+        start, dash, end = str(pages).partition("-")
+        first = _page_number(start, "pages")
+        last = _page_number(end, "pages") if dash else first
+        if last < first:
+            raise PdfRejected(f"Invalid pages '{pages}': the range is reversed.")
+        return f"pages={first}-{last}" if last != first else f"pages={first}"
+    if max_pages:
+        return f"first={_page_number(max_pages, 'max_pages')}"
+    return ""
+
+
+def _page_range(page_count: int, selection: str) -> range:
+    """Turn a selection like "pages=3-10", "pages=5" or "first=20" into 0-based page indexes."""
+    if selection.startswith("first="):
+        return range(0, min(page_count, int(selection[len("first="):])))
+    if selection.startswith("pages="):
+        start, _, end = selection[len("pages="):].partition("-")
+        first = int(start)
+        last = min(page_count, int(end) if end else first)
+        if first > page_count:
+            raise PdfRejected(f"Page {first} is past the end of the PDF ({page_count} pages).")
+        return range(first - 1, last)
+    return range(page_count)
+
+
+def _download(url: str, headers: dict, dest) -> Optional[Tuple[Mapping[str, str], str]]:
+    """
+    Stream the PDF into `dest` (a binary file) without holding it in memory,
+    enforcing MAX_PDF_BYTES. Returns None on 304 Not Modified, otherwise
+    (response headers, sha256 of the body).
+    """
+    with http_get(url, headers=headers, timeout=15, stream=True) as response:
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+
+        declared = int(response.headers.get("Content-Length") or 0)
+        if declared > MAX_PDF_BYTES:
+            raise PdfRejected(f"PDF is {declared} bytes, over the {MAX_PDF_BYTES}-byte limit.")
+
+        digest = hashlib.sha256()
+        received = 0
+        for block in response.iter_content(chunk_size=STREAM_CHUNK_BYTES):
+            received += len(block)
+            if received > MAX_PDF_BYTES:
+                raise PdfRejected(f"PDF exceeds the {MAX_PDF_BYTES}-byte limit.")
+            digest.update(block)
+            dest.write(block)
+        dest.flush()
+        return response.headers, digest.hexdigest()
+
+
+def _build_index(pdf_path: str, index_hash: str, selection: str) -> int:
+    """
+    Extract and chunk the PDF page by page, embedding in batches so only
+    one batch of text is in memory at a time. Returns the chunk count.
+    """
+    _drop_collection(index_hash)  # clear any half-built leftovers
+    store = _open_store(index_hash)
+    total = 0
+    batch = []
+    with pymupdf.open(pdf_path) as doc:
+        page_range = _page_range(doc.page_count, selection)
+        log.debug(f"[Tool: PDF_RAG] Indexing pages {page_range.start + 1}-{page_range.stop} of {doc.page_count}...")
+        for page_no in page_range:
+            text = doc[page_no].get_text()
+            if not text.strip():
+                continue
+            batch.extend(get_components().splitter.split_text(text))
+            if len(batch) >= INDEX_BATCH_CHUNKS:
+                store.add_texts(texts=batch)
+                total += len(batch)
+                batch = []
+    if batch:
+        store.add_texts(texts=batch)
+        total += len(batch)
 
+    if total == 0:
+        _drop_collection(index_hash)
+        raise ValueError("No text extracted from PDF.")
+    return total
 
-def pdf_rag_query(url: str, query: str, include_images: bool = False) -> list:
+
+def _resolve_index(url: str, selection: str = "") -> str:
     """
-    Performs a full RAG workflow on a live PDF URL.
+    Make sure an up-to-date index exists for `url` (and page selection) and return its hash.
+
+    - Fresh manifest entry: reuse it without touching the network.
+    - Stale entry: conditional GET (ETag / Last-Modified); 304 or same hash -> reuse.
+    - New or changed document: stream it to disk, then extract, chunk and embed
+      into a new collection, dropping the old collection if no other entry
+      still points at it.
+    """
+    manifest = get_components().manifest
+    index_key = f"{url}#{selection}" if selection else url
+    entry = manifest.get(index_key)
+    if entry and time.time() - entry["checked_at"] < REVALIDATE_AFTER_S:
+        log.info("[Tool: PDF_RAG] Using cached index (fresh).")
+        return entry["content_hash"]
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+        # 1. Download PDF (streamed, size-capped)
+        log.debug("[Tool: PDF_RAG] Downloading PDF...")
+        downloaded = _download(url, headers, tmp)
+        if downloaded is None:
+            if not entry:
+                raise ValueError("Server answered 304 Not Modified for an unindexed PDF.")
+            log.info("[Tool: PDF_RAG] PDF not modified. Using cached index.")
+            manifest.touch(index_key)
+            return entry["content_hash"]
+
+        response_headers, index_hash = downloaded
+        if selection:
+            index_hash = hashlib.sha256(f"{index_hash}|{selection}".encode("utf-8")).hexdigest()
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+
+        with _index_lock(index_hash):
+            if entry and entry["content_hash"] == index_hash:
+                log.info("[Tool: PDF_RAG] PDF unchanged. Using cached index.")
+                manifest.put(index_key, index_hash, entry["chunk_count"], etag, last_modified)
+                return index_hash
+
+            shared = manifest.find_by_hash(index_hash)
+            if shared:
+                log.info("[Tool: PDF_RAG] Same document already indexed under another URL.")
+                manifest.put(index_key, index_hash, shared["chunk_count"], etag, last_modified)
+            else:
+                # 2-4. Extract, chunk and embed page by page
+                chunk_count = _build_index(tmp.name, index_hash, selection)
+                log.info(f"[Tool: PDF_RAG] Indexed {chunk_count} chunks.")
+                manifest.put(index_key, index_hash, chunk_count, etag, last_modified)
+
+        if entry and entry["content_hash"] != index_hash:
+            log.info("[Tool: PDF_RAG] Document changed. Invalidating previous index.")
+            with _index_lock(entry["content_hash"]):
+                if not manifest.is_referenced(entry["content_hash"]):
+                    _drop_collection(entry["content_hash"])
+
+    return index_hash
+
+
+def pdf_rag_query(url: str, query: str, include_images: bool = False,
+                  pages: Optional[str] = None, max_pages: Optional[int] = None) -> list:
+    """
+    Performs a RAG workflow on a live PDF URL, backed by a persistent index.
+    Only the first query against a PDF downloads and embeds it; follow-up
+    queries only embed the query and run retrieval.
+
+    Optional page selection (1-based, inclusive):
+      pages="3-10" or pages="5"  -> index only those pages
+      max_pages=20               -> index only the first 20 pages
+    An invalid selection, or a PDF over MAX_PDF_BYTES, returns no results
+    (not an error: the tool is healthy, the request is not).
     Updated to match the unified adapter return format:
     
     Returns:
@@ -30,71 +294,33 @@ def pdf_rag_query(url: str, query: str, include_images: bool = False) -> list:
       }
     ]
     """
-    print(f"\n[Tool: PDF_RAG] Starting RAG for URL: {url}")
+    log.debug(f"[Tool: PDF_RAG] Starting RAG for URL: {url}")
 
     try:
-        # 1. Download PDF
-        print("[Tool: PDF_RAG] Downloading PDF...")
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-
-        # 2. Extract text
-        print("[Tool: PDF_RAG] Extracting text from PDF...")
-        with pymupdf.open("pdf", response.content) as doc:
-            full_text = "".join(page.get_text() for page in doc)
-
-        if not full_text.strip():
-            print("[Tool: PDF_RAG] No text extracted.")
-            return [{
-                "title": "PDF Snippet",
-                "url": url,
-                "content": "ERROR: No text extracted from PDF.",
-                "source": "pdf_rag",
-                "images": []
-            }]
-
-        # 3. Chunk text
-        print(f"[Tool: PDF_RAG] Splitting {len(full_text)} chars into chunks...")
-        chunks = text_splitter.split_text(full_text)
-
-        # 4. Embed + Create Vector Store
-        print(f"[Tool: PDF_RAG] Creating vector store with {len(chunks)} chunks...")
-        vector_store = Chroma.from_texts(texts=chunks, embedding=embeddings_model)
+        index_hash = _resolve_index(url, _page_selection(pages, max_pages))
 
         # 5. Retrieve relevant chunks
-        print(f"[Tool: PDF_RAG] Querying vector store for: {query}")
-        retriever = vector_store.as_retriever(search_kwargs={"k": 3})
+        log.debug(f"[Tool: PDF_RAG] Querying vector store for: {query}")
+        retriever = _open_store(index_hash).as_retriever(search_kwargs={"k": 3})
         relevant_docs = retriever.invoke(query)
 
         if not relevant_docs:
-            return [{
-                "title": "PDF Snippet",
-                "url": url,
-                "content": "No relevant text found for query.",
-                "source": "pdf_rag",
-                "images": []
-            }]
+            return [_snippet(url, "No relevant text found for query.")]
 
         # 6. Format into unified structure
         results = []
         for doc in relevant_docs:
-            results.append({
-                "title": "PDF Snippet",
-                "url": url,
-                "content": doc.page_content[:2000],  # Keep reasonable size
-                "source": "pdf_rag",
-                "images": []
-            })
-
-        print("[Tool: PDF_RAG] RAG complete. Returning structured results.")
+            results.append(_snippet(url, doc.page_content[:2000]))  # Keep reasonable size
+
+        log.debug("[Tool: PDF_RAG] RAG complete. Returning structured results.")
         return results
 
+    except PdfRejected as e:
+        log.warning(f"[Tool: PDF_RAG] No results: {e}")
+        return []
+    except ValueError as e:
+        log.warning(f"[Tool: PDF_RAG] {e}")
+        return [_snippet(url, f"ERROR: {e}")]
     except Exception as e:
-        print(f"[Tool: PDF_RAG] ERROR: {e}")
-        return [{
-            "title": "PDF Snippet",
-            "url": url,
-            "content": f"Error during PDF RAG processing: {str(e)}",
-            "source": "pdf_rag",
-            "images": []
-        }]
+        log.error(f"[Tool: PDF_RAG] ERROR: {e}")
+        return [_snippet(url, f"Error during PDF RAG processing: {str(e)}")]
@@ -1,16 +1,73 @@
 # Create this file: insightbridge/mcp/adapters/tavily_adapter.py
 
 import os
-from tavily import TavilyClient
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional, Tuple
 
-# Initialize the client once, when the file is loaded
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+# Clients are created on first use (not at import), so importing this
+# module needs neither the tavily SDK's network setup nor an API key.
 tavily_client = None
-if TavilyClient is not None:
-    try:
-        tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-    except Exception as e:
-        print(f"[tavily_adapter] Could not init TavilyClient: {e}")
+async_tavily_client = None
+_clients_ready = False
+_clients_lock = threading.Lock()
+
+
+def get_tavily_clients() -> Tuple[Optional[Any], Optional[Any]]:
+    """(TavilyClient, AsyncTavilyClient), either of which is None if it could not be built."""
+    global tavily_client, async_tavily_client, _clients_ready
+    if not _clients_ready:
+        with _clients_lock:
+            if not _clients_ready:
+                from tavily import TavilyClient, AsyncTavilyClient
+
+                try:
+                    tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+                except Exception as e:
+                    log.warning(f"[tavily_adapter] Could not init TavilyClient: {e}")
+                try:
+                    async_tavily_client = AsyncTavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+                except Exception as e:
+                    log.warning(f"[tavily_adapter] Could not init AsyncTavilyClient: {e}")
+                _clients_ready = True
+    return tavily_client, async_tavily_client
+
+
+def _placeholder(query: str) -> List[Dict[str, Any]]:
+    return [{
+        "title": f"Placeholder result for {query}",
+        "url": "",
+        "content": f"No tavily client configured. Query was: {query}",
+        "images": [],
+        "score": 0.0
+    }]
+
+
+def _error(e: Exception) -> List[Dict[str, Any]]:
+    return [{
+        "title": "Error",
+        "url": "",
+        "content": f"Error in Tavily search: {e}",
+        "images": [],
+        "score": 0.0
+    }]
+
+
+def _format_results(result: Dict[str, Any], include_images: bool) -> List[Dict[str, Any]]:
+    results = []
+    for obj in result.get("results", []):
+        images = obj.get("images", []) if include_images else []
+        results.append({
+            "title": obj.get("title") or obj.get("heading") or "",
+            "url": obj.get("url") or obj.get("link") or "",
+            "content": obj.get("content") or obj.get("snippet") or "",
+            "images": images,
+            "score": float(obj.get("score") or 0.0)
+        })
+    return results
 
 
 def tavily_search(query: str, include_images: bool = False, max_results: int = 5) -> List[Dict[str, Any]]:
@@ -18,16 +75,11 @@ def tavily_search(query: str, include_images: bool = False, max_results: int = 5
     Run Tavily search and return list of result objects:
     { title, url, content, images: [...], score }
     """
-    print(f"\n[Tool: Tavily] Searching for: '{query}' (include_images={include_images})")
+    log.debug(f"[Tool: Tavily] Searching for: '{query}' (include_images={include_images})")
+    tavily_client, _ = get_tavily_clients()
     if tavily_client is None:
-        print("[Tool: Tavily] Tavily client not configured. Returning placeholder.")
-        return [{
-            "title": f"Placeholder result for {query}",
-            "url": "",
-            "content": f"No tavily client configured. Query was: {query}",
-            "images": [],
-            "score": 0.0
-        }]
+        log.warning("[Tool: Tavily] Tavily client not configured. Returning placeholder.")
+        return _placeholder(query)
 
     try:
         result = tavily_client.search(
@@ -36,23 +88,28 @@ def tavily_search(query: str, include_images: bool = False, max_results: int = 5
             max_results=max_results,
             include_images=include_images
         )
-        results = []
-        for obj in result.get("results", []):
-            images = obj.get("images", []) if include_images else []
-            results.append({
-                "title": obj.get("title") or obj.get("heading") or "",
-                "url": obj.get("url") or obj.get("link") or "",
-                "content": obj.get("content") or obj.get("snippet") or "",
-                "images": images,
-                "score": float(obj.get("score") or 0.0)
-            })
-        return results
+        return _format_results(result, include_images)
+    except Exception as e:
+        log.error(f"[Tool: Tavily] ERROR: {e}")
+        return _error(e)
+
+
+async def atavily_search(query: str, include_images: bool = False, max_results: int = 5) -> List[Dict[str, Any]]:
+    """Async twin of tavily_search (same result shape)."""
+    log.debug(f"[Tool: Tavily] Searching for: '{query}' (include_images={include_images})")
+    _, async_tavily_client = get_tavily_clients()
+    if async_tavily_client is None:
+        log.warning("[Tool: Tavily] Tavily client not configured. Returning placeholder.")
+        return _placeholder(query)
+
+    try:
+        result = await async_tavily_client.search(
+            query=query,
+            search_depth="advanced",
+            max_results=max_results,
+            include_images=include_images
+        )
+        return _format_results(result, include_images)
     except Exception as e:
-        print(f"[Tool: Tavily] ERROR: {e}")
-        return [{
-            "title": "Error",
-            "url": "",
-            "content": f"Error in Tavily search: {e}",
-            "images": [],
-            "score": 0.0
-        }]
\ No newline at end of file
+        log.error(f"[Tool: Tavily] ERROR: {e}")
+        return _error(e)
@@ -1,25 +1,64 @@
-import requests
-from bs4 import BeautifulSoup
+import codecs
 
-def read_webpage(url: str, include_images: bool = False) -> list:
-    print(f"\n[Tool: WebReader] Reading: {url}")
+from ..http_client import ahttp_stream, http_get
+from .html_extract import aextract_text, extract_text
+from telemetry.log import get_logger
 
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=10)
+log = get_logger(__name__)
+
+MAX_CHARS = 4000
+
+
+def _response_encoding(response) -> str:
+    # requests falls back to ISO-8859-1 for text/* without a charset; most pages are UTF-8.
+    # (Works for both requests and httpx responses.)
+    if "charset" in response.headers.get("Content-Type", "").lower() and response.encoding:
+        try:
+            return codecs.lookup(response.encoding).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def _page_result(url: str, text: str) -> list:
+    return [{
+        "title": "Webpage Content",
+        "url": url,
+        "content": text,
+        "source": "web_reader",
+        "images": []
+    }]
+
+
+def read_webpage(url: str, include_images: bool = False, main_content: bool = False) -> list:
+    log.debug(f"[Tool: WebReader] Reading: {url}")
+
+    # Stream the body and stop reading once MAX_CHARS of text are extracted.
+    # HTTP errors, timeouts and connection failures propagate, so the
+    # governor's circuit breaker counts them.
+    with http_get(url, timeout=10, stream=True) as response:
         response.raise_for_status()
+        text = extract_text(
+            response.iter_content(chunk_size=16 * 1024),
+            max_chars=MAX_CHARS,
+            main_content=main_content,
+            encoding=_response_encoding(response),
+        )
+
+    return _page_result(url, text)
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        text = ' '.join(t.strip() for t in soup.stripped_strings)
 
-        return [{
-            "title": "Webpage Content",
-            "url": url,
-            "content": text[:4000],
-            "source": "web_reader",
-            "images": []
-        }]
+async def aread_webpage(url: str, include_images: bool = False, main_content: bool = False) -> list:
+    """Async twin of read_webpage (httpx streaming, same extraction)."""
+    log.debug(f"[Tool: WebReader] Reading: {url}")
+
+    async with ahttp_stream(url, timeout=10) as response:
+        response.raise_for_status()
+        text = await aextract_text(
+            response.aiter_bytes(16 * 1024),
+            max_chars=MAX_CHARS,
+            main_content=main_content,
+            encoding=_response_encoding(response),
+        )
 
-    except Exception as e:
-        print(f"[Tool: WebReader] ERROR: {e}")
-        return []
+    return _page_result(url, text)
@@ -0,0 +1,213 @@
+# stratos/mcp/budget.py
+"""
+Cost and rate budgets enforced by MCPGovernor (budgets: in config.yml).
+
+- Every non-cached tool call is charged a flat per-tool price
+  (budgets.tool_costs_usd) against the calling agent and the graph run it
+  belongs to. A call that would push the agent past its
+  agents.<name>.cost_budget_usd (per run) or the run past
+  budgets.run_budget_usd is rejected with BudgetExceeded. Calls without a
+  run id (scripts calling the governor directly) are counted but never
+  capped, since both budgets are per run.
+- Each tool has a token bucket sized to its provider quota
+  (budgets.rate_limits). A call without a free token queues for up to
+  budgets.max_wait_s and is then rejected with RateLimited.
+
+Both errors subclass PermissionError, so callers that already handle the
+governor's permission denials (e.g. the ResearchAgent) skip the step.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class BudgetExceeded(PermissionError):
+    """The call would exceed an agent's or a run's cost budget."""
+
+
+class RateLimited(BudgetExceeded):
+    """No rate-limit token became available within max_wait_s."""
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.rate = float(per_minute) / 60.0
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token. Returns 0 if one was free, else the seconds until the next one (nothing taken)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def acquire(self, max_wait_s: float) -> bool:
+        deadline = time.monotonic() + max_wait_s
+        while True:
+            wait_s = self.reserve()
+            if wait_s == 0.0:
+                return True
+            if time.monotonic() + wait_s > deadline:
+                return False
+            time.sleep(wait_s)
+
+    async def aacquire(self, max_wait_s: float) -> bool:
+        deadline = time.monotonic() + max_wait_s
+        while True:
+            wait_s = self.reserve()
+            if wait_s == 0.0:
+                return True
+            if time.monotonic() + wait_s > deadline:
+                return False
+            await asyncio.sleep(wait_s)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "tokens": round(self._tokens, 3),
+                "capacity": self.capacity,
+                "per_minute": round(self.rate * 60.0, 3),
+            }
+
+
+class BudgetLedger:
+    def __init__(self, agent_rules: Dict[str, Any], settings: Dict[str, Any]):
+        self.agent_rules = agent_rules or {}
+        self.tool_costs = {k: float(v) for k, v in (settings.get("tool_costs_usd") or {}).items()}
+        self.run_budget_usd = settings.get("run_budget_usd")
+        self.max_wait_s = float(settings.get("max_wait_s", 10))
+        self.max_tracked_runs = int(settings.get("max_tracked_runs", 200))
+        self.buckets = {
+            tool: TokenBucket(limits.get("per_minute", 60), limits.get("burst", 1))
+            for tool, limits in (settings.get("rate_limits") or {}).items()
+        }
+
+        self._lock = threading.Lock()
+        # Lifetime totals per agent and per tool, and per-run totals (most recent runs only).
+        self._agents: Dict[str, Dict[str, float]] = {}
+        self._tools: Dict[str, Dict[str, float]] = {}
+        self._runs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    # --- Helpers ---
+    def cost_of(self, tool_name: str) -> float:
+        return self.tool_costs.get(tool_name, 0.0)
+
+    def _run(self, run_id: str) -> Dict[str, Any]:
+        # Caller holds the lock.
+        run = self._runs.get(run_id)
+        if run is None:
+            run = self._runs[run_id] = {"spend_usd": 0.0, "calls": 0, "rejected": 0, "agents": {}}
+            while len(self._runs) > self.max_tracked_runs:
+                self._runs.popitem(last=False)
+        else:
+            self._runs.move_to_end(run_id)
+        return run
+
+    def _counter(self, table: Dict[str, Dict[str, float]], name: str) -> Dict[str, float]:
+        return table.setdefault(name, {"spend_usd": 0.0, "calls": 0, "rejected": 0})
+
+    # --- Cost budget ---
+    def charge(self, agent_name: str, tool_name: str, run_id: Optional[str] = None) -> float:
+        """Reserve the cost of one call, or raise BudgetExceeded. Returns the amount charged."""
+        cost = self.cost_of(tool_name)
+        agent_budget = (self.agent_rules.get(agent_name) or {}).get("cost_budget_usd")
+        with self._lock:
+            run = self._run(run_id) if run_id else None
+            agent_spend = run["agents"].get(agent_name, 0.0) if run is not None else 0.0
+            reason = None
+            if run is None:
+                pass  # both budgets are per run; calls outside a run are only counted
+            elif agent_budget is not None and agent_spend + cost > float(agent_budget) + 1e-9:
+                reason = f"'{agent_name}' would exceed its ${float(agent_budget):g} budget"
+            elif self.run_budget_usd is not None and run["spend_usd"] + cost > float(self.run_budget_usd) + 1e-9:
+                reason = f"run {run_id} would exceed its ${float(self.run_budget_usd):g} budget"
+            if reason is not None:
+                self._counter(self._agents, agent_name)["rejected"] += 1
+                self._counter(self._tools, tool_name)["rejected"] += 1
+                if run is not None:
+                    run["rejected"] += 1
+                raise BudgetExceeded(f"{reason} (spent ${agent_spend:.4f}, '{tool_name}' costs ${cost:.4f}).")
+
+            for counters in (self._counter(self._agents, agent_name), self._counter(self._tools, tool_name)):
+                counters["spend_usd"] += cost
+                counters["calls"] += 1
+            if run is not None:
+                run["spend_usd"] += cost
+                run["calls"] += 1
+                run["agents"][agent_name] = agent_spend + cost
+        return cost
+
+    def refund(self, agent_name: str, tool_name: str, run_id: Optional[str], amount: float) -> None:
+        """Give back a charge() for a call that never ran (e.g. its circuit opened while it waited)."""
+        with self._lock:
+            tables = [self._counter(self._agents, agent_name), self._counter(self._tools, tool_name)]
+            run = self._runs.get(run_id) if run_id else None
+            if run is not None:
+                tables.append(run)
+                run["agents"][agent_name] = max(0.0, run["agents"].get(agent_name, 0.0) - amount)
+            for counters in tables:
+                counters["spend_usd"] = max(0.0, counters["spend_usd"] - amount)
+                counters["calls"] = max(0, counters["calls"] - 1)
+
+    def _reject_rate(self, agent_name: str, tool_name: str, run_id: Optional[str]) -> RateLimited:
+        with self._lock:
+            self._counter(self._agents, agent_name)["rejected"] += 1
+            self._counter(self._tools, tool_name)["rejected"] += 1
+            if run_id:
+                self._run(run_id)["rejected"] += 1
+        return RateLimited(f"'{tool_name}' is rate limited; no slot within {self.max_wait_s:.0f}s.")
+
+    # --- Rate limits ---
+    def throttle(self, agent_name: str, tool_name: str, run_id: Optional[str] = None) -> None:
+        """Block until the tool's bucket has a token, or raise RateLimited."""
+        bucket = self.buckets.get(tool_name)
+        if bucket is not None and not bucket.acquire(self.max_wait_s):
+            raise self._reject_rate(agent_name, tool_name, run_id)
+
+    async def athrottle(self, agent_name: str, tool_name: str, run_id: Optional[str] = None) -> None:
+        bucket = self.buckets.get(tool_name)
+        if bucket is not None and not await bucket.aacquire(self.max_wait_s):
+            raise self._reject_rate(agent_name, tool_name, run_id)
+
+    def try_spend(self, agent_name: str, tool_name: str, run_id: Optional[str] = None) -> bool:
+        """Take a rate token and charge one extra call (e.g. a hedged request) without waiting."""
+        bucket = self.buckets.get(tool_name)
+        if bucket is not None and bucket.reserve() > 0.0:
+            return False
+        try:
+            self.charge(agent_name, tool_name, run_id)
+        except BudgetExceeded:
+            return False
+        return True
+
+    # --- Inspection ---
+    def snapshot(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            runs = {rid: {**run, "agents": dict(run["agents"])} for rid, run in self._runs.items()
+                    if run_id is None or rid == run_id}
+            agents = {name: dict(c) for name, c in self._agents.items()}
+            tools = {name: dict(c) for name, c in self._tools.items()}
+        for counters in [*agents.values(), *tools.values(), *runs.values()]:
+            counters["spend_usd"] = round(counters["spend_usd"], 6)
+        for name, counters in agents.items():
+            counters["budget_usd"] = (self.agent_rules.get(name) or {}).get("cost_budget_usd")
+        return {
+            "run_budget_usd": self.run_budget_usd,
+            "agents": agents,
+            "tools": tools,
+            "rate_limits": {tool: bucket.snapshot() for tool, bucket in self.buckets.items()},
+            "runs": runs,
+        }
@@ -0,0 +1,225 @@
+# stratos/mcp/cassette.py
+"""
+Record/replay cassettes for tool and LLM traffic (cassettes: in config.yml).
+
+    record   every governed tool call and every agent LLM call is appended
+             to the cassette: request, response (or error) and latency
+    replay   calls are answered from the cassette instead of Tavily, GNews,
+             arXiv, the web, the PDF pipeline or Gemini, after the recorded
+             latency x latency_scale (0 = no delay)
+
+A cassette is a gzip-compressed JSON Lines file,
+<cache dir>/<dir>/<name>.jsonl.gz, written one gzip member per entry so a
+recording that is cut short is still readable.
+
+Entries are matched by (kind, name, request). Repeated identical requests
+are served in recorded order, the last answer repeating once they run out.
+Research documents get fresh uuids on every run, so LLM requests are
+keyed with their uuids replaced by position ("<id0>", "<id1>", ...) and
+replayed responses have the recorded uuids mapped back to this run's.
+
+STRATOS_CASSETTE_MODE, STRATOS_CASSETTE (name or path) and
+STRATOS_CASSETTE_LATENCY_SCALE override the config. While a cassette is
+active the tool and LLM caches are bypassed, so every call is recorded
+(or replayed) exactly as the pipeline makes it.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .storage import cache_path
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+MODES = ("off", "record", "replay")
+_UUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+class CassetteMiss(LookupError):
+    """Replay mode found no recorded answer for a request."""
+
+
+class RecordedError(RuntimeError):
+    """Replays a call that failed while recording."""
+
+
+def _canonical(request: Any) -> Tuple[str, List[str]]:
+    """(request as stable JSON with uuids numbered by first appearance, those uuids in order)."""
+    text = json.dumps(request, sort_keys=True, default=str, ensure_ascii=False)
+    ids: Dict[str, str] = {}
+    text = _UUID.sub(lambda m: ids.setdefault(m.group(0), f"<id{len(ids)}>"), text)
+    return text, list(ids)
+
+
+def _remap(value: Any, mapping: Dict[str, str]) -> Any:
+    if not mapping:
+        return value
+    if isinstance(value, str):
+        return _UUID.sub(lambda m: mapping.get(m.group(0), m.group(0)), value)
+    if isinstance(value, list):
+        return [_remap(v, mapping) for v in value]
+    if isinstance(value, dict):
+        return {k: _remap(v, mapping) for k, v in value.items()}
+    return value
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "record", latency_scale: float = 1.0, allow_live: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}', expected record or replay")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = max(0.0, float(latency_scale))
+        self.allow_live = allow_live
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        # key -> [entries...] and key -> index of the next one to serve
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._next: Dict[str, int] = {}
+        if mode == "replay":
+            self._load()
+
+    @staticmethod
+    def key(kind: str, name: str, request: Any) -> str:
+        return hashlib.sha256(f"{kind}\x00{name}\x00{_canonical(request)[0]}".encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette '{self.path}' does not exist (record it first).")
+        count = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+                    count += 1
+        log.info(f"[Cassette] Replaying {count} recorded calls", path=self.path)
+
+    # --- Recording ---
+    def record(self, kind: str, name: str, request: Any, response: Any = None,
+               error: Optional[str] = None, latency_s: float = 0.0) -> None:
+        entry = {
+            "key": self.key(kind, name, request),
+            "kind": kind,
+            "name": name,
+            "request": request,
+            "response": response,
+            "error": error,
+            "latency_s": round(latency_s, 6),
+            "recorded_at": round(time.time(), 3),
+        }
+        line = json.dumps(entry, default=str, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "ab") as f:
+                f.write(gzip.compress(line.encode("utf-8")))
+            self.stats["recorded"] += 1
+
+    # --- Replaying ---
+    def lookup(self, kind: str, name: str, request: Any) -> Optional[Dict[str, Any]]:
+        """The next recorded entry for this request (uuids remapped to the request's), or None."""
+        key = self.key(kind, name, request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats["misses"] += 1
+                return None
+            idx = self._next.get(key, 0)
+            self._next[key] = idx + 1
+            entry = entries[min(idx, len(entries) - 1)]
+            self.stats["replayed"] += 1
+        recorded_ids = _canonical(entry["request"])[1]
+        current_ids = _canonical(request)[1]
+        mapping = dict(zip(recorded_ids, current_ids))
+        return {**entry, "response": _remap(entry["response"], mapping)}
+
+    def rewind(self) -> None:
+        """Serve repeated requests from their first recorded answer again (e.g. before each replayed run)."""
+        with self._lock:
+            self._next.clear()
+
+    def _miss(self, kind: str, name: str) -> CassetteMiss:
+        return CassetteMiss(f"No recorded {kind} call to '{name}' for this request (cassette {self.path}).")
+
+    def _outcome(self, entry: Dict[str, Any]) -> Any:
+        if entry.get("error"):
+            raise RecordedError(entry["error"])
+        return entry["response"]
+
+    # --- Wrappers used by the governor and the LLM wrapper ---
+    def call(self, kind: str, name: str, request: Any, func: Callable[[], Any],
+             encode: Callable[[Any], Any] = lambda r: r, decode: Callable[[Any], Any] = lambda r: r) -> Any:
+        """Run func() under record/replay. encode/decode convert the response to/from JSON."""
+        if self.mode == "replay":
+            entry = self.lookup(kind, name, request)
+            if entry is not None:
+                if self.latency_scale:
+                    time.sleep(entry["latency_s"] * self.latency_scale)
+                return decode(self._outcome(entry))
+            if not self.allow_live:
+                raise self._miss(kind, name)
+            return func()
+
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            self.record(kind, name, request, error=f"{type(e).__name__}: {e}",
+                        latency_s=time.perf_counter() - start)
+            raise
+        self.record(kind, name, request, encode(result), latency_s=time.perf_counter() - start)
+        return result
+
+    async def acall(self, kind: str, name: str, request: Any, func: Callable[[], Awaitable[Any]],
+                    encode: Callable[[Any], Any] = lambda r: r, decode: Callable[[Any], Any] = lambda r: r) -> Any:
+        """Async twin of call(); func() returns a fresh awaitable."""
+        if self.mode == "replay":
+            entry = self.lookup(kind, name, request)
+            if entry is not None:
+                if self.latency_scale:
+                    await asyncio.sleep(entry["latency_s"] * self.latency_scale)
+                return decode(self._outcome(entry))
+            if not self.allow_live:
+                raise self._miss(kind, name)
+            return await func()
+
+        start = time.perf_counter()
+        try:
+            result = await func()
+        except Exception as e:
+            self.record(kind, name, request, error=f"{type(e).__name__}: {e}",
+                        latency_s=time.perf_counter() - start)
+            raise
+        self.record(kind, name, request, encode(result), latency_s=time.perf_counter() - start)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "path": self.path, "latency_scale": self.latency_scale, **self.stats}
+
+
+def build_cassette(settings: Dict[str, Any]) -> Optional[Cassette]:
+    """The Cassette described by cassettes: in config.yml plus env overrides (None when off)."""
+    mode = os.getenv("STRATOS_CASSETTE_MODE") or settings.get("mode") or "off"
+    if mode not in MODES:
+        raise ValueError(f"Unknown cassette mode '{mode}', expected one of {MODES}")
+    if mode == "off":
+        return None
+    name = os.getenv("STRATOS_CASSETTE") or settings.get("name", "default")
+    path = name if name.endswith(".gz") or os.path.isabs(name) else cache_path(
+        settings.get("dir", "cassettes"), f"{name}.jsonl.gz")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    scale = os.getenv("STRATOS_CASSETTE_LATENCY_SCALE")
+    return Cassette(
+        path=path,
+        mode=mode,
+        latency_scale=float(scale if scale is not None else settings.get("latency_scale", 1.0)),
+        allow_live=bool(settings.get("allow_live", False)),
+    )
@@ -1,27 +1,42 @@
 # Create this file: insightbridge/mcp/governor.py
 
+import asyncio
+import threading
+
 import yaml
 from dotenv import load_dotenv
 
-# --- Import ALL your adapter functions ---
-from .adapters.tavily_adapter import tavily_search
-from .adapters.arxiv_adapter import arxiv_search
-from .adapters.web_adapter import read_webpage
-from .adapters.news_adapter import gnews
-from .adapters.pdf_rag_adapter import pdf_rag_query
+from .storage import cache_path
+from .tool_cache import ToolCache
+from .budget import BudgetLedger
+from .resilience import CircuitOpen, build_guards, is_error_result
+from .cassette import build_cassette
+from telemetry.log import get_logger
+from telemetry.tracing import payload_size, span
 
 # Load .env variables (like GOOGLE_API_KEY)
 load_dotenv()
 
+log = get_logger(__name__)
+
 class MCPGovernor:
     def __init__(self, config_path="mcp/config.yml"):
         """
         Initializes the Governor by loading the rulebook and mapping tools.
         """
-        print("\n--- MCP Governor Initializing ---")
+        log.info("MCP governor initializing")
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
-        print("Config 'rulebook' loaded.")
+        log.debug("Config 'rulebook' loaded", path=config_path)
+
+        # --- Import ALL your adapter functions ---
+        # (here rather than at module level, so importing mcp.governor stays
+        # cheap; the adapters build their SDK clients on first call)
+        from .adapters.tavily_adapter import tavily_search, atavily_search
+        from .adapters.arxiv_adapter import arxiv_search
+        from .adapters.web_adapter import read_webpage, aread_webpage
+        from .adapters.news_adapter import gnews
+        from .adapters.pdf_rag_adapter import pdf_rag_query
 
         # This 'toolbox' maps the tool NAMES from the config
         # to the actual Python FUNCTIONS you imported.
@@ -32,51 +47,277 @@ class MCPGovernor:
             "gnews": gnews,
             "pdf_rag_query": pdf_rag_query
         }
-        print(f"All {len(self.toolbox)} tools registered in toolbox.")
-        print("--- MCP Governor Ready ---\n")
+        # Native async adapters for aexecute_tool. Tools missing here
+        # (arxiv, gnews, pdf_rag) have sync-only SDKs and run in a thread.
+        self.async_toolbox = {
+            "tavily_search": atavily_search,
+            "read_webpage": aread_webpage
+        }
+        log.debug(f"All {len(self.toolbox)} tools registered in toolbox")
+
+        # Record/replay of tool and LLM traffic (see cassettes: in config.yml)
+        self.cassette = build_cassette(self.config.get('cassettes') or {})
+        if self.cassette is not None:
+            log.info(f"Cassette {self.cassette.mode} mode; tool and LLM caches bypassed", path=self.cassette.path)
+
+        # Shared tool-result cache (see cache: in config.yml)
+        self.cache = None
+        cache_rules = self.config.get('cache') or {}
+        if cache_rules.get('enabled', False) and self.cassette is None:
+            self.cache = ToolCache(
+                path=cache_path(cache_rules.get('path', 'tool_cache.sqlite3')),
+                max_entries=int(cache_rules.get('max_entries', 5000)),
+                default_ttl_s=float(cache_rules.get('default_ttl_s', 3600)),
+                tool_ttls=cache_rules.get('tools') or {},
+            )
+            log.info("Tool cache enabled", path=self.cache.path)
 
-    def execute_tool(self, agent_name: str, tool_name: str, tool_input: any):
+        # Cost budgets + per-tool rate limits (see budgets: in config.yml)
+        self.budget = None
+        budget_rules = self.config.get('budgets') or {}
+        if budget_rules.get('enabled', False):
+            self.budget = BudgetLedger(self.config['agents'], budget_rules)
+            log.info("Budgets enforced", rate_limited_tools=len(self.budget.buckets))
+
+        # Per-tool deadlines, circuit breakers and hedging (see resilience: in config.yml)
+        self.guards = {}
+        resilience_rules = self.config.get('resilience') or {}
+        if resilience_rules.get('enabled', False):
+            self.guards = build_guards(resilience_rules, self.toolbox)
+            log.info("Circuit breakers armed", tools=len(self.guards))
+        log.info("MCP governor ready")
+
+    def _authorize(self, agent_name: str, tool_name: str, sp):
         """
-        The main "firewall" function.
-        An agent MUST call this to use any tool.
+        Permission + existence checks shared by execute_tool and aexecute_tool.
+        Returns the tool's (sync) function.
         """
-        print(f"[MCP-FIREWALL] Request from '{agent_name}' to use tool '{tool_name}'")
+        log.debug(f"[MCP-FIREWALL] Request from '{agent_name}' to use tool '{tool_name}'")
 
         # 1. PERMISSION CHECK: Does this agent exist in the config?
         agent_rules = self.config['agents'].get(agent_name)
         if not agent_rules:
-            print(f"[MCP-FIREWALL] DENIED: Agent '{agent_name}' not found in config.")
+            self._deny(sp, f"Agent '{agent_name}' not found in config.")
             raise PermissionError(f"Agent '{agent_name}' not found in config.")
 
         # 2. PERMISSION CHECK: Is this tool in the agent's "allowed_tools" list?
         if tool_name not in agent_rules['allowed_tools']:
-            print(f"[MCP-FIREWALL] DENIED: '{agent_name}' is NOT allowed to use '{tool_name}'.")
+            self._deny(sp, f"'{agent_name}' is NOT allowed to use '{tool_name}'.")
             raise PermissionError(f"'{agent_name}' is not allowed to use '{tool_name}'.")
         
         # 3. TOOL CHECK: Does this tool exist in our toolbox?
         tool_function = self.toolbox.get(tool_name)
         if not tool_function:
-            print(f"[MCP-FIREWALL] DENIED: Tool '{tool_name}' not implemented in governor.")
+            self._deny(sp, f"Tool '{tool_name}' not implemented in governor.")
             raise NotImplementedError(f"Tool '{tool_name}' not implemented.")
+        return tool_function
+
+    @staticmethod
+    def _deny(sp, reason) -> None:
+        log.warning(f"[MCP-FIREWALL] DENIED: {reason}", tool=sp.name, agent=sp.attrs.get("agent"))
+        sp.fail(reason, status="denied")
+
+    def _cache_lookup(self, tool_name: str, tool_input: any, sp):
+        # 4. CACHE CHECK: Was this exact (normalized) call answered recently?
+        if self.cache is not None:
+            hit, cached = self.cache.get(tool_name, tool_input)
+            sp.set(cache="hit" if hit else "miss")
+            if hit:
+                log.info(f"[MCP-FIREWALL] CACHE HIT: Serving '{tool_name}' from cache.")
+                sp.set(output_bytes=payload_size(cached))
+                return True, cached
+        return False, None
 
-        # 4. PASSED! Execute the tool.
-        print(f"[MCP-FIREWALL] GRANTED: Executing '{tool_name}'.")
+    def _enforce_budget(self, agent_name: str, tool_name: str, run_id, sp) -> float:
+        # 5. RATE + BUDGET CHECK: wait for a token in the tool's bucket, then
+        # charge the call to the agent and run (BudgetExceeded/RateLimited if not).
+        # Returns the amount charged, so a call that never runs can be refunded.
+        if self.budget is None:
+            return 0.0
         try:
-            # This logic smartly handles both simple and complex tools
-            if isinstance(tool_input, dict):
-                # For pdf_rag_query(url=..., query=...)
-                result = tool_function(**tool_input)
-            else:
-                # For tavily_search(query), gnews(query), etc.
-                result = tool_function(tool_input)
-                
-            return result
-        except Exception as e:
-            print(f"[MCP-FIREWALL] FAILED: Tool '{tool_name}' failed during execution.")
-            print(f"Error: {e}")
-            return f"Error executing tool {tool_name}: {e}"
+            self.budget.throttle(agent_name, tool_name, run_id)
+            return self.budget.charge(agent_name, tool_name, run_id)
+        except PermissionError as e:
+            self._deny(sp, e)
+            raise
+
+    async def _aenforce_budget(self, agent_name: str, tool_name: str, run_id, sp) -> float:
+        # Same as _enforce_budget, but queued calls wait without blocking the event loop.
+        if self.budget is None:
+            return 0.0
+        try:
+            await self.budget.athrottle(agent_name, tool_name, run_id)
+            return self.budget.charge(agent_name, tool_name, run_id)
+        except PermissionError as e:
+            self._deny(sp, e)
+            raise
+
+    def _refund(self, agent_name: str, tool_name: str, run_id, charged: float, error: Exception) -> None:
+        # The breaker opened while the call waited for its rate token: it never ran.
+        if isinstance(error, CircuitOpen) and self.budget is not None:
+            self.budget.refund(agent_name, tool_name, run_id, charged)
+
+    def _finish_call(self, tool_name: str, tool_input: any, result: any, sp):
+        # Error payloads are returned, not raised; the span still records them as failures.
+        sp.set(output_bytes=payload_size(result))
+        if is_error_result(result):
+            sp.fail(str(result)[:200])
+        if self.cache is not None:
+            self.cache.set(tool_name, tool_input, result)
+        return result
+
+    def _tool_error(self, tool_name: str, error: Exception, sp) -> str:
+        if isinstance(error, CircuitOpen):
+            log.warning(f"[MCP-FIREWALL] SHORT-CIRCUIT: {error}", tool=tool_name)
+            sp.fail(error, status="short_circuit")
+        else:
+            log.error(f"[MCP-FIREWALL] FAILED: Tool '{tool_name}' failed during execution: {error}",
+                      tool=tool_name)
+            sp.fail(f"{type(error).__name__}: {error}")
+        return f"Error executing tool {tool_name}: {error}"
+
+    def _recorded(self, tool_name: str, tool_input: any, tool_function, sp):
+        # 8. Record the real call into the cassette, or answer it from there.
+        sp.set(cassette=self.cassette.mode)
+
+        def call(*args, **kwargs):
+            return self.cassette.call("tool", tool_name, tool_input, lambda: tool_function(*args, **kwargs))
+        return call
+
+    def _hedge_allowed(self, agent_name: str, tool_name: str, run_id):
+        # A hedged request is a real provider call: it needs a free rate token and budget.
+        return lambda: self.budget is None or self.budget.try_spend(agent_name, tool_name, run_id)
+
+    def execute_tool(self, agent_name: str, tool_name: str, tool_input: any, run_id: str = None):
+        """
+        The main "firewall" function.
+        An agent MUST call this to use any tool.
+        run_id (optional) attributes the call's cost to a graph run.
+        Every call is traced as a "tool" span (see telemetry.tracing).
+        """
+        with span("tool", tool_name, run_id=run_id, agent=agent_name,
+                  input_bytes=payload_size(tool_input)) as sp:
+            tool_function = self._authorize(agent_name, tool_name, sp)
+
+            hit, cached = self._cache_lookup(tool_name, tool_input, sp)
+            if hit:
+                return cached
+
+            # An open breaker fails fast, before the call waits for a rate token or is charged.
+            guard = self.guards.get(tool_name)
+            if guard is not None:
+                try:
+                    guard.check()
+                except CircuitOpen as e:
+                    return self._tool_error(tool_name, e, sp)
+
+            charged = self._enforce_budget(agent_name, tool_name, run_id, sp)
+
+            # 6. PASSED! Execute the tool.
+            log.info(f"[MCP-FIREWALL] GRANTED: Executing '{tool_name}'.", agent=agent_name)
+            # This logic smartly handles both simple and complex tools:
+            # pdf_rag_query(url=..., query=...) vs. tavily_search(query), gnews(query), etc.
+            args, kwargs = ((), tool_input) if isinstance(tool_input, dict) else ((tool_input,), {})
+            if self.cassette is not None:
+                tool_function = self._recorded(tool_name, tool_input, tool_function, sp)
+            try:
+                if guard is not None:
+                    # 7. Deadline, circuit breaker and (optional) hedged request.
+                    result = guard.call(tool_function, args, kwargs,
+                                        may_hedge=self._hedge_allowed(agent_name, tool_name, run_id))
+                else:
+                    result = tool_function(*args, **kwargs)
+                return self._finish_call(tool_name, tool_input, result, sp)
+            except Exception as e:
+                self._refund(agent_name, tool_name, run_id, charged, e)
+                return self._tool_error(tool_name, e, sp)
+
+    async def aexecute_tool(self, agent_name: str, tool_name: str, tool_input: any, run_id: str = None):
+        """
+        Async twin of execute_tool, with the same checks, cache, budgets and
+        error contract. Tools with a native async adapter (async_toolbox) are
+        awaited directly; the rest run in a worker thread so the event loop
+        is never blocked.
+        """
+        with span("tool", tool_name, run_id=run_id, agent=agent_name,
+                  input_bytes=payload_size(tool_input)) as sp:
+            tool_function = self._authorize(agent_name, tool_name, sp)
+
+            hit, cached = self._cache_lookup(tool_name, tool_input, sp)
+            if hit:
+                return cached
+
+            guard = self.guards.get(tool_name)
+            if guard is not None:
+                try:
+                    guard.check()
+                except CircuitOpen as e:
+                    return self._tool_error(tool_name, e, sp)
+
+            charged = await self._aenforce_budget(agent_name, tool_name, run_id, sp)
+
+            log.info(f"[MCP-FIREWALL] GRANTED: Executing '{tool_name}'.", agent=agent_name)
+            args, kwargs = ((), tool_input) if isinstance(tool_input, dict) else ((tool_input,), {})
+            async_function = self.async_toolbox.get(tool_name)
+
+            def make_call():
+                if async_function is not None:
+                    return async_function(*args, **kwargs)
+                return asyncio.to_thread(tool_function, *args, **kwargs)
+
+            if self.cassette is not None:
+                sp.set(cassette=self.cassette.mode)
+                live_call = make_call
+
+                def make_call():
+                    return self.cassette.acall("tool", tool_name, tool_input, live_call)
+
+            try:
+                if guard is not None:
+                    result = await guard.acall(make_call, may_hedge=self._hedge_allowed(agent_name, tool_name, run_id))
+                else:
+                    result = await make_call()
+                return self._finish_call(tool_name, tool_input, result, sp)
+            except Exception as e:
+                self._refund(agent_name, tool_name, run_id, charged, e)
+                return self._tool_error(tool_name, e, sp)
+
+    def budget_snapshot(self, run_id: str = None) -> dict:
+        """Current spend, call counts and rate-limit buckets (None if budgets are off)."""
+        return self.budget.snapshot(run_id) if self.budget is not None else None
+
+    def tool_health(self) -> dict:
+        """Breaker state, transition counts and timeout/hedge counters per tool."""
+        return {name: guard.snapshot() for name, guard in self.guards.items()}
+
+    def warm_up(self) -> None:
+        """Build the adapters' SDK clients now instead of on the first tool call."""
+        from .adapters.tavily_adapter import get_tavily_clients
+        from .adapters.news_adapter import get_gnews_client
+        from .adapters.pdf_rag_adapter import get_components
+
+        get_tavily_clients()
+        get_gnews_client()
+        get_components()
 
 # --- SINGLETON INSTANCE ---
-# We create one, and only one, instance of the Governor
-# when the app starts. All other files will import this.
-mcp_governor = MCPGovernor()
\ No newline at end of file
+# We create one, and only one, instance of the Governor, on first use.
+# All other files call get_governor() (or import `mcp_governor`, which
+# builds it on first access).
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> MCPGovernor:
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = MCPGovernor()
+    return _governor
+
+
+def __getattr__(name: str):
+    if name == "mcp_governor":
+        return get_governor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,171 @@
+# stratos/mcp/http_client.py
+"""
+Shared, pooled HTTP client for every MCP adapter.
+
+Sync:  http_get(url, ...)                 -> requests.Response (one pooled Session)
+Async: async with ahttp_stream(url) as r:  -> streamed httpx.Response (one AsyncClient per event loop)
+
+Both give us keep-alive, a per-host connection cap, separate connect/read
+timeouts and retries with exponential, jittered backoff on connection
+errors, 429 and 5xx responses.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT_S = float(os.getenv("STRATOS_HTTP_CONNECT_TIMEOUT_S", "5"))
+READ_TIMEOUT_S = float(os.getenv("STRATOS_HTTP_READ_TIMEOUT_S", "15"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("STRATOS_HTTP_MAX_PER_HOST", "8"))
+MAX_HOST_POOLS = int(os.getenv("STRATOS_HTTP_MAX_HOSTS", "32"))
+MAX_RETRIES = int(os.getenv("STRATOS_HTTP_RETRIES", "3"))
+BACKOFF_FACTOR_S = 0.5
+BACKOFF_JITTER_S = 0.5
+MAX_BACKOFF_S = 10.0  # also caps a server's Retry-After
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+Timeout = Union[float, Tuple[float, float], None]
+
+
+# --- Sync client (requests) ---
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """The process-wide pooled Session (built on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=MAX_RETRIES,
+                    backoff_factor=BACKOFF_FACTOR_S,
+                    backoff_jitter=BACKOFF_JITTER_S,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=MAX_HOST_POOLS,
+                    pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                    pool_block=True,  # wait for a free connection instead of opening more
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def http_get(url: str, timeout: Timeout = None, **kwargs) -> requests.Response:
+    """
+    GET through the pooled session. `timeout` may be a read timeout in
+    seconds or a (connect, read) tuple; defaults to the module settings.
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT_S, READ_TIMEOUT_S)
+    elif not isinstance(timeout, tuple):
+        timeout = (CONNECT_TIMEOUT_S, float(timeout))
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+# --- Async client (httpx) ---
+# httpx clients are bound to the event loop they were first used on.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_host_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The pooled AsyncClient for the running event loop (built on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(READ_TIMEOUT_S, connect=CONNECT_TIMEOUT_S),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS_PER_HOST * MAX_HOST_POOLS,
+                max_keepalive_connections=MAX_HOST_POOLS,
+            ),
+            follow_redirects=True,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    # httpx only has a global connection cap, so enforce the per-host cap here.
+    slots = _host_slots.setdefault(asyncio.get_running_loop(), {})
+    host = urlsplit(url).netloc
+    if host not in slots:
+        slots[host] = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+    return slots[host]
+
+
+def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF_S)
+    return min(BACKOFF_FACTOR_S * (2 ** attempt) + random.uniform(0, BACKOFF_JITTER_S), MAX_BACKOFF_S)
+
+
+def _async_timeout(timeout: Timeout) -> httpx.Timeout:
+    if timeout is None:
+        return httpx.Timeout(READ_TIMEOUT_S, connect=CONNECT_TIMEOUT_S)
+    if isinstance(timeout, tuple):
+        return httpx.Timeout(timeout[1], connect=timeout[0])
+    return httpx.Timeout(float(timeout), connect=CONNECT_TIMEOUT_S)
+
+
+@asynccontextmanager
+async def ahttp_stream(url: str, timeout: Timeout = None, **kwargs) -> AsyncIterator[httpx.Response]:
+    """
+    Streamed async GET (body not read up front). Holds a per-host slot until
+    the block exits. Connection errors and retryable statuses are retried
+    like http_get's until a response is handed over; the body never is,
+    since callers consume it incrementally.
+    """
+    client = get_async_client()
+    request = client.build_request("GET", url, timeout=_async_timeout(timeout), **kwargs)
+    attempt = 0
+    async with _host_slot(url):
+        while True:
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.TransportError:
+                if attempt >= MAX_RETRIES:
+                    raise
+                delay = _backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                    break
+                delay = _backoff(attempt, response.headers.get("Retry-After"))
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+
+async def aclose_async_client() -> None:
+    """Close the running loop's AsyncClient (call on app shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,309 @@
+# stratos/mcp/resilience.py
+"""
+Per-tool failure isolation for MCPGovernor (resilience: in config.yml).
+
+- Deadline: the governor stops waiting for a call after timeout_s, even
+  when the adapter has no timeout of its own (arXiv, GNews).
+- Circuit breaker: after failure_threshold consecutive failures (errors,
+  error payloads or deadline misses) the tool's breaker opens and calls
+  fail fast for reset_timeout_s. Then one probe call is let through
+  (half-open); success closes the breaker, failure re-opens it.
+  Every transition is logged and counted.
+- Hedging: for tools with hedge_after_s, a second identical call is
+  started if the first has not answered by then; the first good answer
+  wins.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict
+
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Shared pool for sync calls that run under a deadline. Abandoned calls
+# keep their thread until the adapter returns, so the pool is generous.
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="mcp-tool")
+
+
+class CircuitOpen(Exception):
+    """The tool's breaker is open; the call was not attempted."""
+
+
+class ToolTimeout(Exception):
+    """The call did not finish within the governor's deadline."""
+
+
+def is_error_result(result: Any) -> bool:
+    """True for error strings and adapter error payloads (e.g. Tavily's {"title": "Error"})."""
+    if isinstance(result, str):
+        return result.startswith(("Error", "ERROR"))
+    if isinstance(result, list):
+        for item in result:
+            if isinstance(item, dict) and (
+                item.get("title") == "Error" or str(item.get("content") or "").startswith(("Error", "ERROR"))
+            ):
+                return True
+    return False
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout_s = float(reset_timeout_s)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        # {"closed->open": 2, "open->half_open": 2, ...}
+        self.transitions: Dict[str, int] = {}
+
+    def _move(self, state: str) -> None:
+        # Caller holds the lock.
+        if state == self.state:
+            return
+        edge = f"{self.state}->{state}"
+        self.transitions[edge] = self.transitions.get(edge, 0) + 1
+        log.warning(f"[MCP-BREAKER] '{self.name}': {edge}", tool=self.name, consecutive_failures=self.failures)
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+
+    def allow(self) -> bool:
+        """May a call go through right now? (Claims the probe slot when half-open.)"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_s:
+                self._move(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def rejecting(self) -> bool:
+        """Would allow() refuse a call right now? (Does not claim the probe slot.)"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at < self.reset_timeout_s
+            return self.state == HALF_OPEN and self._probe_in_flight
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._move(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._move(OPEN)
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot without recording an outcome."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_timeout_s - (time.monotonic() - self.opened_at))
+
+
+class ToolGuard:
+    """Deadline + breaker + optional hedging around one tool's calls."""
+
+    def __init__(self, name: str, settings: Dict[str, Any]):
+        self.name = name
+        self.timeout_s = settings.get("timeout_s")
+        self.hedge_after_s = settings.get("hedge_after_s")
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=int(settings.get("failure_threshold", 5)),
+            reset_timeout_s=float(settings.get("reset_timeout_s", 30)),
+        )
+        self.counters = {"calls": 0, "failures": 0, "timeouts": 0, "short_circuits": 0,
+                         "hedges": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            self.counters[field] += 1
+
+    def _short_circuit(self) -> CircuitOpen:
+        self._count("short_circuits")
+        return CircuitOpen(f"circuit open for '{self.name}' (retry in {self.breaker.retry_in():.1f}s)")
+
+    def check(self) -> None:
+        """Raise CircuitOpen now if the breaker would refuse the call (before it is throttled or charged)."""
+        if self.breaker.rejecting():
+            raise self._short_circuit()
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            raise self._short_circuit()
+        self._count("calls")
+
+    def _settle(self, result: Any) -> Any:
+        if is_error_result(result):
+            self._count("failures")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return result
+
+    def _fail(self, error: BaseException) -> None:
+        self._count("timeouts" if isinstance(error, ToolTimeout) else "failures")
+        self.breaker.record_failure()
+
+    # --- Sync ---
+    def call(self, func: Callable[..., Any], args: tuple, kwargs: dict,
+             may_hedge: Callable[[], bool] = lambda: True) -> Any:
+        """Run func under the breaker, deadline and hedge policy. Raises CircuitOpen / ToolTimeout."""
+        self._admit()
+        try:
+            if not self.timeout_s and not self.hedge_after_s:
+                result = func(*args, **kwargs)
+            else:
+                result = self._call_in_pool(func, args, kwargs, may_hedge)
+        except Exception as e:
+            self._fail(e)
+            raise
+        return self._settle(result)
+
+    def _call_in_pool(self, func, args, kwargs, may_hedge) -> Any:
+        now = time.monotonic()
+        deadline = now + float(self.timeout_s) if self.timeout_s else None
+        hedge_at = now + float(self.hedge_after_s) if self.hedge_after_s else None
+        attempts = {self._submit(func, args, kwargs): 0}
+        last_result, last_error = None, None
+
+        while attempts:
+            now = time.monotonic()
+            waits = [t - now for t in (deadline, hedge_at) if t is not None]
+            done, _ = wait(list(attempts), timeout=max(0.0, min(waits)) if waits else None,
+                           return_when=FIRST_COMPLETED)
+            for fut in done:
+                attempt = attempts.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if is_error_result(result) and attempts:
+                    last_result = result  # the other attempt may still succeed
+                    continue
+                if attempt:
+                    self._count("hedge_wins")
+                return result
+
+            now = time.monotonic()
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if attempts and may_hedge():
+                    self._hedged()
+                    attempts[self._submit(func, args, kwargs)] = 1
+            if deadline is not None and now >= deadline and attempts:
+                # Abandoned threads finish in the background; we just stop waiting.
+                raise ToolTimeout(f"'{self.name}' did not answer within {self.timeout_s}s")
+
+        if last_result is not None:
+            return last_result
+        raise last_error
+
+    @staticmethod
+    def _submit(func, args, kwargs):
+        # Run in the caller's context, so the adapter's log lines keep the run id.
+        return _executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+    def _hedged(self) -> None:
+        self._count("hedges")
+        log.info(f"[MCP-HEDGE] '{self.name}' slow after {self.hedge_after_s}s; sending a hedged request.",
+                 tool=self.name)
+
+    # --- Async ---
+    async def acall(self, make_call: Callable[[], Awaitable[Any]],
+                    may_hedge: Callable[[], bool] = lambda: True) -> Any:
+        """Async twin of call(); make_call() returns a fresh awaitable per attempt."""
+        self._admit()
+        try:
+            result = await self._acall(make_call, may_hedge)
+        except asyncio.CancelledError:
+            # Cancelled by the caller (e.g. the step timeout): not the provider's fault.
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            self._fail(e)
+            raise
+        return self._settle(result)
+
+    async def _acall(self, make_call, may_hedge) -> Any:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + float(self.timeout_s) if self.timeout_s else None
+        hedge_at = loop.time() + float(self.hedge_after_s) if self.hedge_after_s else None
+        attempts = {asyncio.ensure_future(make_call()): 0}
+        last_result, last_error = None, None
+
+        try:
+            while attempts:
+                now = loop.time()
+                waits = [t - now for t in (deadline, hedge_at) if t is not None]
+                done, _ = await asyncio.wait(list(attempts), timeout=max(0.0, min(waits)) if waits else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    attempt = attempts.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if is_error_result(result) and attempts:
+                        last_result = result
+                        continue
+                    if attempt:
+                        self._count("hedge_wins")
+                    return result
+
+                now = loop.time()
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    if attempts and may_hedge():
+                        self._hedged()
+                        attempts[asyncio.ensure_future(make_call())] = 1
+                if deadline is not None and now >= deadline and attempts:
+                    raise ToolTimeout(f"'{self.name}' did not answer within {self.timeout_s}s")
+        finally:
+            for task in attempts:
+                task.cancel()
+
+        if last_result is not None:
+            return last_result
+        raise last_error
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "transitions": dict(self.breaker.transitions),
+            "timeout_s": self.timeout_s,
+            "hedge_after_s": self.hedge_after_s,
+            **counters,
+        }
+
+
+def build_guards(settings: Dict[str, Any], tool_names) -> Dict[str, ToolGuard]:
+    """One ToolGuard per tool: resilience.default merged with resilience.tools.<name>."""
+    defaults = settings.get("default") or {}
+    per_tool = settings.get("tools") or {}
+    return {name: ToolGuard(name, {**defaults, **(per_tool.get(name) or {})}) for name in tool_names}
@@ -0,0 +1,19 @@
+# stratos/mcp/storage.py
+"""
+Where Stratos keeps its local, disposable state (caches, indexes, ...).
+Everything lives under one directory so it is easy to wipe or mount.
+"""
+
+import os
+
+CACHE_DIR = os.getenv("STRATOS_CACHE_DIR", ".stratos_cache")
+
+
+def cache_path(*parts: str) -> str:
+    """
+    Return a path inside CACHE_DIR, creating the parent directory if needed.
+    Absolute paths are returned unchanged.
+    """
+    path = parts[0] if parts and os.path.isabs(parts[0]) else os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
@@ -0,0 +1,183 @@
+# stratos/mcp/tool_cache.py
+"""
+Disk-backed (SQLite) cache for tool results, used by MCPGovernor.
+
+- Keys are a hash of the tool name plus a normalized tool input, so
+  "AI  in Supply Chain" and "ai in supply chain" share an entry.
+- Each tool has its own TTL (cache.tools in config.yml); a TTL of 0
+  disables caching for that tool.
+- The table is capped at max_entries and evicts least-recently-used rows.
+- Error results and empty results are never stored.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+_URL_RE = re.compile(r"^https?://", re.IGNORECASE)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        text = " ".join(value.split())
+        # URLs can be case-sensitive; free-text queries are not.
+        return text if _URL_RE.match(text) else text.casefold()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def is_cacheable(result: Any) -> bool:
+    """
+    True if a tool result is worth caching. Rejects the governor's
+    "Error executing tool ..." strings, adapter-level error payloads
+    (e.g. Tavily's {"title": "Error"} item), the unconfigured-client
+    placeholder and empty results.
+    """
+    if not result:
+        return False
+    if isinstance(result, str):
+        return not result.startswith("Error")
+    if isinstance(result, list):
+        for item in result:
+            if not isinstance(item, dict):
+                continue
+            title = str(item.get("title") or "")
+            content = str(item.get("content") or "")
+            if title == "Error" or title.startswith("Placeholder result"):
+                return False
+            if content.startswith(("Error", "ERROR", "No tavily client configured")):
+                return False
+    return True
+
+
+class ToolCache:
+    def __init__(self, path: str, max_entries: int = 5000, default_ttl_s: float = 3600,
+                 tool_ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl_s = default_ttl_s
+        self.tool_ttls = tool_ttls or {}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tool_cache (
+                key TEXT PRIMARY KEY,
+                tool TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_cache_access ON tool_cache(last_access)")
+        self._conn.commit()
+
+        # In-process counters, per tool: {"tavily_search": {"hits": 3, "misses": 1, ...}}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    # --- Helpers ---
+    def ttl_for(self, tool_name: str) -> float:
+        return float(self.tool_ttls.get(tool_name, self.default_ttl_s))
+
+    @staticmethod
+    def make_key(tool_name: str, tool_input: Any) -> str:
+        payload = json.dumps([tool_name, _normalize(tool_input)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, tool_name: str, field: str) -> None:
+        counters = self._counters.setdefault(tool_name, {"hits": 0, "misses": 0, "stores": 0, "evictions": 0})
+        counters[field] += 1
+
+    # --- Public API ---
+    def get(self, tool_name: str, tool_input: Any) -> Tuple[bool, Any]:
+        """Return (hit, value). Expired rows count as misses and are dropped."""
+        if self.ttl_for(tool_name) <= 0:
+            return False, None
+
+        key = self.make_key(tool_name, tool_input)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self._count(tool_name, "misses")
+                return False, None
+
+            self._conn.execute("UPDATE tool_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._count(tool_name, "hits")
+        return True, json.loads(row[0])
+
+    def set(self, tool_name: str, tool_input: Any, result: Any) -> bool:
+        """Store a result if the tool is cacheable and the result is not an error."""
+        ttl = self.ttl_for(tool_name)
+        if ttl <= 0 or not is_cacheable(result):
+            return False
+        try:
+            value = json.dumps(result)
+        except (TypeError, ValueError):
+            return False
+
+        key = self.make_key(tool_name, tool_input)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, tool, value, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool_name, value, now, now + ttl, now),
+            )
+            self._count(tool_name, "stores")
+            self._evict()
+            self._conn.commit()
+        return True
+
+    def _evict(self) -> None:
+        # Caller holds the lock. Drop expired rows first, then LRU rows over the cap.
+        self._conn.execute("DELETE FROM tool_cache WHERE expires_at < ?", (time.time(),))
+        (total,) = self._conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()
+        excess = total - self.max_entries
+        if excess > 0:
+            evicted = self._conn.execute(
+                "SELECT tool FROM tool_cache ORDER BY last_access ASC LIMIT ?", (excess,)
+            ).fetchall()
+            self._conn.execute(
+                "DELETE FROM tool_cache WHERE key IN "
+                "(SELECT key FROM tool_cache ORDER BY last_access ASC LIMIT ?)", (excess,)
+            )
+            for (tool_name,) in evicted:
+                self._count(tool_name, "evictions")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()
+            per_tool = {tool: dict(counters) for tool, counters in self._counters.items()}
+        hits = sum(c["hits"] for c in per_tool.values())
+        misses = sum(c["misses"] for c in per_tool.values())
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "tools": per_tool,
+        }
@@ -0,0 +1,95 @@
+# stratos/orchestrator/checkpoints.py
+"""
+Durable per-node checkpoints for API graph runs.
+
+The API compiles the graph with a LangGraph AsyncSqliteSaver stored under
+the cache directory, keyed by run id (thread_id). Every finished node
+writes a checkpoint of AgentState, so:
+
+- a retried run resumes after its last completed node instead of
+  repeating the planner, the tool calls and the analyst;
+- a replay re-runs only the nodes downstream of a chosen node, starting
+  from the checkpoint taken just before it.
+
+STRATOS_CHECKPOINTS=0 turns this off, and so does a missing aiosqlite /
+langgraph-checkpoint-sqlite install (with a warning). Scripts using `app_graph.invoke`
+are unaffected (that graph has no checkpointer).
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+from mcp.storage import cache_path
+from telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+CHECKPOINTS_ENABLED = os.getenv("STRATOS_CHECKPOINTS", "1").lower() not in ("0", "false", "no")
+CHECKPOINT_DB = os.getenv("STRATOS_CHECKPOINT_DB", "checkpoints.sqlite3")
+
+# One saver (aiosqlite connection), compiled graph and setup lock per event loop.
+_graphs: Dict[asyncio.AbstractEventLoop, Any] = {}
+_savers: Dict[asyncio.AbstractEventLoop, Any] = {}
+_locks: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+_unavailable = False
+
+
+def run_config(run_id: str, checkpoint_id: Optional[str] = None) -> Dict[str, Any]:
+    configurable = {"thread_id": run_id}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+async def get_checkpointed_graph():
+    """The graph compiled with the SQLite checkpointer (None if checkpoints are off)."""
+    global _unavailable
+    if not CHECKPOINTS_ENABLED or _unavailable:
+        return None
+    loop = asyncio.get_running_loop()
+    graph = _graphs.get(loop)
+    if graph is not None:
+        return graph
+
+    async with _locks.setdefault(loop, asyncio.Lock()):
+        if loop not in _graphs:
+            try:
+                import aiosqlite
+                from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+            except ImportError as e:
+                _unavailable = True
+                log.warning(f"[Checkpoints] Disabled, runs will not resume: {e} "
+                            "(pip install aiosqlite langgraph-checkpoint-sqlite)")
+                return None
+            from .graph_builder import build_graph
+
+            conn = await aiosqlite.connect(cache_path(CHECKPOINT_DB))
+            saver = AsyncSqliteSaver(conn)
+            await saver.setup()
+            _savers[loop] = saver
+            _graphs[loop] = await asyncio.to_thread(build_graph, saver)
+    return _graphs[loop]
+
+
+async def pending_nodes(graph, run_id: str) -> tuple:
+    """Nodes still to run for this run id (empty if it never started or already finished)."""
+    snapshot = await graph.aget_state(run_config(run_id))
+    return tuple(snapshot.next or ())
+
+
+async def checkpoint_before(graph, run_id: str, node: str) -> Optional[str]:
+    """Id of the latest checkpoint whose next step is `node` (None if the run never reached it)."""
+    async for snapshot in graph.aget_state_history(run_config(run_id)):
+        if node in (snapshot.next or ()):
+            return snapshot.config["configurable"]["checkpoint_id"]
+    return None
+
+
+async def aclose_checkpointer() -> None:
+    loop = asyncio.get_running_loop()
+    saver = _savers.pop(loop, None)
+    _graphs.pop(loop, None)
+    _locks.pop(loop, None)
+    if saver is not None:
+        await saver.conn.close()
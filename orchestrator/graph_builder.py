@@ -1,14 +1,18 @@
 # stratos/orchestrator/graph_builder.py
+"""
+The Stratos graph. It is compiled on first use by get_graph(), not at
+import time; `from orchestrator.graph_builder import app_graph` still
+works and triggers that compilation. The API uses a second compilation
+with a checkpointer (see orchestrator/checkpoints.py).
+"""
+
+import threading
 
-from langgraph.graph import StateGraph, END
 from .state import AgentState
+from telemetry.log import get_logger
+from telemetry.tracing import payload_size, span
 
-# Import node functions
-from agents.planner_agent import run_planner_node
-from agents.research_agent import run_researcher_node
-from agents.analyst_agent import run_analyst_node
-from agents.critic_agent import run_critic_node
-from agents.strategist_agent import run_strategist_node
+log = get_logger(__name__)
 
 # --- 1. Define the Conditional Edge Logic ---
 def should_continue(state: AgentState) -> str:
@@ -17,53 +21,136 @@ def should_continue(state: AgentState) -> str:
     move to strategist; otherwise, return to researcher. For Option C we only allow
     one retry (iteration_count > 1).
     """
-    print(f"\n--- [Edge: should_continue] ---")
     critique = state.get('critique', "") or ""
     iteration_count = state.get('iteration_count', 0)
 
     MAX_ITER = 1  # Option C: allow ONLY one retry
 
     if iteration_count > MAX_ITER:
-        print("Max iterations reached. Moving to strategist.")
+        log.info("Max iterations reached. Moving to strategist.", edge="should_continue")
         return "end_critique_loop"
 
     if "APPROVED" in critique.upper():
-        print("Critique approved. Moving to strategist.")
+        log.info("Critique approved. Moving to strategist.", edge="should_continue")
         return "end_critique_loop"
     else:
-        print("Critique found issues. Returning to researcher.")
+        log.info("Critique found issues. Returning to researcher.", edge="should_continue")
         return "revise"
 
+def route_entry(state: AgentState) -> str:
+    """
+    Entry decision. Callers that already have a plan (e.g. the SSE endpoint
+    replaying a plan the user saw) skip the planner LLM call entirely.
+    """
+    return "researcher" if state.get("plan") else "planner"
+
 # --- 2. Build the Graph ---
-print("--- Compiling Stratos Graph ---")
-graph = StateGraph(AgentState)
-
-# Add nodes
-graph.add_node("planner", run_planner_node)
-graph.add_node("researcher", run_researcher_node)
-graph.add_node("analyst", run_analyst_node)
-graph.add_node("critic", run_critic_node)
-graph.add_node("strategist", run_strategist_node)
-
-# Entry point
-graph.set_entry_point("planner")
-
-# Standard edges
-graph.add_edge("planner", "researcher")
-graph.add_edge("researcher", "analyst")
-graph.add_edge("analyst", "critic")
-graph.add_edge("strategist", END)
-
-# Conditional A2A loop with limited retries
-graph.add_conditional_edges(
-    "critic",
-    should_continue,
-    {
-        "revise": "researcher",
-        "end_critique_loop": "strategist"
-    }
-)
-
-# Compile the final app_graph
-app_graph = graph.compile()
-print("--- Graph Compilation Complete ---")
+def _node_span(name: str, state: AgentState):
+    # One "node" span per execution, attributed to the state's run id; the
+    # node's tool and LLM spans nest under it.
+    return span("node", name, run_id=state.get("run_id"), input_bytes=payload_size(dict(state)))
+
+
+def _node(name: str, func, afunc):
+    # invoke()/stream() call `func`; ainvoke()/astream() await `afunc`,
+    # so scripts keep the sync path and the API never blocks its event loop.
+    from langchain_core.runnables import RunnableLambda
+
+    def run(state: AgentState):
+        with _node_span(name, state) as sp:
+            update = func(state)
+            sp.set(output_bytes=payload_size(update))
+            return update
+
+    async def arun(state: AgentState):
+        with _node_span(name, state) as sp:
+            update = await afunc(state)
+            sp.set(output_bytes=payload_size(update))
+            return update
+
+    return RunnableLambda(run, afunc=arun, name=name)
+
+
+def build_graph(checkpointer=None):
+    """Compile the graph; with a checkpointer, every node's output is checkpointed per run id."""
+    from langgraph.graph import StateGraph, END
+
+    # Import node functions (sync for app_graph.invoke, async for ainvoke / astream)
+    from agents.planner_agent import run_planner_node, arun_planner_node
+    from agents.research_agent import run_researcher_node, arun_researcher_node
+    from agents.analyst_agent import run_analyst_node, arun_analyst_node
+    from agents.critic_agent import run_critic_node, arun_critic_node
+    from agents.strategist_agent import run_strategist_node, arun_strategist_node
+
+    log.debug("Compiling Stratos graph")
+    graph = StateGraph(AgentState)
+
+    # Add nodes
+    graph.add_node("planner", _node("planner", run_planner_node, arun_planner_node))
+    graph.add_node("researcher", _node("researcher", run_researcher_node, arun_researcher_node))
+    graph.add_node("analyst", _node("analyst", run_analyst_node, arun_analyst_node))
+    graph.add_node("critic", _node("critic", run_critic_node, arun_critic_node))
+    graph.add_node("strategist", _node("strategist", run_strategist_node, arun_strategist_node))
+
+    # Entry point: plan first, unless a plan was supplied in the initial state
+    graph.set_conditional_entry_point(
+        route_entry,
+        {
+            "planner": "planner",
+            "researcher": "researcher"
+        }
+    )
+
+    # Standard edges
+    graph.add_edge("planner", "researcher")
+    graph.add_edge("researcher", "analyst")
+    graph.add_edge("analyst", "critic")
+    graph.add_edge("strategist", END)
+
+    # Conditional A2A loop with limited retries
+    graph.add_conditional_edges(
+        "critic",
+        should_continue,
+        {
+            "revise": "researcher",
+            "end_critique_loop": "strategist"
+        }
+    )
+
+    # Compile the final app_graph
+    compiled = graph.compile(checkpointer=checkpointer)
+    log.info("Graph compiled", checkpointed=checkpointer is not None)
+    return compiled
+
+
+_app_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """The compiled graph, built on first call."""
+    global _app_graph
+    if _app_graph is None:
+        with _graph_lock:
+            if _app_graph is None:
+                _app_graph = build_graph()
+    return _app_graph
+
+
+def warm_up() -> None:
+    """
+    Build everything a first request would otherwise pay for: the compiled
+    graph, the governor and its tool clients, and every agent's model.
+    """
+    from agents.llm_factory import warm_up_llms
+    from mcp.governor import get_governor
+
+    get_graph()
+    get_governor().warm_up()
+    warm_up_llms()
+
+
+def __getattr__(name: str):
+    if name == "app_graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
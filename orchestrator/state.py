@@ -26,6 +26,7 @@ class AgentState(TypedDict):
     # Input
     topic: str               # The initial user query
     iteration_count: int     # To prevent infinite loops
+    run_id: str              # Graph run id; the governor charges tool costs to it
     
     # Planner output
     plan: List[PlanStep]  # ordered plan steps
@@ -33,10 +34,12 @@ class AgentState(TypedDict):
     # --- Tool Outputs ---
     # Research outputs (list of citation objects)
     documents: List[Citation]
+    repair_queries: List[str]  # supplemental queries run on the last critique loop
     
     # --- Agent Outputs ---
     draft_report: str        # The draft from the AnalystAgent
     critique: str            # The critique from the CriticAgent
+    critic_decision: Dict[str, Any]  # How the critique was reached (rules vs. LLM, score, issues)
     
     # --- Final Output ---
     final_report: str        # The final JSON report from the StrategistAgent
\ No newline at end of file
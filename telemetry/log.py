@@ -0,0 +1,112 @@
+# stratos/telemetry/log.py
+"""
+Leveled, structured logging for Stratos.
+
+Every module logs through get_logger(__name__), under the "stratos"
+logger tree. Keyword arguments become structured fields:
+
+    log.info("Tool granted", tool="gnews", agent="ResearchAgent")
+
+and the current run id (see telemetry.tracing) is attached to every
+record automatically, so one run's lines can be grepped out of a busy
+server's output.
+
+    STRATOS_LOG_LEVEL   DEBUG | INFO (default) | WARNING | ERROR
+    STRATOS_LOG_FORMAT  text (default) | json (one object per line)
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict
+
+ROOT_LOGGER = "stratos"
+LOG_LEVEL = os.getenv("STRATOS_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("STRATOS_LOG_FORMAT", "text").lower()
+
+_RESERVED = frozenset(("exc_info", "stack_info", "stacklevel", "extra"))
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    fields = dict(getattr(record, "fields", None) or {})
+    run_id = getattr(record, "run_id", None)
+    if run_id and "run_id" not in fields:
+        fields["run_id"] = run_id
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_record_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        line = f"{stamp} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = _record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _RunIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        from .tracing import current_run_id
+
+        record.run_id = current_run_id()
+        return True
+
+
+class StructLogger(logging.LoggerAdapter):
+    """A logger whose keyword arguments are structured fields."""
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _RESERVED}
+        if fields:
+            extra = dict(kwargs.get("extra") or {})
+            extra["fields"] = {**extra.get("fields", {}), **fields}
+            kwargs["extra"] = extra
+        return msg, kwargs
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    """Attach the stderr handler to the "stratos" logger (idempotent)."""
+    global _configured
+    with _configure_lock:
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+        handler.addFilter(_RunIdFilter())
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, level, logging.INFO))
+        # Uvicorn configures the root logger too; don't print our lines twice.
+        root.propagate = False
+        _configured = True
+
+
+def get_logger(name: str) -> StructLogger:
+    """A structured logger for a module (`name` is usually __name__)."""
+    if not _configured:
+        configure_logging()
+    if name != ROOT_LOGGER and not name.startswith(ROOT_LOGGER + "."):
+        name = f"{ROOT_LOGGER}.{name}"
+    return StructLogger(logging.getLogger(name), {})
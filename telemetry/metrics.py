@@ -0,0 +1,135 @@
+# stratos/telemetry/metrics.py
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are keyed by label values and rendered by
+render() for GET /metrics. No client library is needed: the format is
+plain text and these few types cover what the tracing layer records.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Seconds: sub-second cache hits up to multi-minute LLM calls.
+DURATION_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Bytes (UTF-8 JSON): short prompts up to full research payloads.
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = tuple(str(v) for v in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(tuple(str(v) for v in labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Iterable[float] = DURATION_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = tuple(str(v) for v in labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(tuple(str(v) for v in labels))
+            return int(series[-2]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, n in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, key, ('le', _number(bound)))} "
+                                 f"{_number(n)}")
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, ('le', '+Inf'))} "
+                             f"{_number(series[-2])}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, key)} {_number(series[-2])}")
+        return lines
+
+
+class Gauge(Counter):
+    """A value set at scrape time (queue depth, breaker state, ...)."""
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[tuple(str(v) for v in labels)] = float(value)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+# --- The Stratos metrics (fed by telemetry.tracing) ---
+NODE_SECONDS = Histogram("stratos_node_duration_seconds", "Graph node latency.", ("node", "status"))
+TOOL_SECONDS = Histogram("stratos_tool_duration_seconds", "Governed tool call latency.",
+                         ("tool", "agent", "status"))
+LLM_SECONDS = Histogram("stratos_llm_duration_seconds", "LLM call latency (cache hits included).",
+                        ("agent", "model", "cache"))
+PAYLOAD_BYTES = Histogram("stratos_payload_bytes", "Input/output size per span.",
+                          ("kind", "name", "direction"), buckets=SIZE_BUCKETS)
+LLM_TOKENS = Counter("stratos_llm_tokens_total", "LLM tokens reported by the model.",
+                     ("agent", "model", "direction"))
+CACHE_LOOKUPS = Counter("stratos_cache_lookups_total", "Tool and LLM cache lookups.",
+                        ("kind", "name", "result"))
+ERRORS = Counter("stratos_errors_total", "Spans that ended in an error.", ("kind", "name"))
+JOBS = Gauge("stratos_jobs", "Jobs by status (set at scrape time).", ("status",))
+CIRCUIT_OPEN = Gauge("stratos_tool_circuit_open", "1 while a tool's circuit breaker is not closed.", ("tool",))
+
+REGISTRY = [NODE_SECONDS, TOOL_SECONDS, LLM_SECONDS, PAYLOAD_BYTES, LLM_TOKENS, CACHE_LOOKUPS, ERRORS,
+            JOBS, CIRCUIT_OPEN]
+
+
+def render() -> str:
+    """All metrics in Prometheus text format (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
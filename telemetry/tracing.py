@@ -0,0 +1,188 @@
+# stratos/telemetry/tracing.py
+"""
+Spans for graph nodes, governed tool calls and LLM calls.
+
+    with span("tool", "gnews", agent="ResearchAgent") as sp:
+        result = ...
+        sp.set(cache="miss", output_bytes=payload_size(result))
+
+A span records its duration, status ("ok", "error", "cancelled", or one
+set by the caller such as "denied"), and free-form attributes (sizes,
+token counts, cache hits, ...). Spans nest through a context variable and
+carry the run id of the graph run they belong to, so every tool and LLM
+call is correlated with its node and run without passing ids around.
+
+Finished spans feed the histograms in telemetry.metrics (GET /metrics),
+are logged at DEBUG, and the most recent runs' spans are kept in memory
+for run_trace() (GET /jobs/{id}/trace).
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import metrics
+from .log import get_logger
+
+log = get_logger(__name__)
+
+TRACE_MAX_RUNS = int(os.getenv("STRATOS_TRACE_MAX_RUNS", "200"))
+TRACE_MAX_SPANS = int(os.getenv("STRATOS_TRACE_MAX_SPANS", "2000"))  # per run
+
+_run_id: contextvars.ContextVar = contextvars.ContextVar("stratos_run_id", default=None)
+_current: contextvars.ContextVar = contextvars.ContextVar("stratos_span", default=None)
+
+_traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_traces_lock = threading.Lock()
+
+
+def current_run_id() -> Optional[str]:
+    return _run_id.get()
+
+
+@contextmanager
+def bind_run(run_id: Optional[str]) -> Iterator[None]:
+    """Attribute spans and log lines in this block to a run."""
+    token = _run_id.set(run_id)
+    try:
+        yield
+    finally:
+        _run_id.reset(token)
+
+
+def payload_size(obj: Any) -> int:
+    """Approximate size in bytes of a prompt, state update or tool result (as UTF-8 JSON)."""
+    try:
+        text = obj if isinstance(obj, str) else json.dumps(obj, default=str, ensure_ascii=False)
+    except (TypeError, ValueError):
+        text = str(obj)
+    return len(text.encode("utf-8", errors="replace"))
+
+
+class Span:
+    def __init__(self, kind: str, name: str, run_id: Optional[str], parent: Optional["Span"],
+                 attrs: Dict[str, Any]):
+        self.kind = kind
+        self.name = name
+        self.run_id = run_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attrs = dict(attrs)
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_s: Optional[float] = None
+
+    def set(self, **attrs: Any) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    def fail(self, error: Any, status: str = "error") -> "Span":
+        """Mark the span failed without raising (e.g. tools that return error strings)."""
+        self.status = status
+        self.error = str(error)[:500]
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "run_id": self.run_id,
+            "started_at": round(self.started_at, 3),
+            "duration_s": round(self.duration_s, 6) if self.duration_s is not None else None,
+            "status": self.status,
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+@contextmanager
+def span(kind: str, name: str, run_id: Optional[str] = None, **attrs: Any) -> Iterator[Span]:
+    """Time a block as a span of `kind` ("node", "tool", "llm"). Exceptions mark it failed and propagate."""
+    run_id = run_id or _run_id.get()
+    sp = Span(kind, name, run_id, _current.get(), attrs)
+    span_token = _current.set(sp)
+    run_token = _run_id.set(run_id)
+    try:
+        yield sp
+    except asyncio.CancelledError:
+        sp.status = "cancelled"
+        raise
+    except BaseException as e:
+        if sp.status == "ok":  # keep a more specific status set by the caller (e.g. "denied")
+            sp.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        sp.duration_s = time.perf_counter() - sp._start
+        _run_id.reset(run_token)
+        _current.reset(span_token)
+        _finish(sp)
+
+
+def _finish(sp: Span) -> None:
+    attrs = sp.attrs
+    if sp.kind == "node":
+        metrics.NODE_SECONDS.observe(sp.duration_s, sp.name, sp.status)
+    elif sp.kind == "tool":
+        metrics.TOOL_SECONDS.observe(sp.duration_s, sp.name, attrs.get("agent", ""), sp.status)
+    elif sp.kind == "llm":
+        model = attrs.get("model", "")
+        metrics.LLM_SECONDS.observe(sp.duration_s, sp.name, model, attrs.get("cache", "off"))
+        for direction in ("input", "output"):
+            tokens = attrs.get(f"{direction}_tokens")
+            if tokens:
+                metrics.LLM_TOKENS.inc(sp.name, model, direction, amount=tokens)
+    if attrs.get("cache") in ("hit", "miss"):
+        metrics.CACHE_LOOKUPS.inc(sp.kind, sp.name, attrs["cache"])
+    for direction in ("input", "output"):
+        size = attrs.get(f"{direction}_bytes")
+        if size is not None:
+            metrics.PAYLOAD_BYTES.observe(size, sp.kind, sp.name, direction)
+    if sp.status == "error":
+        metrics.ERRORS.inc(sp.kind, sp.name)
+
+    record = sp.to_dict()
+    if sp.run_id:
+        with _traces_lock:
+            spans = _traces.get(sp.run_id)
+            if spans is None:
+                spans = _traces[sp.run_id] = []
+                while len(_traces) > TRACE_MAX_RUNS:
+                    _traces.popitem(last=False)
+            else:
+                _traces.move_to_end(sp.run_id)
+            if len(spans) < TRACE_MAX_SPANS:
+                spans.append(record)
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(f"{sp.kind} {sp.name} {sp.status} in {sp.duration_s:.3f}s", **{
+            k: v for k, v in record.items() if k not in ("kind", "name", "status") and v is not None
+        })
+
+
+def run_trace(run_id: str) -> Optional[Dict[str, Any]]:
+    """The recorded spans of a recent run plus per-(kind, name) totals, or None if unknown."""
+    with _traces_lock:
+        spans = list(_traces.get(run_id) or ())
+    if not spans:
+        return None
+    summary: Dict[str, Dict[str, Any]] = {}
+    for s in spans:
+        entry = summary.setdefault(f"{s['kind']}:{s['name']}",
+                                   {"count": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0})
+        entry["count"] += 1
+        entry["errors"] += s["status"] == "error"
+        entry["total_s"] = round(entry["total_s"] + s["duration_s"], 6)
+        entry["max_s"] = max(entry["max_s"], s["duration_s"])
+    return {"run_id": run_id, "spans": spans, "summary": summary}
@@ -0,0 +1,368 @@
+"""
+Unit tests for agent-side helpers: research results, critique repair,
+near-duplicate collapsing, context packing, the critic's pre-screen, the
+strategist's projection, model routing and the LLM response cache. Models are benchmarks.fakes
+stand-ins; tools are stand-ins behind a real MCPGovernor.
+
+    python -m pytest tests/test_agents.py
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agents import llm_cache  # noqa: E402
+from agents.llm_cache import LLMCache, cached_llm  # noqa: E402
+from agents.near_dedup import near_dedupe, near_duplicate_clusters  # noqa: E402
+from benchmarks.fakes import FakeChatModel  # noqa: E402
+from mcp import storage  # noqa: E402
+from mcp.resilience import ToolGuard  # noqa: E402
+
+CONFIG_PATH = os.path.join(ROOT, "mcp", "config.yml")
+
+STORY = ("Chip makers expand fabs in Arizona as demand for AI accelerators keeps rising "
+         "across datacenters worldwide, while suppliers race to secure packaging capacity")
+
+
+def _doc(doc_id, title, summary, score=0.0):
+    return {"id": doc_id, "title": title, "summary": summary, "score": score}
+
+
+@pytest.fixture
+def governor(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("STRATOS_CASSETTE_MODE", raising=False)
+    from mcp.governor import MCPGovernor
+
+    governor = MCPGovernor(CONFIG_PATH)
+    governor.cache = None
+    monkeypatch.setattr("mcp.governor._governor", governor)
+    return governor
+
+
+# --- Research results ---
+def test_failed_and_short_circuited_tools_produce_no_documents(governor):
+    from agents.research_agent import _arun_step, _run_step
+
+    def down(*args, **kwargs):
+        raise ConnectionError("provider down")
+
+    governor.toolbox["gnews"] = down
+    governor.guards["gnews"] = ToolGuard("gnews", {"failure_threshold": 1, "reset_timeout_s": 60})
+    step = {"step_id": "news", "tool": "gnews", "query": "AI chips"}
+
+    assert _run_step(step, "AI chips") == []                 # the call fails
+    assert _run_step(step, "AI chips") == []                 # the circuit is open
+    assert asyncio.run(_arun_step(step, "AI chips")) == []
+    assert governor.guards["gnews"].counters["short_circuits"] == 2
+
+
+def test_error_payload_items_are_dropped(governor):
+    from agents.research_agent import _run_step
+
+    governor.toolbox["gnews"] = lambda query, include_images=False: [
+        {"title": "Error", "url": "", "content": "Error in search: 502"},
+        {"title": "Fabs expand", "url": "https://example.com/a", "content": STORY},
+    ]
+    docs = _run_step({"step_id": "news", "tool": "gnews", "query": "AI chips"}, "AI chips")
+    assert [d["title"] for d in docs] == ["Fabs expand"]
+
+
+# --- Critique repair ---
+def test_revise_loops_run_only_repair_queries_from_the_critique():
+    from agents.research_agent import _select_steps
+
+    plan = [{"step_id": "web", "tool": "tavily_search", "query": "AI chips"}]
+    kept = [_doc("d1", "Fabs expand", STORY)]
+    critique = "The risk section is too generic. It needs to identify specific market competitors."
+    settings = {"repair": {"tools": ["tavily_search", "gnews"], "max_queries": 2}}
+
+    steps, docs, mode = _select_steps({"topic": "AI chips", "plan": plan, "documents": kept,
+                                       "critique": critique}, settings)
+    assert mode == "repair" and docs == kept
+    assert [(s["tool"], s["query"]) for s in steps] == [
+        ("tavily_search", "AI chips risk"), ("gnews", "AI chips market competitors")]
+
+
+def test_first_passes_and_approved_drafts_run_the_full_plan():
+    from agents.research_agent import _select_steps
+
+    plan = [{"step_id": "web", "tool": "tavily_search", "query": "AI chips"}]
+    kept = [_doc("d1", "Fabs expand", STORY)]
+    for state in ({"topic": "AI chips", "plan": plan},
+                  {"topic": "AI chips", "plan": plan, "documents": kept, "critique": "APPROVED"}):
+        assert _select_steps(state, {}) == (plan, [], "full")
+    state = {"topic": "AI chips", "plan": plan, "documents": kept, "critique": "Too vague."}
+    assert _select_steps(state, {"repair": {"enabled": False}})[2] == "full"
+
+
+# --- Near-duplicate detection ---
+def test_syndicated_copies_collapse_to_the_best_one():
+    docs = [_doc("a", "Fabs expand", STORY, 0.4), _doc("b", "Fabs expand (wire)", STORY + " Reuters", 0.9),
+            _doc("c", "Vaccines", "A vaccine trial enrolled thousands of volunteers across Europe")]
+    assert [d["id"] for d in near_dedupe(docs)] == ["b", "c"]
+
+
+def test_generic_titles_alone_do_not_merge_documents():
+    docs = [_doc("a", "Snippet from tavily_search", "Solar tariffs were raised again by the commerce department"),
+            _doc("b", "Snippet from tavily_search", "A vaccine trial enrolled thousands of volunteers in Europe")]
+    assert near_duplicate_clusters(docs) == [[0], [1]]
+
+
+def test_cited_ids_always_survive():
+    docs = [_doc("cited-1", "Fabs", STORY), _doc("cited-2", "Fabs again", STORY + " today"),
+            _doc("new", "Fabs wire", STORY + " Reuters", 1.0)]
+    kept = near_dedupe(docs, keep_ids={"cited-1", "cited-2"})
+    assert [d["id"] for d in kept] == ["cited-1", "cited-2"]
+
+
+# --- Context packing ---
+def test_sentences_cut_from_one_document_still_appear_in_another():
+    from agents.context_packer import pack_documents
+
+    fabs = "Chip fabs expand in Arizona as demand keeps rising."
+    long_doc = _doc("long", "Chip fabs", "Chip fabs " + "x" * 1480 + ". " + fabs, 1.0)
+    short_doc = _doc("short", "Fab news", fabs + " Solar tariffs rose again.")
+    packed, included = pack_documents([long_doc, short_doc], "chip fabs", max_doc_chars=1500)
+    assert included == ["long", "short"]
+    assert packed.count(fabs) == 1  # cut from the long document, kept in the short one
+
+
+def test_packing_ranks_by_relevance_and_stays_within_the_token_budget():
+    from agents.context_packer import estimate_tokens, pack_documents
+
+    filler = " ".join(f"Unrelated market note {i} about shipping rates." for i in range(20))
+    docs = [_doc(f"other-{i}", f"Shipping {i}", f"Port {i}. " + filler) for i in range(10)]
+    docs.append(_doc("fabs", "Chip fabs", STORY))
+    packed, included = pack_documents(docs, "chip fabs", token_budget=400)
+
+    assert included[0] == "fabs"
+    assert estimate_tokens(packed) <= 400
+    assert len(included) < len(docs)
+
+
+def test_packing_skips_redundant_documents():
+    from agents.context_packer import pack_documents
+
+    docs = [_doc("a", "Fabs", STORY, 1.0), _doc("b", "Fabs copy", STORY.replace("worldwide", "globally")),
+            _doc("c", "Vaccines", "A vaccine trial enrolled thousands of volunteers across Europe")]
+    assert pack_documents(docs, "chip fabs")[1] == ["a", "c"]
+
+
+# --- Critic pre-screen ---
+def _draft(points_per_section=2, cite="d1", summary_chars=240):
+    point = {"point": "Foundry capacity for AI accelerators grows in Arizona.", "citations": [cite]}
+    return {
+        "executive_summary": "S" * summary_chars,
+        "market_trends": [point] * points_per_section,
+        "opportunities": [point] * points_per_section,
+        "risks": [point] * points_per_section,
+        "recommendations": ["Secure packaging capacity early."] * points_per_section,
+    }
+
+
+def test_prescreen_settles_clear_drafts_and_escalates_borderline_ones():
+    from agents.critic_prescreen import prescreen_draft
+
+    docs = [_doc("d1", "Fabs expand", STORY)]
+    assert prescreen_draft(_draft(), docs)["verdict"] == "approve"
+    assert prescreen_draft(_draft(points_per_section=0, summary_chars=20), docs)["verdict"] == "reject"
+    assert prescreen_draft(_draft(), [])["score"] == 0.0  # nothing to stand on
+    borderline = prescreen_draft(_draft(cite="unknown"), docs)
+    assert borderline["verdict"] == "escalate"
+    assert prescreen_draft(_draft(cite="unknown"), docs, {"approve_above": 0.6})["verdict"] == "approve"
+
+
+def test_only_borderline_drafts_reach_the_critic_model(monkeypatch):
+    import json
+
+    from agents import critic_agent
+
+    calls = []
+    monkeypatch.setattr("mcp.governor._governor", SimpleNamespace(config={}))
+    monkeypatch.setattr(critic_agent, "llm", FakeChatModel(
+        agent="critic", responder=lambda prompt: calls.append(prompt) or "Cite the sources."))
+    docs = [_doc("d1", "Fabs expand", STORY)]
+
+    update = critic_agent.run_critic_node({"draft_report": json.dumps(_draft()), "documents": docs})
+    assert update["critique"] == "APPROVED" and update["critic_decision"]["mode"] == "rules"
+    update = critic_agent.run_critic_node({"draft_report": json.dumps(_draft(cite="x")), "documents": docs})
+    assert update["critique"] == "Cite the sources." and update["critic_decision"]["mode"] == "llm"
+    assert len(calls) == 1
+
+
+# --- Strategist ---
+def test_strategist_projects_drafts_onto_the_report_schema():
+    from agents.strategist_agent import project_report
+
+    report = project_report({"title": "AI chips", "executive_summary": ["Demand rises.", "Fabs expand."],
+                             "risks": "Export controls", "market_trends": None, "extra": "dropped"})
+    assert report["executive_summary"] == "Demand rises.\nFabs expand."
+    assert report["risks"] == ["Export controls"] and report["market_trends"] == []
+    assert report["comparison_table_markdown"] == "" and report["metadata"] == {}
+    assert "extra" not in report
+
+
+def test_deterministic_strategist_never_calls_the_model(monkeypatch):
+    import json
+
+    from agents import strategist_agent
+
+    monkeypatch.setattr("mcp.governor._governor", SimpleNamespace(config={"strategist": {"mode": "deterministic"}}))
+    monkeypatch.setattr(strategist_agent, "llm", FakeChatModel(
+        agent="strategist", responder=lambda prompt: pytest.fail("the strategist called its model")))
+    draft = {"title": "AI chips", "executive_summary": "Demand rises.", "risks": ["Export controls"]}
+
+    update = strategist_agent.run_strategist_node({"draft_report": json.dumps(draft)})
+    assert json.loads(update["final_report"]) == strategist_agent.project_report(draft)
+    assert asyncio.run(strategist_agent.arun_strategist_node({"draft_report": draft})) == update
+
+
+def test_invalid_polished_reports_fall_back_to_the_projection():
+    import json
+
+    from agents.strategist_agent import _final_report, project_report
+
+    draft = {"title": "AI chips", "executive_summary": "Demand rises."}
+    assert json.loads(_final_report(draft, {"title": "Polished"})) == project_report(draft)
+
+
+# --- Model routing ---
+@pytest.fixture
+def models_config(monkeypatch):
+    import yaml
+
+    with open(CONFIG_PATH) as f:
+        config = yaml.safe_load(f)
+    monkeypatch.setattr("mcp.governor._governor", SimpleNamespace(cassette=None, config=config))
+    monkeypatch.delenv("STRATOS_MODEL_PROFILE", raising=False)
+    return config
+
+
+def test_profiles_override_per_agent_model_settings(models_config, monkeypatch):
+    from agents.llm_factory import LazyLLM, model_settings
+
+    assert LazyLLM("planner").params() == ("gemini-2.5-pro", 0.2)
+    monkeypatch.setenv("STRATOS_MODEL_PROFILE", "fast")
+    planner = model_settings("planner")
+    assert (planner["model"], planner["fallback"], planner["timeout_s"]) == ("gemini-2.5-flash", "gemini-2.5-pro", 20)
+    assert model_settings("planner", profile="default")["timeout_s"] == 120
+    assert model_settings("analyst")["model"] == "gemini-2.5-pro"  # not in the profile
+    assert LazyLLM("planner").params() == ("gemini-2.5-flash", 0.2)
+
+
+def test_timed_out_primary_models_fall_back(models_config, monkeypatch):
+    from agents import llm_factory
+
+    def timeout(prompt):
+        raise TimeoutError("deadline exceeded")
+
+    def chat_model(settings, model):
+        responder = timeout if model == "gemini-2.5-flash" else (lambda prompt: f"answered by {model}")
+        return FakeChatModel(agent="planner", model=model, responder=responder)
+
+    monkeypatch.setenv("STRATOS_MODEL_PROFILE", "fast")
+    monkeypatch.setattr(llm_factory, "_chat_model", chat_model)
+    llm = llm_factory.build_llm("planner")
+    assert llm.invoke("plan it").content == "answered by gemini-2.5-pro"
+    assert llm_cache._model_params(llm) == ("gemini-2.5-flash", 0.0)  # keyed on the primary model
+
+    monkeypatch.delenv("STRATOS_MODEL_PROFILE")
+    assert llm_factory.build_llm("planner").invoke("plan it").content == "answered by gemini-2.5-pro"
+
+
+# --- LLM response cache ---
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), mode="read_write")
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    monkeypatch.setattr(llm_cache, "_cache_loaded", True)
+    monkeypatch.setattr("mcp.governor._governor", SimpleNamespace(cassette=None, config={}))
+    return cache
+
+
+def _scripted(*answers):
+    replies = iter(answers)
+    return FakeChatModel(agent="planner", responder=lambda prompt: next(replies))
+
+
+def _must_be_json_list(content):
+    import json
+
+    if not isinstance(json.loads(content), list):
+        raise ValueError("not a list")
+
+
+def test_responses_failing_validation_are_not_cached(cache):
+    llm = cached_llm(_scripted("not json", "[1, 2]", "unused"), "planner", validate=_must_be_json_list)
+
+    assert llm.invoke("plan it").content == "not json"
+    assert llm.invoke("plan it").content == "[1, 2]"
+    assert llm.invoke("plan it").content == "[1, 2]"  # served from the cache
+    assert cache.stats()["agents"]["planner"] == {"hits": 1, "misses": 2, "stores": 1}
+
+
+def test_cached_responses_failing_validation_are_refetched(cache):
+    cached_llm(_scripted("{}"), "planner").invoke("plan it")  # stored without a validator
+    llm = cached_llm(_scripted("[3]"), "planner", validate=_must_be_json_list)
+    assert llm.invoke("plan it").content == "[3]"
+    assert llm.invoke("plan it").content == "[3]"
+
+
+def test_planner_validator_rejects_unusable_plans():
+    from agents.planner_agent import _load_plan
+
+    assert _load_plan('[{"step_id": "web", "tool": "tavily_search", "query": "q"}]')
+    for bad in ("Here is the plan", "[]", '{"steps": []}', '["search the web"]'):
+        with pytest.raises(ValueError):
+            _load_plan(bad)
+
+
+def test_replay_serves_recorded_answers_without_building_the_model(tmp_path, monkeypatch):
+    from agents import llm_factory
+    from agents.llm_cache import LLMCacheMiss
+
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.setattr("mcp.governor._governor", SimpleNamespace(cassette=None, config={}))
+    monkeypatch.setattr(llm_factory, "build_llm", lambda agent: pytest.fail("replay built the model"))
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), mode="replay")
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    monkeypatch.setattr(llm_cache, "_cache_loaded", True)
+
+    model, temperature = llm_factory.LazyLLM("planner").params()
+    key = cache.make_key(model, temperature, [["human", "plan it"]])
+    cache.mode = "read_write"
+    cache.set("planner", key, model, "[1]")
+    cache.mode = "replay"
+
+    llm = cached_llm(llm_factory.LazyLLM("planner"), "planner")
+    assert llm.invoke("plan it").content == "[1]"
+    with pytest.raises(LLMCacheMiss):
+        llm.invoke("plan something else")
+
+
+def test_replay_ignores_expiry_that_read_write_enforces(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), mode="read_write", agents={"planner": {"ttl_s": 0}})
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    monkeypatch.setattr(llm_cache, "_cache_loaded", True)
+    monkeypatch.setattr("mcp.governor._governor", SimpleNamespace(cassette=None, config={}))
+
+    llm = cached_llm(_scripted("[1]", "[2]"), "planner")
+    assert llm.invoke("plan it").content == "[1]"
+    assert llm.invoke("plan it").content == "[2]"  # expired: asked again
+    cache.mode = "replay"
+    assert asyncio.run(llm.ainvoke("plan it")).content == "[2]"
+
+
+def test_agents_switched_off_bypass_the_cache(cache):
+    cache.agents = {"planner": {"enabled": False}}
+    llm = cached_llm(_scripted("[1]", "[2]"), "planner")
+    assert llm.invoke("plan it").content == "[1]"
+    assert llm.invoke("plan it").content == "[2]"
+    assert cache.stats()["agents"] == {}
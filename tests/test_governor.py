@@ -0,0 +1,316 @@
+"""
+Unit tests for the governor's guard rails: tool cache, cost budgets and
+rate buckets, circuit breakers, record/replay cassettes, and the adapters,
+HTTP client and extractor behind them. No network: failing tools are stand-ins or patched SDK clients.
+
+    python -m pytest tests/test_governor.py
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mcp import storage  # noqa: E402
+from mcp.adapters.embedding_cache import CachedEmbeddings  # noqa: E402
+from mcp.adapters.html_extract import extract_text  # noqa: E402
+from mcp.budget import BudgetExceeded, BudgetLedger, TokenBucket  # noqa: E402
+from mcp.resilience import CircuitBreaker, ToolGuard  # noqa: E402
+from mcp.tool_cache import ToolCache, is_cacheable  # noqa: E402
+
+CONFIG_PATH = os.path.join(ROOT, "mcp", "config.yml")
+
+
+@pytest.fixture
+def governor(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("STRATOS_CASSETTE_MODE", raising=False)
+    from mcp.governor import MCPGovernor
+
+    return MCPGovernor(CONFIG_PATH)
+
+
+def _failing_tool(*args, **kwargs):
+    raise ConnectionError("provider down")
+
+
+# --- Tool cache ---
+def test_tool_cache_normalizes_queries_and_skips_errors(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.sqlite3"), tool_ttls={"gnews": 900, "pdf_rag_query": 0})
+    hits = [{"title": "Chip news", "url": "https://example.com/a", "content": "..."}]
+
+    assert cache.set("gnews", "AI  Chips", hits)
+    assert cache.get("gnews", "ai chips") == (True, hits)
+    assert not cache.set("gnews", "down", [{"title": "Error", "content": "Error in search"}])
+    assert not cache.set("gnews", "empty", [])
+    assert cache.get("pdf_rag_query", {"url": "https://example.com/a.pdf", "query": "q"}) == (False, None)
+
+
+def test_error_payloads_are_not_cacheable():
+    assert not is_cacheable("Error executing tool gnews: timeout")
+    assert not is_cacheable([{"title": "Placeholder result for x", "content": ""}])
+    assert is_cacheable([{"title": "ok", "content": "text"}])
+
+
+def test_pdf_results_are_not_cached_past_index_revalidation():
+    with open(CONFIG_PATH) as f:
+        ttl = yaml.safe_load(f)["cache"]["tools"]["pdf_rag_query"]
+    assert ttl <= float(os.getenv("STRATOS_PDF_REVALIDATE_S", "3600"))
+
+
+# --- Budgets and rate limits ---
+def _ledger(**settings):
+    agents = {"ResearchAgent": {"cost_budget_usd": 0.02}}
+    return BudgetLedger(agents, {"tool_costs_usd": {"tavily_search": 0.008}, **settings})
+
+
+def test_agent_budget_is_enforced_per_run():
+    ledger = _ledger()
+    ledger.charge("ResearchAgent", "tavily_search", "run-1")
+    ledger.charge("ResearchAgent", "tavily_search", "run-1")
+    with pytest.raises(BudgetExceeded):
+        ledger.charge("ResearchAgent", "tavily_search", "run-1")
+    assert ledger.charge("ResearchAgent", "tavily_search", "run-2") == pytest.approx(0.008)
+
+
+def test_calls_without_a_run_are_never_capped():
+    ledger = _ledger(run_budget_usd=0.01)
+    for _ in range(10):
+        ledger.charge("ResearchAgent", "tavily_search")
+    assert ledger.snapshot()["agents"]["ResearchAgent"]["calls"] == 10
+
+
+def test_refund_gives_back_a_charge():
+    ledger = _ledger()
+    charged = ledger.charge("ResearchAgent", "tavily_search", "run-1")
+    ledger.refund("ResearchAgent", "tavily_search", "run-1", charged)
+    run = ledger.snapshot("run-1")["runs"]["run-1"]
+    assert run["spend_usd"] == 0.0 and run["calls"] == 0
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(per_minute=60, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert 0.0 < bucket.reserve() <= 1.0
+    assert not bucket.acquire(max_wait_s=0.0)
+
+
+# --- Circuit breakers ---
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker("gnews", failure_threshold=2, reset_timeout_s=0.0)
+    breaker.record_failure()
+    assert not breaker.rejecting()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    assert not breaker.rejecting()  # reset timeout elapsed: a probe may go
+    assert breaker.allow()           # ... and this claims it
+    assert breaker.rejecting()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_fails_fast_without_charging(governor):
+    governor.cache = None
+    governor.toolbox["tavily_search"] = _failing_tool
+    governor.guards["tavily_search"] = ToolGuard("tavily_search", {"failure_threshold": 2, "reset_timeout_s": 60})
+
+    for _ in range(2):
+        assert governor.execute_tool("ResearchAgent", "tavily_search", "q", run_id="run-1").startswith("Error")
+    spent = governor.budget.snapshot("run-1")["runs"]["run-1"]["spend_usd"]
+
+    result = governor.execute_tool("ResearchAgent", "tavily_search", "q", run_id="run-1")
+    assert "circuit open" in result
+    result = asyncio.run(governor.aexecute_tool("ResearchAgent", "tavily_search", "q", run_id="run-1"))
+    assert "circuit open" in result
+    assert governor.budget.snapshot("run-1")["runs"]["run-1"]["spend_usd"] == spent
+    assert governor.guards["tavily_search"].counters["short_circuits"] == 2
+
+
+def test_adapter_failures_reach_the_breaker(governor, monkeypatch):
+    from mcp.adapters import arxiv_adapter
+
+    governor.cache = None
+    guard = governor.guards["arxiv_search"]
+
+    monkeypatch.setattr(arxiv_adapter.arxiv_client, "results", lambda search: iter(()))
+    assert governor.execute_tool("ResearchAgent", "arxiv_search", "no such topic") == []
+    assert guard.counters["failures"] == 0
+
+    def unreachable(search):
+        raise ConnectionError("arxiv unreachable")
+    monkeypatch.setattr(arxiv_adapter.arxiv_client, "results", unreachable)
+    assert governor.execute_tool("ResearchAgent", "arxiv_search", "q").startswith("Error")
+    assert guard.counters["failures"] == 1
+
+
+def test_bad_pdf_page_selections_are_rejected_without_tripping_the_breaker(governor):
+    from mcp.adapters.pdf_rag_adapter import PdfRejected, _page_range, _page_selection
+
+    assert _page_selection(" 3 - 10 ", None) == "pages=3-10"
+    assert _page_range(5, "pages=3-10") == range(2, 5)
+    for pages in ("ten", "10-3", "0-2", "3-"):
+        with pytest.raises(PdfRejected):
+            _page_selection(pages, None)
+    with pytest.raises(PdfRejected):
+        _page_range(5, "pages=8-9")
+
+    governor.cache = None
+    guard = governor.guards["pdf_rag_query"]
+    for _ in range(guard.breaker.failure_threshold + 1):
+        query = {"url": "https://example.com/a.pdf", "query": "q", "pages": "10-3"}
+        assert governor.execute_tool("UserDeepDive", "pdf_rag_query", query) == []
+    assert guard.counters["failures"] == 0 and guard.breaker.state == "closed"
+
+
+def test_different_pdfs_are_indexed_in_parallel(tmp_path, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from mcp.adapters import pdf_rag_adapter
+    from mcp.adapters.pdf_index import PdfIndexManifest
+
+    manifest = PdfIndexManifest(str(tmp_path / "manifest.sqlite3"))
+    monkeypatch.setattr(pdf_rag_adapter, "get_components", lambda: SimpleNamespace(manifest=manifest))
+    monkeypatch.setattr(pdf_rag_adapter, "_download", lambda url, headers, dest: ({}, f"hash-{url}"))
+    both_building = threading.Barrier(2, timeout=5)
+
+    def build(path, index_hash, selection):
+        both_building.wait()  # times out if one build waits for the other
+        return 1
+    monkeypatch.setattr(pdf_rag_adapter, "_build_index", build)
+
+    with ThreadPoolExecutor(2) as pool:
+        hashes = list(pool.map(pdf_rag_adapter._resolve_index, ["a.pdf", "b.pdf"]))
+    assert hashes == ["hash-a.pdf", "hash-b.pdf"]
+
+
+# --- Cassettes ---
+def test_cassettes_replay_answers_with_this_runs_document_ids(tmp_path):
+    import uuid
+
+    from mcp.cassette import Cassette
+
+    path = str(tmp_path / "run.jsonl.gz")
+    old_a, old_b, new_a, new_b = (str(uuid.uuid4()) for _ in range(4))
+    recorder = Cassette(path, mode="record")
+    recorder.call("llm", "analyst", [["human", f"[{old_a}] fabs [{old_b}] tariffs"]],
+                  lambda: {"citations": [old_b, old_a]})
+    recorder.call("tool", "gnews", "AI chips", lambda: ["first"])
+    recorder.call("tool", "gnews", "AI chips", lambda: ["second"])
+
+    player = Cassette(path, mode="replay", latency_scale=0)
+    answer = player.call("llm", "analyst", [["human", f"[{new_a}] fabs [{new_b}] tariffs"]], _failing_tool)
+    assert answer == {"citations": [new_b, new_a]}
+    assert [player.call("tool", "gnews", "AI chips", _failing_tool) for _ in range(3)] == [
+        ["first"], ["second"], ["second"]]
+    assert asyncio.run(player.acall("tool", "gnews", "AI chips", _failing_tool)) == ["second"]
+    player.rewind()
+    assert player.call("tool", "gnews", "AI chips", _failing_tool) == ["first"]
+
+
+def test_cassettes_replay_recorded_errors_and_reject_unknown_calls(tmp_path):
+    from mcp.cassette import Cassette, CassetteMiss, RecordedError
+
+    path = str(tmp_path / "run.jsonl.gz")
+    with pytest.raises(ConnectionError):
+        Cassette(path, mode="record").call("tool", "arxiv_search", "AI chips", _failing_tool)
+
+    player = Cassette(path, mode="replay", latency_scale=0)
+    with pytest.raises(RecordedError, match="provider down"):
+        player.call("tool", "arxiv_search", "AI chips", _failing_tool)
+    with pytest.raises(CassetteMiss):
+        player.call("tool", "arxiv_search", "solar tariffs", _failing_tool)
+    assert player.snapshot()["misses"] == 1
+
+
+def test_governed_tool_calls_replay_without_the_provider(governor, tmp_path):
+    from mcp.cassette import Cassette
+
+    governor.cache = None  # as when the governor is built with a cassette
+    path = str(tmp_path / "run.jsonl.gz")
+    hits = [{"title": "Chip news", "url": "https://example.com/a", "content": "Fabs expand."}]
+    governor.toolbox["gnews"] = lambda query, include_images=False: hits
+    governor.cassette = Cassette(path, mode="record")
+    assert governor.execute_tool("ResearchAgent", "gnews", "AI chips") == hits
+
+    governor.toolbox["gnews"] = _failing_tool
+    governor.cassette = Cassette(path, mode="replay", latency_scale=0)
+    assert governor.execute_tool("ResearchAgent", "gnews", "AI chips") == hits
+    assert governor.cassette.snapshot()["replayed"] == 1
+
+
+# --- HTTP client ---
+def test_streamed_gets_retry_before_the_body_with_a_capped_backoff(monkeypatch):
+    import httpx
+
+    from mcp import http_client
+
+    assert http_client._backoff(0, "3600") == http_client.MAX_BACKOFF_S
+    statuses = iter([503, 200])
+
+    def respond(request):
+        return httpx.Response(next(statuses), headers={"Retry-After": "3600"}, content=b"<p>ok</p>")
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        monkeypatch.setattr(http_client, "get_async_client", lambda: client)
+        monkeypatch.setattr(http_client, "MAX_BACKOFF_S", 0.0)
+        async with http_client.ahttp_stream("https://example.com/a") as response:
+            assert response.status_code == 200
+            assert await response.aread() == b"<p>ok</p>"
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+
+# --- HTML extraction ---
+def test_extract_keeps_webforms_bodies():
+    html = "<body><form id='form1'><h1>Quarterly results</h1><p>Revenue grew.</p></form></body>"
+    assert extract_text([html]) == "Quarterly results Revenue grew."
+
+
+def test_extract_keeps_article_headers_but_drops_site_headers():
+    html = ("<body><header>Site menu</header><article><header><h1>Headline</h1></header>"
+            "<p>Body text.</p></article></body>")
+    assert extract_text([html]) == "Headline Body text."
+
+
+def test_extract_recovers_from_unclosed_tags_in_skipped_blocks():
+    html = "<body><nav><a>Home</a><select><option>x</nav><p>Real content.</p></body>"
+    assert extract_text([html]) == "Real content."
+
+
+def test_extract_drops_form_controls():
+    html = "<p>Keep</p><form><input name=q><button>Go</button><textarea>draft</textarea></form><p>this</p>"
+    assert extract_text([html]) == "Keep this"
+
+
+def test_extract_keeps_trailing_text_at_the_byte_cap():
+    html = b"<p>First paragraph.</p><p>Trailing text"
+    assert extract_text([html, b" never read</p>"], max_bytes=len(html)) == "First paragraph. Trailing text"
+
+
+# --- Embedding cache ---
+class _TaskEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [0.0, 1.0]
+
+
+def test_embedding_cache_separates_query_and_document_vectors(tmp_path):
+    cache = CachedEmbeddings(_TaskEmbeddings(), "text-embedding-004", str(tmp_path))
+    assert cache.embed_documents(["chips"]) == [[1.0, 0.0]]
+    assert cache.embed_query("chips") == [0.0, 1.0]
+    assert cache.embed_documents(["chips"]) == [[1.0, 0.0]]
+    assert cache.stats() == {"hits": 1, "misses": 2}
@@ -0,0 +1,226 @@
+"""
+Unit tests for how graph runs are executed: the persistent job store,
+the worker queue's backpressure, and checkpoint setup, resume and replay.
+Job tests replace the graph with a stand-in runner; checkpoint tests run
+the real graph on the benchmarks.fakes models and tools.
+
+    python -m pytest tests/test_graph.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.coalescer import RunCoalescer  # noqa: E402
+from backend.jobs import ACTIVE, FAILED, QUEUED, SUCCEEDED, JobManager, JobStore, QueueFull  # noqa: E402
+from mcp import storage  # noqa: E402
+from orchestrator import checkpoints  # noqa: E402
+
+CONFIG_PATH = os.path.join(ROOT, "mcp", "config.yml")
+
+
+# --- Job store ---
+def test_job_store_tracks_status_and_report(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create("j1", "ai chips", "AI chips", None)
+    assert store.find_active("ai chips")["job_id"] == "j1"
+
+    store.mark_running("j1")
+    store.mark_done("j1", {"title": "Report"}, None)
+    assert store.find_active("ai chips") is None
+    assert store.get("j1")["report"] == {"title": "Report"}
+
+    reopened = JobStore(str(tmp_path / "jobs.sqlite3"))
+    assert reopened.counts() == {SUCCEEDED: 1}
+
+
+# --- Job manager ---
+class _Runner:
+    """Stand-in for the graph: each run waits for `release`, then reports or fails."""
+
+    def __init__(self, fail: bool = False):
+        self.release = asyncio.Event()
+        self.fail = fail
+
+    async def __call__(self, run):
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("graph failed")
+        run.report = {"title": run.topic}
+
+
+def _manager(tmp_path, runner, **kwargs) -> JobManager:
+    coalescer = RunCoalescer(runner, report_ttl_s=0)
+    return JobManager(coalescer, JobStore(str(tmp_path / "jobs.sqlite3")), **kwargs)
+
+
+async def _settled(jobs: JobManager, job_id: str) -> str:
+    # wait() returns with the run; the worker records the outcome right after.
+    for _ in range(100):
+        status = jobs.get(job_id)["status"]
+        if status not in ACTIVE:
+            return status
+        await asyncio.sleep(0.01)
+    return status
+
+
+def test_submissions_attach_and_apply_backpressure(tmp_path):
+    async def scenario():
+        runner = _Runner()
+        jobs = _manager(tmp_path, runner, workers=1, queue_max=1)
+        first = jobs.submit("AI chips")
+        assert jobs.submit("The AI chips")["job_id"] == first["job_id"]  # same normalized topic
+        await asyncio.sleep(0.05)  # the only worker picks up the first job
+
+        second = jobs.submit("Solar tariffs")
+        assert second["status"] == QUEUED
+        with pytest.raises(QueueFull) as full:
+            jobs.submit("Vaccine trials")
+        assert full.value.retry_after_s >= 1
+
+        runner.release.set()
+        assert await jobs.wait(first["job_id"]) == {"title": "AI chips"}
+        assert await jobs.wait(second["job_id"]) == {"title": "Solar tariffs"}
+        assert await _settled(jobs, second["job_id"]) == SUCCEEDED
+        await jobs.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_jobs_keep_their_error_and_can_be_retried(tmp_path):
+    async def scenario():
+        runner = _Runner(fail=True)
+        runner.release.set()
+        jobs = _manager(tmp_path, runner, workers=1, queue_max=4)
+        job = jobs.submit("AI chips")
+        with pytest.raises(RuntimeError, match="graph failed"):
+            await jobs.wait(job["job_id"])
+        assert await _settled(jobs, job["job_id"]) == FAILED
+
+        runner.fail = False
+        jobs.retry(job["job_id"])
+        assert await jobs.wait(job["job_id"]) == {"title": "AI chips"}
+        await jobs.stop()
+
+    asyncio.run(scenario())
+
+
+# --- Checkpoints ---
+def test_missing_checkpointer_falls_back_to_plain_runs(monkeypatch):
+    monkeypatch.setitem(sys.modules, "aiosqlite", None)  # import raises ImportError
+    monkeypatch.setattr(checkpoints, "CHECKPOINTS_ENABLED", True)
+    monkeypatch.setattr(checkpoints, "_unavailable", False)
+    monkeypatch.setattr(checkpoints, "_graphs", {})
+    monkeypatch.setattr(checkpoints, "_locks", {})
+
+    assert asyncio.run(checkpoints.get_checkpointed_graph()) is None
+    assert checkpoints._unavailable
+
+
+def test_each_event_loop_gets_its_own_checkpointer(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(checkpoints, "CHECKPOINTS_ENABLED", True)
+    monkeypatch.setattr(checkpoints, "_unavailable", False)
+    monkeypatch.setattr(checkpoints, "_graphs", {})
+    monkeypatch.setattr(checkpoints, "_savers", {})
+    monkeypatch.setattr(checkpoints, "_locks", {})
+
+    async def scenario():
+        # Concurrent first calls contend for the setup lock and share one graph.
+        first, second = await asyncio.gather(checkpoints.get_checkpointed_graph(),
+                                             checkpoints.get_checkpointed_graph())
+        assert first is not None and first is second
+        await checkpoints.aclose_checkpointer()
+        return first
+
+    assert asyncio.run(scenario()) is not asyncio.run(scenario())
+    assert checkpoints._locks == {} and checkpoints._graphs == {}
+
+
+# --- Resume and replay (the real graph, with benchmarks/fakes.py models and tools) ---
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    # The agent modules register the models that install_fakes() overrides.
+    from agents import analyst_agent, critic_agent, llm_cache, llm_factory, planner_agent, strategist_agent  # noqa: F401
+    from benchmarks.fakes import install_fakes
+    from mcp.governor import MCPGovernor
+
+    monkeypatch.setattr(storage, "CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("STRATOS_CASSETTE_MODE", raising=False)
+    governor = MCPGovernor(CONFIG_PATH)
+    governor.cache = None
+    governor.budget = None
+    monkeypatch.setattr("mcp.governor._governor", governor)
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    monkeypatch.setattr(llm_cache, "_cache_loaded", True)
+    for lazy in llm_factory._agent_llms.values():  # install_fakes overrides them in place
+        monkeypatch.setattr(lazy, "_llm", lazy._llm)
+        monkeypatch.setattr(lazy, "_overridden", lazy._overridden)
+    install_fakes(llm_latency_s=0.0, tool_latency_s=0.0)
+
+    monkeypatch.setattr(checkpoints, "CHECKPOINTS_ENABLED", True)
+    monkeypatch.setattr(checkpoints, "_unavailable", False)
+    monkeypatch.setattr(checkpoints, "_graphs", {})
+    monkeypatch.setattr(checkpoints, "_savers", {})
+    monkeypatch.setattr(checkpoints, "_locks", {})
+
+
+def _run(run_id: str, resume_from: str = None):
+    from backend.coalescer import GraphRun
+
+    return GraphRun("ai chips", "AI chips", run_id=run_id, resume_from=resume_from)
+
+
+def _events(run) -> list:
+    return [e["type"] if e["type"] != "status" else e["payload"] for e in run.history]
+
+
+def test_failed_runs_resume_after_their_last_finished_node(pipeline, monkeypatch):
+    from agents import strategist_agent
+    from backend.api import _stream_graph
+
+    project_report = strategist_agent.project_report
+
+    def fail_once(draft):
+        monkeypatch.setattr(strategist_agent, "project_report", project_report)
+        raise RuntimeError("strategist crashed")
+    monkeypatch.setattr(strategist_agent, "project_report", fail_once)
+
+    async def scenario():
+        first = _run("run-1")
+        with pytest.raises(RuntimeError, match="strategist crashed"):
+            await _stream_graph(first)
+        assert "draft" in _events(first)
+
+        resumed = _run("run-1")
+        await _stream_graph(resumed)
+        assert _events(resumed) == ["resuming", "running_graph", "report", "complete"]
+        assert resumed.report["title"]
+        await checkpoints.aclose_checkpointer()
+
+    asyncio.run(scenario())
+
+
+def test_replays_rerun_only_the_nodes_after_a_checkpoint(pipeline):
+    from backend.api import _stream_graph
+
+    async def scenario():
+        run = _run("run-1")
+        await _stream_graph(run)
+        graph = await checkpoints.get_checkpointed_graph()
+        checkpoint_id = await checkpoints.checkpoint_before(graph, "run-1", "critic")
+        assert checkpoint_id
+
+        replay = _run("run-1", resume_from=checkpoint_id)
+        await _stream_graph(replay)
+        assert _events(replay)[:2] == ["replaying", "running_graph"]
+        assert "plan" not in _events(replay) and "draft" not in _events(replay)
+        assert "critique" in _events(replay) and replay.report == run.report
+        await checkpoints.aclose_checkpointer()
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+"""
+Cold-start budget for the API process.
+
+Importing backend.api must stay cheap: no Gemini/embedding/Tavily/GNews
+clients, no governor and no compiled graph until first use. Each check
+runs the import in a fresh interpreter with API keys removed.
+
+    python -m pytest tests/test_import_time.py
+    STRATOS_IMPORT_BUDGET_S=1.5 python tests/test_import_time.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_S = float(os.getenv("STRATOS_IMPORT_BUDGET_S", "2.0"))
+HEAVY_MODULES = ("langchain_google_genai", "chromadb", "langgraph", "tavily", "gnews")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.api
+elapsed = time.perf_counter() - start
+import mcp.governor, orchestrator.graph_builder
+print(json.dumps({
+    "elapsed_s": elapsed,
+    "heavy": [m for m in %r if m in sys.modules],
+    "governor_built": mcp.governor._governor is not None,
+    "graph_built": orchestrator.graph_builder._app_graph is not None,
+}))
+""" % (HEAVY_MODULES,)
+
+
+def _probe_import() -> dict:
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("GOOGLE_API_KEY", "GEMINI_API_KEY", "TAVILY_API_KEY")}
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env["STRATOS_WARMUP"] = "0"
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_api_import_within_budget():
+    # Best of three, so one slow run (cold disk cache) does not fail the check.
+    elapsed = min(_probe_import()["elapsed_s"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_S, f"import backend.api took {elapsed:.2f}s (budget {IMPORT_BUDGET_S}s)"
+
+
+def test_api_import_is_lazy():
+    result = _probe_import()
+    assert result["heavy"] == [], f"heavy modules imported at startup: {result['heavy']}"
+    assert not result["governor_built"]
+    assert not result["graph_built"]
+
+
+if __name__ == "__main__":
+    result = _probe_import()
+    print(f"import backend.api: {result['elapsed_s']:.3f}s (budget {IMPORT_BUDGET_S}s)")
+    print(f"heavy modules loaded: {result['heavy'] or 'none'}")
@@ -0,0 +1,88 @@
+"""
+Unit tests for telemetry: Prometheus rendering of the in-process metrics,
+and spans (nesting, run attribution, errors) as recorded for run traces.
+
+    python -m pytest tests/test_telemetry.py
+"""
+
+import os
+import sys
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from telemetry import metrics  # noqa: E402
+from telemetry.tracing import bind_run, run_trace, span  # noqa: E402
+
+
+# --- Metrics ---
+def test_counters_render_escaped_labels():
+    counter = metrics.Counter("stratos_test_total", "Test counter.", ("name",))
+    counter.inc('say "hi"\n')
+    counter.inc('say "hi"\n', amount=2)
+    assert counter.render() == [
+        "# HELP stratos_test_total Test counter.",
+        "# TYPE stratos_test_total counter",
+        'stratos_test_total{name="say \\"hi\\"\\n"} 3',
+    ]
+
+
+def test_histograms_render_cumulative_buckets():
+    histogram = metrics.Histogram("stratos_test_seconds", "Test histogram.", ("node",), buckets=(0.1, 1))
+    histogram.observe(0.05, "planner")
+    histogram.observe(0.5, "planner")
+    histogram.observe(5, "planner")
+    assert histogram.render()[2:] == [
+        'stratos_test_seconds_bucket{node="planner",le="0.1"} 1',
+        'stratos_test_seconds_bucket{node="planner",le="1"} 2',
+        'stratos_test_seconds_bucket{node="planner",le="+Inf"} 3',
+        'stratos_test_seconds_sum{node="planner"} 5.550000',
+        'stratos_test_seconds_count{node="planner"} 3',
+    ]
+
+
+def test_gauges_render_as_gauges():
+    gauge = metrics.Gauge("stratos_test_jobs", "Test gauge.", ("status",))
+    gauge.set(4, "queued")
+    gauge.set(2, "queued")
+    assert gauge.render()[1:] == ["# TYPE stratos_test_jobs gauge", 'stratos_test_jobs{status="queued"} 2']
+
+
+# --- Tracing ---
+def test_spans_nest_under_their_run_and_feed_metrics():
+    run_id = uuid.uuid4().hex
+    tool_errors = metrics.ERRORS.value("tool", "gnews")
+    with bind_run(run_id):
+        with span("node", "researcher") as node:
+            with span("tool", "gnews", agent="ResearchAgent", cache="miss", output_bytes=120):
+                pass
+            with pytest.raises(ConnectionError):
+                with span("tool", "gnews", agent="ResearchAgent"):
+                    raise ConnectionError("provider down")
+        with span("llm", "planner", model="fake-llm", cache="hit", input_tokens=10, output_tokens=5):
+            pass
+
+    trace = run_trace(run_id)
+    spans = {(s["kind"], s["status"]): s for s in trace["spans"]}
+    assert spans[("tool", "ok")]["parent_id"] == node.span_id
+    assert spans[("tool", "error")]["error"] == "ConnectionError: provider down"
+    assert spans[("llm", "ok")]["parent_id"] is None
+    assert all(s["run_id"] == run_id for s in trace["spans"])
+    assert trace["summary"]["tool:gnews"]["count"] == 2 and trace["summary"]["tool:gnews"]["errors"] == 1
+    assert metrics.ERRORS.value("tool", "gnews") == tool_errors + 1
+    assert metrics.LLM_TOKENS.value("planner", "fake-llm", "output") >= 5
+    assert 'stratos_cache_lookups_total{kind="llm",name="planner",result="hit"}' in metrics.render()
+
+
+def test_caller_set_statuses_survive_the_exception():
+    run_id = uuid.uuid4().hex
+    errors = metrics.ERRORS.value("tool", "tavily_search")
+    with pytest.raises(PermissionError):
+        with span("tool", "tavily_search", run_id=run_id) as sp:
+            sp.fail("not authorized", status="denied")
+            raise PermissionError("not authorized")
+    assert run_trace(run_id)["spans"][0]["status"] == "denied"
+    assert metrics.ERRORS.value("tool", "tavily_search") == errors  # a denial is not a tool error